@@ -7,9 +7,12 @@ Sincroniza una base local con la API de licitaciones (modo espejo 1:1).
 """
 import sys
 sys.dont_write_bytecode = True
-import os, json, time, datetime, requests, hashlib
+import os, json, time, datetime, requests, hashlib, asyncio
 from pathlib import Path
+import aiohttp
 from dotenv import load_dotenv
+import http_sesion, almacen_local, base_sqlite
+from flujo_json import iterar_arreglo, TAM_BLOQUE
 
 load_dotenv()
 
@@ -21,8 +24,11 @@ load_dotenv()
 API_URL = os.getenv("IMPAKT_API_URL", "http://34.46.3.229:5000/licitaciones")
 API_KEY = os.getenv("IMPAKT_API_KEY")
 MAX_DIAS_ATRAS = 10         # límite de revisión hacia atrás
-PAUSA_ENTRE_DIAS = 2.0      # segundos entre descargas
-PAUSA_ENTRE_LLAMADAS = 0.5  # segundos entre requests HTTP
+MAX_CONCURRENCIA = int(os.getenv("IMPAKT_MAX_CONCURRENCIA", "4"))  # días descargándose a la vez
+TASA_INICIAL = 2.0          # requests/segundo al partir (token bucket)
+TASA_MINIMA = 0.2           # piso de la tasa tras backoff
+TASA_MAXIMA = 8.0           # techo de la tasa al recuperarse
+TAM_ESCRITURA = 1 << 20     # bytes acumulados antes de escribir el crudo a disco
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "base_local"
 LOG_DIR = BASE_DIR / "log"
@@ -51,32 +57,181 @@ def escribir_json(path: Path, data):
 
 def fetch_catalog(api_url: str, api_key: str):
     root = api_url.rsplit("/", 1)[0]
-    r = requests.get(f"{root}/catalog", headers={"x-api-key": api_key}, timeout=30)
+    r = http_sesion.get(f"{root}/catalog", headers={"x-api-key": api_key}, timeout=30)
     r.raise_for_status()
-    time.sleep(PAUSA_ENTRE_LLAMADAS)
     data = r.json()
     return data.get("dias", [])
 
-def fetch_dia(api_url: str, api_key: str, fecha: str):
-    r = requests.get(api_url, headers={"x-api-key": api_key}, params={"dia": fecha}, timeout=90)
-    r.raise_for_status()
-    time.sleep(PAUSA_ENTRE_LLAMADAS)
-    data = r.json()
-    if isinstance(data, dict) and "licitaciones" in data:
-        return data["licitaciones"]
-    elif isinstance(data, list):
-        return data
-    return []
+class LimitadorAdaptativo:
+    """
+    Token bucket compartido por todas las descargas concurrentes.
+    Entrega `tasa` tokens por segundo (ráfaga máx. `capacidad`). Un 429/5xx
+    reduce la tasa a la mitad y bloquea durante el backoff común de
+    http_sesion (o el Retry-After del servidor);
+    cada respuesta OK la recupera de a poco (AIMD).
+    """
+    def __init__(self, tasa: float, capacidad: float, tasa_min: float, tasa_max: float):
+        self.tasa, self.capacidad = tasa, capacidad
+        self.tasa_min, self.tasa_max = tasa_min, tasa_max
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self.bloqueado_hasta = 0.0
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                if ahora < self.bloqueado_hasta:
+                    await asyncio.sleep(self.bloqueado_hasta - ahora)
+                    continue
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+    def penalizar(self, espera: float = None):
+        self.tasa = max(self.tasa_min, self.tasa / 2)
+        self.tokens = 0.0
+        if espera:
+            self.bloqueado_hasta = max(self.bloqueado_hasta, time.monotonic() + espera)
 
-def guardar_dia_local(fecha: str, data: list):
+    def exito(self):
+        self.tasa = min(self.tasa_max, self.tasa + 0.25)
+
+def ruta_descarga(fecha: str) -> Path:
     y, m, d = fecha.split("-")
-    path = DATA_DIR / y / m / f"{d}.json"
-    escribir_json(path, data)
+    return DATA_DIR / y / m / f"{d}.descarga"
+
+async def fetch_dia(session: aiohttp.ClientSession, limitador: LimitadorAdaptativo,
+                    api_url: str, api_key: str, fecha: str):
+    """
+    Descarga el día `fecha` escribiendo el cuerpo de la respuesta, bloque a bloque,
+    en un archivo crudo dentro de base_local. Retorna la ruta de ese archivo.
+    """
+    crudo = ruta_descarga(fecha)
+    crudo.parent.mkdir(parents=True, exist_ok=True)
+    intentos = http_sesion.REINTENTOS + 1
+    for intento in range(1, intentos + 1):
+        await limitador.adquirir()
+        try:
+            async with session.get(api_url, headers={"x-api-key": api_key}, params={"dia": fecha},
+                                   timeout=aiohttp.ClientTimeout(total=90)) as r:
+                if r.status in http_sesion.ESTADOS_REINTENTO:
+                    limitador.penalizar(http_sesion.espera_backoff(intento, http_sesion.retry_after(r.headers)))
+                    log(f"⏳ {fecha}: HTTP {r.status}, intento {intento}/{intentos} (tasa={limitador.tasa:.2f}/s)")
+                    continue
+                r.raise_for_status()
+                # la escritura a disco va en un hilo, de a TAM_ESCRITURA, para no frenar las otras descargas
+                f = await asyncio.to_thread(open, crudo, "wb")
+                try:
+                    buf = bytearray()
+                    async for trozo in r.content.iter_chunked(TAM_BLOQUE):
+                        buf += trozo
+                        if len(buf) >= TAM_ESCRITURA:
+                            await asyncio.to_thread(f.write, bytes(buf)); buf.clear()
+                    if buf: await asyncio.to_thread(f.write, bytes(buf))
+                finally:
+                    await asyncio.to_thread(f.close)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            limitador.penalizar(http_sesion.espera_backoff(intento))
+            log(f"⏳ {fecha}: {e.__class__.__name__}, intento {intento}/{intentos}")
+            continue
+        limitador.exito()
+        return crudo
+    if crudo.exists(): crudo.unlink()
+    raise RuntimeError(f"sin respuesta válida tras {intentos} intentos")
+
+def normalizar_registros(registros):
+    """Valida cada registro al vuelo: descarta lo que no sea objeto y limpia el código."""
+    for lic in registros:
+        if not isinstance(lic, dict):
+            continue
+        cod = lic.get("CodigoExterno")
+        if isinstance(cod, str):
+            lic["CodigoExterno"] = cod.strip()
+        yield lic
+
+def guardar_dia_local(fecha: str, crudo: Path):
+    """
+    Normaliza la respuesta cruda registro a registro hacia el archivo del día en el
+    formato de almacen_local (renombre atómico) y borra el crudo.
+    Retorna (cuántos guardó, [(codigo, offset)] para el índice de códigos).
+    """
+    ubicaciones = []
+    def registrar(lic, offset):
+        ubicaciones.append((almacen_local.codigo_de(lic), offset))
+    try:
+        with open(crudo, "r", encoding="utf-8") as f:
+            n = almacen_local.escribir_dia(DATA_DIR, fecha, normalizar_registros(iterar_arreglo(f)),
+                                           registrar=registrar)
+        return n, ubicaciones
+    finally:
+        if crudo.exists(): crudo.unlink()
 
 def checksum_archivo(path: Path):
     try: return hashlib.md5(path.read_bytes()).hexdigest()[:10]
     except Exception: return None
 
+# ============================================================
+# DESCARGA CONCURRENTE
+# ============================================================
+
+async def descargar_cambios(cambios: list, local: dict, indice: dict, inicio: float):
+    """
+    Descarga los días en `cambios` con a lo más MAX_CONCURRENCIA en vuelo.
+    El catálogo local se actualiza apenas cada día queda guardado en disco,
+    así una interrupción no deja checksums de días que no se escribieron.
+    El índice de códigos se actualiza en memoria y se guarda al final.
+    """
+    total = len(cambios)
+    limitador = LimitadorAdaptativo(TASA_INICIAL, max(1.0, float(MAX_CONCURRENCIA)), TASA_MINIMA, TASA_MAXIMA)
+    semaforo = asyncio.Semaphore(MAX_CONCURRENCIA)
+    completados = 0
+
+    async def procesar(session, fecha, checksum_api):
+        nonlocal completados
+        async with semaforo:
+            try:
+                crudo = await fetch_dia(session, limitador, API_URL, API_KEY, fecha)
+                n, ubicaciones = await asyncio.to_thread(guardar_dia_local, fecha, crudo)
+                almacen_local.indexar_dia(indice, fecha, checksum_api, ubicaciones, DATA_DIR)
+                local[fecha] = checksum_api
+                escribir_json(CATALOGO_LOCAL, local)
+                estado = f"✅ {fecha}: {n} licitaciones guardadas"
+            except Exception as e:
+                estado = f"⚠️ Error en {fecha}: {e}"
+            completados += 1
+            t_elapsed = time.time() - inicio
+            t_eta = (t_elapsed / completados) * (total - completados)
+            log(f"({completados}/{total}) {estado} | t={int(t_elapsed)}s ETA={int(t_eta)}s")
+
+    async with http_sesion.crear_sesion_async(API_URL, limite=MAX_CONCURRENCIA) as session:
+        await asyncio.gather(*(procesar(session, f, cs) for f, cs in cambios))
+
+def actualizar_indice(local: dict, indice: dict):
+    """Completa el índice de códigos con días del catálogo aún no indexados y lo guarda."""
+    try:
+        n = almacen_local.sincronizar_indice(indice, DATA_DIR, local, log=log)
+        almacen_local.guardar_indice(indice)
+        if n: log(f"🔎 Índice de códigos completado ({n} días)")
+    except Exception as e:
+        log(f"⚠️ Error actualizando índice de códigos: {e}")
+
+def actualizar_sqlite(local: dict):
+    """Si la réplica SQLite está habilitada, carga los días nuevos o cambiados del catálogo local."""
+    if not base_sqlite.activo():
+        return
+    try:
+        con = base_sqlite.conectar()
+        n = base_sqlite.sincronizar_con_catalogo(con, DATA_DIR, local, log=log)
+        con.close()
+        if n: log(f"🗄️  Réplica SQLite actualizada ({n} días)")
+    except Exception as e:
+        log(f"⚠️ Error actualizando réplica SQLite: {e}")
+
 # ============================================================
 # SINCRONIZACIÓN PRINCIPAL
 # ============================================================
@@ -103,6 +258,7 @@ def sincronizar():
     remoto = [d for d in remoto if (hoy - datetime.date.fromisoformat(d["fecha"])).days <= MAX_DIAS_ATRAS]
 
     local = leer_json(CATALOGO_LOCAL, {})
+    indice = almacen_local.cargar_indice()
     cambios, nuevos, actualizados = [], [], []
 
     for d in remoto:
@@ -117,25 +273,17 @@ def sincronizar():
     total = len(cambios)
     if total == 0:
         log("Base local ya está al día ✅")
+        actualizar_indice(local, indice)
+        actualizar_sqlite(local)
         return
 
-    log(f"Se detectaron {total} días a sincronizar ({len(nuevos)} nuevos, {len(actualizados)} actualizados).")
+    log(f"Se detectaron {total} días a sincronizar ({len(nuevos)} nuevos, {len(actualizados)} actualizados). "
+        f"Concurrencia máx.: {MAX_CONCURRENCIA}, formato: {almacen_local.formato_activo()}")
 
-    for i, (fecha, checksum_api) in enumerate(sorted(cambios), start=1):
-        t_elapsed = time.time() - inicio
-        t_eta = (t_elapsed / i) * (total - i) if i > 0 else 0
-        log(f"({i}/{total}) Descargando {fecha} | t={int(t_elapsed)}s ETA={int(t_eta)}s")
+    asyncio.run(descargar_cambios(sorted(cambios), local, indice, inicio))
 
-        try:
-            data = fetch_dia(API_URL, API_KEY, fecha)
-            guardar_dia_local(fecha, data)
-            local[fecha] = checksum_api
-            escribir_json(CATALOGO_LOCAL, local)
-            log(f"✅ {fecha}: {len(data)} licitaciones guardadas")
-        except Exception as e:
-            log(f"⚠️ Error en {fecha}: {e}")
-
-        time.sleep(PAUSA_ENTRE_DIAS)
+    actualizar_indice(local, indice)
+    actualizar_sqlite(local)
 
     dur = time.time() - inicio
     log(f"===== FIN ({total} días sincronizados en {int(dur)}s) =====")
@@ -8,9 +8,11 @@ aplica filtros del cliente y genera resultados consolidados.
 """
 import sys
 sys.dont_write_bytecode = True
-import argparse, datetime, importlib.util, json, hashlib, time
+import argparse, collections, datetime, functools, importlib.util, json, hashlib, math, os, time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+import almacen_local, base_sqlite, motor_vectorial, normalizacion, versiones
 
 # ========== paths base ==========
 BASE_DIR = Path(__file__).resolve().parent
@@ -69,6 +71,7 @@ def fmt_dur(s: float) -> str:
 
 # ========== filtro duro ==========
 def pasa_filtros_duros(lic: Dict[str, Any], cfg) -> Tuple[bool, str]:
+    """Versión de referencia, sin compilar (la usa --benchmark para comparar)."""
     if lic.get("CodigoEstado") not in set(cfg.ESTADOS_ACEPTABLES):
         return False, f"Estado {lic.get('CodigoEstado')} no aceptable"
     tipo = (lic.get("Tipo") or "").strip().upper()
@@ -86,6 +89,128 @@ def pasa_filtros_duros(lic: Dict[str, Any], cfg) -> Tuple[bool, str]:
     if not lic.get("CodigoExterno") or not lic.get("Nombre"): return False, "Faltan campos básicos"
     return True, ""
 
+@functools.lru_cache(maxsize=1 << 16)
+def _fecha_cierre(s: str) -> Optional[datetime.datetime]:
+    # FechaCierre se repite mucho entre licitaciones (y entre clientes): se parsea una vez
+    return parse_iso(s)
+
+@dataclass(frozen=True)
+class FiltroDuro:
+    """
+    Config de cliente compilada para el filtro duro: conjuntos congelados, cotas
+    numéricas y el instante de referencia fijados una sola vez. Acepta lo mismo que
+    pasa_filtros_duros; las reglas van de la más barata y selectiva a la más cara
+    (estado, tipo, moneda, campos básicos, monto, días al cierre).
+    """
+    estados: FrozenSet[Any]
+    tipos: FrozenSet[str]
+    monedas: FrozenSet[str]
+    monto_minimo: float
+    monto_maximo: float
+    dias_minimos: float
+    ahora: datetime.datetime
+    limite_cierre: datetime.datetime  # cierres antes de esto tienen menos de dias_minimos días
+
+    # orden de evaluación; cada una descarta sólo lo que pasó las anteriores
+    REGLAS = ("estado", "tipo", "moneda", "campos", "monto_minimo", "monto_maximo", "dias")
+
+    def _ok_estado(self, lic: Dict[str, Any]) -> bool:
+        return lic.get("CodigoEstado") in self.estados
+
+    def _ok_tipo(self, lic: Dict[str, Any]) -> bool:
+        tipo = (lic.get("Tipo") or "").strip().upper()
+        return not tipo or tipo in self.tipos
+
+    def _ok_moneda(self, lic: Dict[str, Any]) -> bool:
+        mon = (lic.get("Moneda") or "").strip().upper()
+        return not mon or mon in self.monedas
+
+    def _ok_campos(self, lic: Dict[str, Any]) -> bool:
+        return bool(lic.get("CodigoExterno")) and bool(lic.get("Nombre"))
+
+    def _ok_monto_minimo(self, lic: Dict[str, Any]) -> bool:
+        monto = lic.get("MontoEstimado")
+        return not (isinstance(monto, (int, float)) and monto > 0 and monto < self.monto_minimo)
+
+    def _ok_monto_maximo(self, lic: Dict[str, Any]) -> bool:
+        monto = lic.get("MontoEstimado")
+        return not (isinstance(monto, (int, float)) and monto > 0 and monto > self.monto_maximo)
+
+    def _ok_dias(self, lic: Dict[str, Any]) -> bool:
+        v = lic.get("DiasCierreLicitacion")
+        d = v if type(v) is int else parse_int_safe(v)
+        if d is not None and d >= 0: return d >= self.dias_minimos
+        fc = lic.get("Fechas")
+        fc = _fecha_cierre(fc.get("FechaCierre")) if fc and fc.get("FechaCierre") else None
+        return fc is None or fc >= self.limite_cierre
+
+    def _dias(self, lic: Dict[str, Any]) -> Optional[int]:
+        d = parse_int_safe(lic.get("DiasCierreLicitacion"))
+        if d is not None and d >= 0: return d
+        fc = _fecha_cierre(((lic.get("Fechas") or {}).get("FechaCierre")))
+        return (fc - self.ahora).days if fc else None
+
+    def _motivo(self, regla: str, lic: Dict[str, Any]) -> str:
+        if regla == "estado": return f"Estado {lic.get('CodigoEstado')} no aceptable"
+        if regla == "tipo": return f"Tipo {(lic.get('Tipo') or '').strip().upper()} no aceptable"
+        if regla == "moneda": return f"Moneda {(lic.get('Moneda') or '').strip().upper()} no aceptable"
+        if regla == "campos": return "Faltan campos básicos"
+        if regla == "monto_minimo": return f"Monto {lic.get('MontoEstimado')} < mínimo"
+        if regla == "monto_maximo": return f"Monto {lic.get('MontoEstimado')} > máximo"
+        return f"Días {self._dias(lic)} < mínimos"
+
+    def reglas(self) -> List[Tuple[str, Callable[[Dict[str, Any]], bool]]]:
+        return [(r, getattr(self, "_ok_" + r)) for r in self.REGLAS]
+
+    def regla_rechazo(self, lic: Dict[str, Any]) -> Optional[str]:
+        """None si la licitación pasa; si no, el nombre de la primera regla que falla."""
+        for regla, ok in self.reglas():
+            if not ok(lic): return regla
+        return None
+
+    def motivo_rechazo(self, lic: Dict[str, Any]) -> Optional[str]:
+        """None si la licitación pasa; si no, el motivo del primer filtro que falla."""
+        regla = self.regla_rechazo(lic)
+        return None if regla is None else self._motivo(regla, lic)
+
+    def evaluar(self, lic: Dict[str, Any]) -> Tuple[bool, str]:
+        motivo = self.motivo_rechazo(lic)
+        return motivo is None, motivo or ""
+
+    def filtrar_con_metricas(self, lics: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Aplica las reglas en cascada, cada una sobre lo que dejó la anterior, y retorna
+        (sobrevivientes en el mismo orden, métricas). Las métricas tienen, por regla,
+        cuántas evaluó ("evaluadas"), cuántas descartó ("rechazos") y los segundos
+        que tomó ("segundos"); el total de rechazos es len(lics) - len(sobrevivientes).
+        """
+        quedan = lics if isinstance(lics, list) else list(lics)
+        met: Dict[str, Dict[str, Any]] = {"evaluadas": {}, "rechazos": {}, "segundos": {}}
+        for regla, ok in self.reglas():
+            t0 = time.perf_counter()
+            pasan = [lic for lic in quedan if ok(lic)]
+            met["segundos"][regla] = time.perf_counter() - t0
+            met["evaluadas"][regla] = len(quedan)
+            met["rechazos"][regla] = len(quedan) - len(pasan)
+            quedan = pasan
+        return quedan, met
+
+    def filtrar(self, lics: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Las licitaciones de `lics` que pasan, en el mismo orden."""
+        return self.filtrar_con_metricas(lics)[0]
+
+def compilar_filtro(cfg, ahora: Optional[datetime.datetime] = None) -> FiltroDuro:
+    ahora = ahora or datetime.datetime.now()
+    # (fc - ahora).days < D  <=>  fc - ahora < ceil(D) días
+    return FiltroDuro(
+        estados=frozenset(cfg.ESTADOS_ACEPTABLES),
+        tipos=frozenset(t.upper() for t in cfg.TIPOS_LICITACION_ACEPTABLES),
+        monedas=frozenset(m.upper() for m in cfg.MONEDAS_ACEPTABLES),
+        monto_minimo=cfg.MONTO_MINIMO, monto_maximo=cfg.MONTO_MAXIMO,
+        dias_minimos=cfg.DIAS_MINIMOS_PREPARACION, ahora=ahora,
+        limite_cierre=ahora + datetime.timedelta(days=math.ceil(cfg.DIAS_MINIMOS_PREPARACION)),
+    )
+
 # ========== helpers locales ==========
 def cargar_catalogo_local(catalog_path: Path) -> Dict[str, str]:
     data = leer_json(catalog_path, {})
@@ -107,83 +232,372 @@ def fechas_a_procesar(catalogo: Dict[str, str], max_dias: int) -> List[str]:
 
 def cargar_dia_local(base_dir: Path, fecha: str) -> List[Dict[str, Any]]:
     try:
-        y, m, d = fecha.split("-")
-        path = base_dir / y / m / f"{d}.json"
-        data = leer_json(path, [])
-        return data if isinstance(data, list) else []
+        return almacen_local.leer_dia(base_dir, fecha)
     except Exception:
         return []
 
+def cargar_dia_candidatas(base_dir: Path, fecha: str, checksum: Optional[str], estados,
+                          con=None) -> Tuple[List[Dict[str, Any]], int, List[Tuple[str, Tuple[str, ...]]]]:
+    """
+    (licitaciones a evaluar, total del día, versiones de todo el día). Si la réplica
+    SQLite tiene el día con el mismo checksum, el filtro por CodigoEstado se resuelve
+    en la consulta indexada y sólo se decodifican las que lo pasan; si no, se lee el
+    archivo completo.
+    """
+    if con is not None:
+        try:
+            if base_sqlite.dia_vigente(con, fecha, checksum):
+                entrada, total = base_sqlite.leer_dia(con, fecha, estados)
+                return entrada, total, base_sqlite.versiones_dia(con, fecha, versiones.CAMPOS_VERSION)
+        except Exception:
+            pass
+    entrada = cargar_dia_local(base_dir, fecha)
+    return entrada, len(entrada), versiones.versiones_de(entrada)
+
+def filtrar_dia(entrada: List[Dict[str, Any]], filtros: List[FiltroDuro], consultadas: int,
+                motor: str = "python") -> List[Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]]:
+    """
+    (sobrevivientes, métricas por regla) del día para cada filtro. Con motor "vectorial"
+    el día se aplana una sola vez. Lo que la réplica SQLite no trajo (consultadas -
+    len(entrada)) ya quedó fuera por CodigoEstado y se cuenta en la regla "estado".
+    """
+    if motor == "vectorial" and entrada:
+        tabla = motor_vectorial.aplanar(entrada)
+        res = [motor_vectorial.filtrar_con_metricas(tabla, entrada, f) for f in filtros]
+    else:
+        res = [f.filtrar_con_metricas(entrada) for f in filtros]
+    faltan = consultadas - len(entrada)
+    for _, met in res:
+        met["evaluadas"]["estado"] += faltan
+        met["rechazos"]["estado"] += faltan
+    return res
+
+def resumen_dia(dia: str, consultadas: int, nuevas: List[Dict[str, Any]], met: Dict[str, Dict[str, Any]]
+                ) -> Dict[str, Any]:
+    return {
+        "dia": dia,
+        "consultadas": consultadas,
+        "nuevas": len(nuevas),
+        "descartadas": consultadas - len(nuevas),
+        "rechazos_por_regla": dict(met["rechazos"]),
+        "evaluadas_por_regla": dict(met["evaluadas"]),
+        "ms_por_regla": {r: round(seg * 1000, 3) for r, seg in met["segundos"].items()},
+    }
+
+def depurar_duplicados(pares: List[Tuple[str, Dict[str, Any]]], resumen_por_dia: List[Dict[str, Any]],
+                       dedup: Optional[versiones.DeduplicadorVersiones]) -> List[Dict[str, Any]]:
+    """
+    Deja sólo la versión vigente de cada código entre los sobrevivientes (día, licitación)
+    y anota en cada día cuántos quedaron fuera por duplicados. Sin `dedup`, no descarta nada.
+    """
+    if dedup is None:
+        return [lic for _, lic in pares]
+    out: List[Dict[str, Any]] = []
+    duplicadas: Dict[str, int] = collections.Counter()
+    vigentes = dedup.vigentes((almacen_local.codigo_de(lic), versiones.clave_version(dia, lic)) for dia, lic in pares)
+    for (dia, lic), ok in zip(pares, vigentes):
+        if ok: out.append(lic)
+        else: duplicadas[dia] += 1
+    for d in resumen_por_dia:
+        d["duplicadas"] = duplicadas[d["dia"]]
+        d["nuevas"] -= d["duplicadas"]
+    return out
+
+# ========== checkpoint incremental ==========
+# Por cliente, en DIRECTORIO_SALIDA: qué (día, checksum del catálogo, firma del archivo) ya se
+# filtraron con qué hash_config, con sus sobrevivientes y las versiones (código, fechas) de todo
+# el día. La firma cubre las reescrituras de 5_comprobar_vigencia.py, que cambian CodigoEstado sin
+# tocar el catálogo. Si cambia el config se descarta completo.
+NOMBRE_CHECKPOINT = "checkpoint_filtro_duro.json"
+
+def directorio_salida(cfg) -> Path:
+    return Path(getattr(cfg, "DIRECTORIO_SALIDA", f"./resultados/{slug(cfg.NOMBRE_CLIENTE)}"))
+
+def cargar_checkpoint(cfg, chash: str) -> Dict[str, Any]:
+    data = leer_json(directorio_salida(cfg) / NOMBRE_CHECKPOINT, {})
+    if (not isinstance(data, dict) or chash == "nohash" or data.get("config_hash") != chash
+            or not isinstance(data.get("dias"), dict)):
+        return {"config_hash": chash, "dias": {}}
+    return data
+
+def dia_en_checkpoint(ckpt: Dict[str, Any], dia: str, checksum: Optional[str],
+                      firma: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Entrada del día si se filtró con el mismo checksum y el mismo archivo; None si hay que filtrarlo."""
+    ent = ckpt["dias"].get(dia)
+    if not checksum or not isinstance(ent, dict) or ent.get("checksum") != checksum: return None
+    if not firma or ent.get("firma") != firma: return None
+    # checkpoint anterior a la deduplicación o a las métricas por regla
+    if not isinstance(ent.get("versiones"), list) or not isinstance(ent.get("rechazos"), dict): return None
+    return ent
+
+def anotar_checkpoint(ckpt: Dict[str, Any], dia: str, checksum: Optional[str], firma: Optional[str],
+                      consultadas: int, nuevas: List[Dict[str, Any]], vers: List[Tuple[str, Tuple[str, ...]]],
+                      met: Dict[str, Dict[str, Any]]):
+    ckpt["dias"][dia] = {"checksum": checksum, "firma": firma, "consultadas": consultadas, "licitaciones": nuevas,
+                         "versiones": vers, "evaluadas": met["evaluadas"], "rechazos": met["rechazos"]}
+
+def guardar_checkpoint(cfg, ckpt: Dict[str, Any], dias: List[str]):
+    """Escribe el checkpoint (atómico) conservando sólo los días de la ventana actual."""
+    vigentes = set(dias)
+    ckpt["dias"] = {d: v for d, v in ckpt["dias"].items() if d in vigentes}
+    path = directorio_salida(cfg) / NOMBRE_CHECKPOINT
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def nuevas_desde_checkpoint(ent: Dict[str, Any], filtro: "FiltroDuro"
+                            ) -> Tuple[List[Dict[str, Any]], int, Dict[str, Dict[str, Any]]]:
+    """
+    (sobrevivientes, consultadas, métricas) de un día del checkpoint. Los sobrevivientes se
+    re-filtran: los días al cierre bajan con el tiempo y uno de ayer puede no pasar hoy. Como
+    "dias" es la última regla, lo que evaluó cada regla no cambia; sólo suman rechazos.
+    """
+    nuevas, met = filtro.filtrar_con_metricas(ent.get("licitaciones") or [])
+    met["evaluadas"] = dict(ent["evaluadas"])
+    met["rechazos"] = {r: ent["rechazos"].get(r, 0) + n for r, n in met["rechazos"].items()}
+    return nuevas, int(ent.get("consultadas") or 0), met
+
+def versiones_desde_checkpoint(ent: Dict[str, Any]) -> List[Tuple[str, Tuple[str, ...]]]:
+    return [(cod, tuple(campos)) for cod, campos in ent["versiones"]]
+
 # ========== proceso principal ==========
+def resultado_vacio(cfg, cfg_path: Path) -> Dict[str, Any]:
+    return {
+        "cliente": cfg.NOMBRE_CLIENTE, "config_hash": hash_config(cfg_path),
+        "generado": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+        "rango_dias": 0, "total_consultadas": 0, "nuevas_filtradas": 0,
+        "descartadas_por_filtro": 0, "duplicadas_descartadas": 0, "detalle_por_dia": [], "licitaciones": []
+    }
+
+UMBRAL_ALERTA_REGLA = 0.99  # una regla que descarta este % de lo que evalúa merece revisar el config
+
+def metricas_por_regla(resumen_por_dia: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Totales por regla del período, en orden de evaluación."""
+    out = []
+    for regla in FiltroDuro.REGLAS:
+        evaluadas = sum(d.get("evaluadas_por_regla", {}).get(regla, 0) for d in resumen_por_dia)
+        rechazos = sum(d.get("rechazos_por_regla", {}).get(regla, 0) for d in resumen_por_dia)
+        out.append({
+            "regla": regla, "evaluadas": evaluadas, "rechazos": rechazos,
+            "pct_rechazo": round(100.0 * rechazos / evaluadas, 2) if evaluadas else 0.0,
+            "ms": round(sum(d.get("ms_por_regla", {}).get(regla, 0.0) for d in resumen_por_dia), 3),
+        })
+    return out
+
+def cerrar_resultado(cfg, chash: str, total_dias: int, resumen_por_dia: List[Dict[str, Any]],
+                     nuevas_global: List[Dict[str, Any]], dry_run: bool) -> Dict[str, Any]:
+    """
+    Arma el resultado consolidado del cliente y sus métricas por regla, los escribe
+    (salvo dry_run) e imprime su resumen.
+    """
+    nombre = cfg.NOMBRE_CLIENTE
+    total_consultadas = sum(d["consultadas"] for d in resumen_por_dia)
+    total_descartadas = sum(d["descartadas"] for d in resumen_por_dia)
+    total_duplicadas = sum(d.get("duplicadas", 0) for d in resumen_por_dia)
+    normalizacion.anotar(nuevas_global)  # texto normalizado para las keywords de 2_scoring.py
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    out = {
+        "cliente": nombre, "config_hash": chash, "generado": ts,
+        "rango_dias": total_dias, "total_consultadas": total_consultadas,
+        "nuevas_filtradas": len(nuevas_global), "descartadas_por_filtro": total_descartadas,
+        "duplicadas_descartadas": total_duplicadas,
+        "detalle_por_dia": resumen_por_dia, "licitaciones": nuevas_global,
+    }
+
+    out_dir = directorio_salida(cfg)
+    if not dry_run:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        escribir_json(out_dir / f"resultados_consolidados_{ts}.json", out)
+
+    reglas = metricas_por_regla(resumen_por_dia)
+    if not dry_run:
+        escribir_json(out_dir / f"metricas_filtro_{ts}.json", {
+            "cliente": nombre, "config_hash": chash, "generado": ts, "rango_dias": total_dias,
+            "total_consultadas": total_consultadas, "reglas": reglas,
+            "por_dia": [{k: d.get(k) for k in ("dia", "consultadas", "rechazos_por_regla",
+                                                "evaluadas_por_regla", "ms_por_regla")}
+                        for d in resumen_por_dia],
+        })
+
+    print(f"- {nombre} [{chash}]: nuevas={len(nuevas_global)}, descartadas={total_descartadas}, "
+          f"duplicadas={total_duplicadas}, consultadas={total_consultadas}")
+    print("   rechazos: " + ", ".join(f"{r['regla']}={r['rechazos']} ({r['pct_rechazo']}%, {r['ms']:.0f}ms)"
+                                    for r in reglas if r["evaluadas"]))
+    for r in reglas:
+        if r["evaluadas"] and r["rechazos"] >= UMBRAL_ALERTA_REGLA * r["evaluadas"]:
+            print(f"   ⚠️ la regla '{r['regla']}' descarta {r['pct_rechazo']}% de lo que evalúa")
+    return out
+
 def procesar_cliente_local(cfg, cfg_path: Path, base_dir: Path, catalog_path: Path,
-                           max_dias_cli: int, dry_run: bool=False):
-    nombre, scli, chash = cfg.NOMBRE_CLIENTE, slug(cfg.NOMBRE_CLIENTE), hash_config(cfg_path)
+                           max_dias_cli: int, dry_run: bool=False, con_sqlite=None, motor: str="python",
+                           usar_checkpoint: bool=True, deduplicar: bool=True):
+    nombre, chash = cfg.NOMBRE_CLIENTE, hash_config(cfg_path)
 
     catalogo = cargar_catalogo_local(catalog_path)
     if not catalogo:
         print(f"[{nombre}] ❌ No se encontró catálogo local en {catalog_path}")
-        return {
-            "cliente": nombre, "config_hash": chash, "generado": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "rango_dias": 0, "total_consultadas": 0, "nuevas_filtradas": 0,
-            "descartadas_por_filtro": 0, "detalle_por_dia": [], "licitaciones": []
-        }
+        return resultado_vacio(cfg, cfg_path)
 
     dias = fechas_a_procesar(catalogo, max_dias_cli)
     total_dias = len(dias)
     if total_dias == 0:
         print(f"- {nombre} [{chash}]: no hay días que procesar (catálogo vacío).")
-        return {
-            "cliente": nombre, "config_hash": chash, "generado": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "rango_dias": 0, "total_consultadas": 0, "nuevas_filtradas": 0,
-            "descartadas_por_filtro": 0, "detalle_por_dia": [], "licitaciones": []
-        }
+        return resultado_vacio(cfg, cfg_path)
 
     t0 = time.time()
-    nuevas_global: List[Dict[str, Any]] = []
+    filtro = compilar_filtro(cfg)
+    ckpt = cargar_checkpoint(cfg, chash) if usar_checkpoint else {"config_hash": chash, "dias": {}}
+    dedup = versiones.DeduplicadorVersiones() if deduplicar else None
+    nuevas_global: List[Tuple[str, Dict[str, Any]]] = []  # (día, licitación)
     resumen_por_dia: List[Dict[str, Any]] = []
-    total_consultadas = total_descartadas = 0
 
     for i, dia_str in enumerate(dias, start=1):
         elapsed = time.time() - t0
         eta = (elapsed / i) * (total_dias - i) if i > 0 else 0
-        print(f"[{nombre}] Día {i}/{total_dias} → {dia_str} | t={fmt_dur(elapsed)} ETA={fmt_dur(eta)}")
-
-        entrada = cargar_dia_local(base_dir, dia_str)
-        consultadas = len(entrada)
-        nuevas_dia: List[Dict[str, Any]] = []
-        descartadas_dia = 0
-
-        for lic in entrada:
-            ok, _ = pasa_filtros_duros(lic, cfg)
-            if ok: nuevas_dia.append(lic)
-            else:  descartadas_dia += 1
-
-        nuevas_global.extend(nuevas_dia)
-        total_consultadas += consultadas
-        total_descartadas += descartadas_dia
-
-        resumen_por_dia.append({
-            "dia": dia_str,
-            "consultadas": consultadas,
-            "nuevas": len(nuevas_dia),
-            "descartadas": descartadas_dia
+        checksum = catalogo.get(dia_str)
+        firma = almacen_local.firma_dia(base_dir, dia_str)  # antes de leer: si cambia durante la lectura, se relee
+        ent = dia_en_checkpoint(ckpt, dia_str, checksum, firma)
+        print(f"[{nombre}] Día {i}/{total_dias} → {dia_str}{' (checkpoint)' if ent else ''} | t={fmt_dur(elapsed)} ETA={fmt_dur(eta)}")
+
+        if ent:
+            nuevas_dia, consultadas, met = nuevas_desde_checkpoint(ent, filtro)
+            vers_dia = versiones_desde_checkpoint(ent)
+        else:
+            entrada, consultadas, vers_dia = cargar_dia_candidatas(base_dir, dia_str, checksum,
+                                                                   cfg.ESTADOS_ACEPTABLES, con_sqlite)
+            nuevas_dia, met = filtrar_dia(entrada, [filtro], consultadas, motor)[0]
+            anotar_checkpoint(ckpt, dia_str, checksum, firma, consultadas, nuevas_dia, vers_dia, met)
+        if dedup is not None:
+            dedup.observar_dia(dia_str, vers_dia)
+
+        nuevas_global.extend((dia_str, lic) for lic in nuevas_dia)
+        resumen_por_dia.append(resumen_dia(dia_str, consultadas, nuevas_dia, met))
+
+    if not dry_run:
+        guardar_checkpoint(cfg, ckpt, dias)
+    return cerrar_resultado(cfg, chash, total_dias, resumen_por_dia,
+                            depurar_duplicados(nuevas_global, resumen_por_dia, dedup), dry_run)
+
+def procesar_clientes_local(clientes: List[Tuple[Any, Path, int]], base_dir: Path, catalog_path: Path,
+                            dry_run: bool=False, con_sqlite=None, motor: str="python",
+                            usar_checkpoint: bool=True, deduplicar: bool=True) -> List[Dict[str, Any]]:
+    """
+    Una sola pasada por base_local para todos los clientes: cada día se lee una vez y
+    cada licitación se evalúa contra los clientes cuyo rango (MAX_DIAS_ATRAS) incluye
+    ese día. `clientes` es [(cfg, cfg_path, max_dias), ...]; el resultado de cada
+    cliente es el mismo que daría procesar_cliente_local. Un día sólo se lee si algún
+    cliente no lo tiene en su checkpoint con el checksum vigente. Las versiones vistas
+    se comparten entre clientes: la vigente de un código no depende del cliente.
+    """
+    catalogo = cargar_catalogo_local(catalog_path)
+    if not catalogo:
+        for cfg, p, _ in clientes:
+            print(f"[{cfg.NOMBRE_CLIENTE}] ❌ No se encontró catálogo local en {catalog_path}")
+        return [resultado_vacio(cfg, p) for cfg, p, _ in clientes]
+
+    # los días de cada cliente son un prefijo de la lista completa (más recientes primero)
+    todas = fechas_a_procesar(catalogo, None)
+    ahora = datetime.datetime.now()
+    estado = []
+    for cfg, p, max_dias in clientes:
+        chash = hash_config(p)
+        estado.append({
+            "cfg": cfg, "filtro": compilar_filtro(cfg, ahora), "chash": chash,
+            "n_dias": len(fechas_a_procesar(catalogo, max_dias)),
+            "ckpt": cargar_checkpoint(cfg, chash) if usar_checkpoint else {"config_hash": chash, "dias": {}},
+            "nuevas": [], "resumen": [],
         })
+    dias = todas[:max((e["n_dias"] for e in estado), default=0)]
+    total_dias = len(dias)
+    dedup = versiones.DeduplicadorVersiones() if deduplicar else None
 
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    out = {
-        "cliente": nombre, "config_hash": chash, "generado": ts,
-        "rango_dias": total_dias, "total_consultadas": total_consultadas,
-        "nuevas_filtradas": len(nuevas_global), "descartadas_por_filtro": total_descartadas,
-        "detalle_por_dia": resumen_por_dia, "licitaciones": nuevas_global,
-    }
+    # con SQLite se empuja la unión de estados aceptables; cada cliente filtra el suyo después
+    estados_union: List[Any] = []
+    for cfg, _, _ in clientes:
+        estados_union.extend(e for e in cfg.ESTADOS_ACEPTABLES if e not in estados_union)
 
-    out_dir = Path(getattr(cfg, "DIRECTORIO_SALIDA", f"./resultados/{scli}"))
+    t0 = time.time()
+    for i, dia_str in enumerate(dias, start=1):
+        activos = [e for e in estado if i <= e["n_dias"]]
+        checksum = catalogo.get(dia_str)
+        firma = almacen_local.firma_dia(base_dir, dia_str)
+        guardados = {id(e): dia_en_checkpoint(e["ckpt"], dia_str, checksum, firma) for e in activos}
+        pendientes = [e for e in activos if guardados[id(e)] is None]
+        elapsed = time.time() - t0
+        eta = (elapsed / i) * (total_dias - i) if i > 0 else 0
+        print(f"[{len(activos)} clientes, {len(activos) - len(pendientes)} desde checkpoint] "
+              f"Día {i}/{total_dias} → {dia_str} | t={fmt_dur(elapsed)} ETA={fmt_dur(eta)}")
+
+        por_cliente: Dict[int, Tuple[List[Dict[str, Any]], int, Dict[str, Dict[str, Any]]]] = {}
+        vers_dia: List[Tuple[str, Tuple[str, ...]]] = []
+        for e in activos:
+            if guardados[id(e)] is not None:
+                por_cliente[id(e)] = nuevas_desde_checkpoint(guardados[id(e)], e["filtro"])
+                vers_dia = versiones_desde_checkpoint(guardados[id(e)])
+        if pendientes:
+            entrada, consultadas, vers_dia = cargar_dia_candidatas(base_dir, dia_str, checksum,
+                                                                   estados_union, con_sqlite)
+            filtrados = filtrar_dia(entrada, [e["filtro"] for e in pendientes], consultadas, motor)
+            for e, (nuevas, met) in zip(pendientes, filtrados):
+                por_cliente[id(e)] = (nuevas, consultadas, met)
+                anotar_checkpoint(e["ckpt"], dia_str, checksum, firma, consultadas, nuevas, vers_dia, met)
+        if dedup is not None:
+            dedup.observar_dia(dia_str, vers_dia)
+
+        for e in activos:
+            nuevas, consultadas, met = por_cliente[id(e)]
+            e["nuevas"].extend((dia_str, lic) for lic in nuevas)
+            e["resumen"].append(resumen_dia(dia_str, consultadas, nuevas, met))
+
+    # los clientes comparten los dicts de las licitaciones y cerrar_resultado los anota
+    # (normalizacion): todos los checkpoints se escriben antes de cerrar ninguno
     if not dry_run:
-        out_dir.mkdir(parents=True, exist_ok=True)
-        escribir_json(out_dir / f"resultados_consolidados_{ts}.json", out)
-
-    print(f"- {nombre} [{chash}]: nuevas={len(nuevas_global)}, descartadas={total_descartadas}, consultadas={total_consultadas}")
-    return out
+        for e, (cfg, _, _) in zip(estado, clientes):
+            if e["n_dias"]: guardar_checkpoint(cfg, e["ckpt"], dias[:e["n_dias"]])
+    salidas = []
+    for e, (cfg, p, _) in zip(estado, clientes):
+        if e["n_dias"] == 0:
+            print(f"- {cfg.NOMBRE_CLIENTE} [{e['chash']}]: no hay días que procesar (catálogo vacío).")
+            salidas.append(resultado_vacio(cfg, p))
+            continue
+        salidas.append(cerrar_resultado(cfg, e["chash"], e["n_dias"], e["resumen"],
+                                        depurar_duplicados(e["nuevas"], e["resumen"], dedup), dry_run))
+    return salidas
+
+# ========== benchmark ==========
+def benchmark_filtro(clientes: List[Tuple[Any, Path, int]], base_dir: Path, catalog_path: Path,
+                     repeticiones: int = 3):
+    """
+    Registros/segundo de pasa_filtros_duros (sin compilar) vs FiltroDuro.filtrar sobre
+    los días de cada cliente, verificando que ambos acepten exactamente lo mismo.
+    """
+    catalogo = cargar_catalogo_local(catalog_path)
+    dias = fechas_a_procesar(catalogo, max((m for _, _, m in clientes), default=0) or None)
+    registros_dia = {d: cargar_dia_local(base_dir, d) for d in dias}
+
+    def medir(fn) -> Tuple[float, List[Dict[str, Any]]]:
+        mejor, res = float("inf"), []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            res = fn()
+            mejor = min(mejor, time.perf_counter() - t0)
+        return mejor, res
+
+    filas = []
+    for cfg, _, max_dias in clientes:
+        regs = [lic for d in fechas_a_procesar(catalogo, max_dias) for lic in registros_dia[d]]
+        if not regs: continue
+        filtro = compilar_filtro(cfg)
+        t_ref, ok_ref = medir(lambda: [lic for lic in regs if pasa_filtros_duros(lic, cfg)[0]])
+        t_comp, ok_comp = medir(lambda: filtro.filtrar(regs))
+        igual = [id(x) for x in ok_ref] == [id(x) for x in ok_comp]
+        filas.append((cfg.NOMBRE_CLIENTE, len(regs), len(regs) / t_ref, len(regs) / t_comp, igual))
+
+    print(f"{'cliente':<24}{'registros':>10}{'antes reg/s':>14}{'compilado reg/s':>17}{'x':>7}  mismo resultado")
+    for nombre, n, antes, despues, igual in filas:
+        print(f"{nombre:<24}{n:>10}{antes:>14,.0f}{despues:>17,.0f}{despues/antes:>7.2f}  {'✅' if igual else '❌'}")
 
 # ========== main ==========
 def main():
@@ -193,6 +607,17 @@ def main():
     ap.add_argument("--catalog",  default=str(BASE_DIR / "catalog_local.json"), help="Ruta a catalog_local.json")
     ap.add_argument("--max-dias", type=int, default=None, help="Límite de días hacia atrás a procesar")
     ap.add_argument("--dry-run",  action="store_true")
+    ap.add_argument("--db", default=str(base_sqlite.RUTA_DB), help="Réplica SQLite (si BASE_LOCAL_SQLITE=1)")
+    ap.add_argument("--por-cliente", action="store_true",
+                    help="Recorre base_local una vez por cliente (modo anterior) en vez de una sola pasada")
+    ap.add_argument("--motor", choices=["python", "vectorial"], default="python",
+                    help="vectorial: evalúa el filtro por columnas con pandas/NumPy (motor_vectorial.py)")
+    ap.add_argument("--sin-checkpoint", action="store_true",
+                    help="Ignora el checkpoint incremental y vuelve a filtrar todos los días")
+    ap.add_argument("--sin-dedup", action="store_true",
+                    help="No descarta versiones anteriores de un mismo CodigoExterno (comportamiento previo)")
+    ap.add_argument("--benchmark", action="store_true",
+                    help="Mide registros/s del filtro sin compilar vs compilado (no escribe resultados)")
     args = ap.parse_args()
 
     cfg_paths = sorted(Path(args.clientes_dir).glob("*_config.py"))
@@ -202,14 +627,35 @@ def main():
 
     base_dir = Path(args.base_dir)
     catalog_path = Path(args.catalog)
+    con_sqlite = base_sqlite.conectar_si_activo(Path(args.db))
+    if con_sqlite is not None:
+        print(f"Usando réplica SQLite: {args.db}")
 
-    resumen_global = []
+    clientes = []
     for p in cfg_paths:
         cfg = cargar_config(p)
         max_dias_cli = args.max_dias if args.max_dias is not None else getattr(cfg, "MAX_DIAS_ATRAS", 30)
-        res = procesar_cliente_local(
-            cfg, p, base_dir, catalog_path, max_dias_cli, dry_run=args.dry_run
-        )
+        clientes.append((cfg, p, max_dias_cli))
+
+    if args.benchmark:
+        benchmark_filtro(clientes, base_dir, catalog_path)
+        return
+
+    if args.por_cliente:
+        resultados = [
+            procesar_cliente_local(cfg, p, base_dir, catalog_path, max_dias_cli,
+                                   dry_run=args.dry_run, con_sqlite=con_sqlite, motor=args.motor,
+                                   usar_checkpoint=not args.sin_checkpoint, deduplicar=not args.sin_dedup)
+            for cfg, p, max_dias_cli in clientes
+        ]
+    else:
+        resultados = procesar_clientes_local(clientes, base_dir, catalog_path,
+                                             dry_run=args.dry_run, con_sqlite=con_sqlite, motor=args.motor,
+                                             usar_checkpoint=not args.sin_checkpoint,
+                                             deduplicar=not args.sin_dedup)
+
+    resumen_global = []
+    for res in resultados:
         resumen_global.append({
             "cliente": res["cliente"], "hash": res.get("config_hash"),
             "nuevas": res.get("nuevas_filtradas", 0),
@@ -3,9 +3,12 @@
 
 import sys
 sys.dont_write_bytecode = True
-import argparse, importlib.util, json, re, datetime, random
+import argparse, collections, hashlib, heapq, importlib.util, itertools, json, os, re, datetime, random, time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import flujo_json, normalizacion
 
 # -------- util --------
 
@@ -40,7 +43,7 @@ def cargar_config(path: Path):
 def texto(lic: Dict[str, Any]) -> str:
     return (str(lic.get("Nombre") or "") + " " + str(lic.get("Descripcion") or "")).lower()
 
-def dias_hasta_cierre(lic: Dict[str, Any]) -> Optional[int]:
+def dias_hasta_cierre(lic: Dict[str, Any], ahora: Optional[datetime.datetime] = None) -> Optional[int]:
     v = lic.get("DiasCierreLicitacion")
     if v is not None and str(v).strip() != "":
         try: return int(str(v).strip())
@@ -51,7 +54,7 @@ def dias_hasta_cierre(lic: Dict[str, Any]) -> Optional[int]:
     try:
         base = str(fc).rstrip("Z").split(".")[0]
         dt = datetime.fromisoformat(base)
-        return (dt - datetime.now()).days
+        return (dt - (ahora or datetime.now())).days
     except Exception:
         return None
 
@@ -63,36 +66,134 @@ def extraer_unspsc(lic: Dict[str, Any]) -> List[str]:
         if code and code.isdigit(): out.append(code)
     return out
 
+# -------- keywords --------
+
+def keywords_encontradas_regex(body: str, keywords) -> List[str]:
+    """Referencia: un re.search con \\b por keyword (lo usa --benchmark-tematico para comparar)."""
+    found = []
+    for kw in keywords:
+        if re.search(r"\b" + re.escape(str(kw).lower()) + r"\b", body):
+            found.append(str(kw).lower())
+    return found
+
+class MatcherKeywords:
+    """
+    KEYWORDS_TEMATICAS y KEYWORDS_PENALIZADORAS compiladas una vez. Una sola regex
+    con lookahead marca las posiciones donde empieza alguna keyword (también las que
+    se solapan) y ahí se verifica cada candidata de esa letra con su patrón \\b...\\b,
+    así el resultado es exactamente el de un re.search por keyword.
+    """
+    def __init__(self, positivas, negativas):
+        self.positivas = {str(k).lower() for k in positivas}
+        self.negativas = {str(k).lower() for k in negativas}
+        todas = sorted((self.positivas | self.negativas) - {""}, key=len, reverse=True)
+        self._inicio = re.compile("(?=" + "|".join(re.escape(k) for k in todas) + ")") if todas else None
+        self._por_letra: Dict[str, List[Tuple[str, Any]]] = {}
+        for k in todas:
+            self._por_letra.setdefault(k[0], []).append((k, re.compile(r"\b" + re.escape(k) + r"\b")))
+        self._vacia = "" in (self.positivas | self.negativas)  # r"\b\b": cualquier borde de palabra
+
+    def encontrar(self, body: str) -> Tuple[set, set]:
+        """(positivas encontradas, penalizadoras encontradas) en minúsculas."""
+        hallados = set()
+        if self._inicio is not None:
+            for m in self._inicio.finditer(body):
+                p = m.start()
+                for k, rx in self._por_letra[body[p]]:
+                    if k not in hallados and rx.match(body, p):
+                        hallados.add(k)
+        if self._vacia and re.search(r"\b\b", body):
+            hallados.add("")
+        return hallados & self.positivas, hallados & self.negativas
+
+def normaliza_texto(cfg) -> bool:
+    return bool(getattr(cfg, "NORMALIZAR_TEXTO", False))
+
+def texto_keywords(lic: Dict[str, Any], cfg) -> str:
+    """Texto donde se buscan las keywords: normalizado (sin tildes, tokens) o el original en minúsculas."""
+    return normalizacion.texto_normalizado(lic) if normaliza_texto(cfg) else texto(lic)
+
+def listas_keywords(cfg) -> Tuple[List[Any], List[Any]]:
+    """(positivas, penalizadoras) tal como se buscan en texto_keywords."""
+    pos, neg = cfg.KEYWORDS_TEMATICAS, getattr(cfg, "KEYWORDS_PENALIZADORAS", []) or []
+    if normaliza_texto(cfg):
+        return normalizacion.keywords_normalizadas(pos), normalizacion.keywords_normalizadas(neg)
+    return list(pos), list(neg)
+
+def matcher_keywords(cfg) -> MatcherKeywords:
+    """Matcher del cliente, compilado la primera vez y guardado en el módulo de config."""
+    m = getattr(cfg, "_matcher_keywords", None)
+    if m is None:
+        m = MatcherKeywords(*listas_keywords(cfg))
+        cfg._matcher_keywords = m
+    return m
+
+# -------- UNSPSC --------
+
+NIVELES_UNSPSC = ((8, 1.0), (6, 0.8), (4, 0.6), (2, 0.4))  # dígitos en común -> profundidad
+
+def mejor_unspsc_lineal(lc: str, rel_codes: List[str]) -> Tuple[float, Optional[str]]:
+    """Referencia: compara el código con cada relevante (lo usa --benchmark-tematico)."""
+    m_local = 0.0; m_with = None
+    for rc in rel_codes:
+        depth = 0.0
+        if len(lc) >= 8 and len(rc) >= 8:
+            if lc[:8] == rc[:8]: depth = 1.0
+            elif lc[:6] == rc[:6]: depth = 0.8
+            elif lc[:4] == rc[:4]: depth = 0.6
+            elif lc[:2] == rc[:2]: depth = 0.4
+        if depth > m_local:
+            m_local, m_with = depth, rc
+    return m_local, m_with
+
+class IndiceUNSPSC:
+    """
+    Prefijos de 8/6/4/2 dígitos de CATEGORIAS_UNSPSC_RELEVANTES -> primer código
+    relevante (en el orden del config) que los tiene. Un código de la licitación
+    se resuelve con a lo más cuatro búsquedas, del nivel más profundo al menor,
+    con el mismo resultado que comparar contra toda la lista.
+    """
+    def __init__(self, rel_codes: Iterable[Any]):
+        self._prefijos: Dict[str, str] = {}  # largos distintos por nivel: no chocan entre sí
+        for rc in (str(c) for c in rel_codes):
+            if len(rc) < 8: continue
+            for n, _ in NIVELES_UNSPSC:
+                self._prefijos.setdefault(rc[:n], rc)
+
+    def mejor(self, lc: str) -> Tuple[float, Optional[str]]:
+        """(profundidad, código relevante) del mejor calce; (0.0, None) si no hay."""
+        if len(lc) >= 8:
+            for n, depth in NIVELES_UNSPSC:
+                rc = self._prefijos.get(lc[:n])
+                if rc is not None: return depth, rc
+        return 0.0, None
+
+def indice_unspsc(cfg) -> IndiceUNSPSC:
+    """Índice del cliente, armado la primera vez y guardado en el módulo de config."""
+    idx = getattr(cfg, "_indice_unspsc", None)
+    if idx is None:
+        idx = IndiceUNSPSC(cfg.CATEGORIAS_UNSPSC_RELEVANTES)
+        cfg._indice_unspsc = idx
+    return idx
+
 # -------- scoring --------
 
 def score_match_tematico(lic: Dict[str, Any], cfg) -> Tuple[float, Dict[str, Any]]:
     # UNSPSC (profundidad 2/4/6/8)
     lic_codes = extraer_unspsc(lic)
-    rel_codes = [str(c) for c in cfg.CATEGORIAS_UNSPSC_RELEVANTES]
+    idx = indice_unspsc(cfg)
     best_unspsc = 0.0
     hits_unspsc: List[Tuple[str, str, float]] = []
     for lc in lic_codes:
-        m_local = 0.0; m_with = None
-        for rc in rel_codes:
-            depth = 0.0
-            if len(lc) >= 8 and len(rc) >= 8:
-                if lc[:8] == rc[:8]: depth = 1.0
-                elif lc[:6] == rc[:6]: depth = 0.8
-                elif lc[:4] == rc[:4]: depth = 0.6
-                elif lc[:2] == rc[:2]: depth = 0.4
-            if depth > m_local:
-                m_local, m_with = depth, rc
+        m_local, m_with = idx.mejor(lc)
         best_unspsc = max(best_unspsc, m_local)
         if m_with and m_local > 0:
             hits_unspsc.append((lc, m_with, m_local))
 
-    # Keywords positivas
-    body = texto(lic)
-    found_pos = []
-    for kw in cfg.KEYWORDS_TEMATICAS:
-        if re.search(r"\b" + re.escape(str(kw).lower()) + r"\b", body):
-            found_pos.append(str(kw).lower())
-    n_pos = len(set(found_pos))
+    # Keywords positivas y penalizadoras, en una sola pasada por el texto
+    body = texto_keywords(lic, cfg)
+    found_pos, found_neg = matcher_keywords(cfg).encontrar(body)
+    n_pos = len(found_pos)
 
     # Puntaje por keywords positivas (como antes)
     if cfg.MIN_KEYWORDS_MATCH <= 0:
@@ -105,12 +206,7 @@ def score_match_tematico(lic: Dict[str, Any], cfg) -> Tuple[float, Dict[str, Any
     mt_base = max(0.0, min(mt_base, 1.0)) * 100.0
 
     # ---------- Balance positivo/negativo ----------
-    penal_list = getattr(cfg, "KEYWORDS_PENALIZADORAS", []) or []
-    found_neg = []
-    for kw in penal_list:
-        if re.search(r"\b" + re.escape(str(kw).lower()) + r"\b", body):
-            found_neg.append(str(kw).lower())
-    n_neg = len(set(found_neg))
+    n_neg = len(found_neg)
 
     # Parámetros con defaults seguros
     peso_neg = float(getattr(cfg, "PESO_NEGATIVO", 1.5))         # cuánto pesa cada negativa vs una positiva
@@ -156,8 +252,9 @@ def score_viabilidad_financiera(lic: Dict[str, Any], cfg) -> Tuple[float, Dict[s
     val = max(0.0, min(1.0,(hi-monto)/float(hi-b)))*100.0
     return val, {"monto": monto, "rango":[a,b]}
 
-def score_oportunidad_temporal(lic: Dict[str, Any], cfg) -> Tuple[float, Dict[str, Any]]:
-    d = dias_hasta_cierre(lic)
+def score_oportunidad_temporal(lic: Dict[str, Any], cfg, ahora: Optional[datetime.datetime] = None
+                               ) -> Tuple[float, Dict[str, Any]]:
+    d = dias_hasta_cierre(lic, ahora)
     if d is None: return 0.0, {"dias": None, "nota":"sin_fecha_cierre"}
     if d <= cfg.DIAS_MINIMOS_PREPARACION: return 0.0, {"dias": d}
     if d >= cfg.DIAS_OPTIMOS_PREPARACION: return 100.0, {"dias": d}
@@ -178,45 +275,238 @@ def combinar_scores(sub: Dict[str, float], cfg) -> float:
            + P["ventaja_geografica"]*sub["ventaja_geografica"]) / 100.0
     return round(total, 2)
 
+# -------- cache del match temático --------
+
+NOMBRE_CACHE = "cache_scoring.json"
+VERSION_TEMATICO = 1  # subir si cambia el cálculo de score_match_tematico
+PARAMETROS_TEMATICO = (
+    "CATEGORIAS_UNSPSC_RELEVANTES", "KEYWORDS_TEMATICAS", "KEYWORDS_PENALIZADORAS",
+    "PESO_CATEGORIA_UNSPSC", "PESO_KEYWORDS", "MIN_KEYWORDS_MATCH",
+    "PESO_NEGATIVO", "AJUSTE_BALANCE_FACTOR", "NORMALIZAR_TEXTO",
+)
+
+def _sha1(data: Any) -> str:
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def huella_tematica(cfg) -> str:
+    """Huella de los parámetros del config que usa score_match_tematico (y nada más)."""
+    return _sha1([VERSION_TEMATICO, {k: getattr(cfg, k, None) for k in PARAMETROS_TEMATICO}])[:16]
+
+def hash_contenido(lic: Dict[str, Any]) -> str:
+    """Hash de los campos de la licitación que usa score_match_tematico."""
+    return _sha1([lic.get("Nombre"), lic.get("Descripcion"), extraer_unspsc(lic)])[:20]
+
+class CacheTematico:
+    """
+    Resultado de score_match_tematico (score y meta) por hash de contenido, guardado
+    en DIRECTORIO_SALIDA/cache_scoring.json. Si cambia la huella de los parámetros
+    temáticos del config el cache anterior no se usa. Al guardar quedan sólo las
+    entradas usadas en esta corrida. Los demás subscores dependen de la fecha o son
+    baratos y se calculan siempre.
+    """
+    def __init__(self, path: Path, huella: str):
+        self.path, self.huella = path, huella
+        self.aciertos = self.calculadas = 0
+        try: data = leer_json(path)
+        except Exception: data = {}
+        ok = isinstance(data, dict) and data.get("huella") == huella and isinstance(data.get("entradas"), dict)
+        self._previas: Dict[str, Any] = data["entradas"] if ok else {}
+        self._usadas: Dict[str, Any] = {}
+
+    def buscar(self, lic: Dict[str, Any]) -> Tuple[str, Optional[List[Any]]]:
+        """(hash, [score, meta] o None si hay que calcularlo)."""
+        h = hash_contenido(lic)
+        return h, self._usadas.get(h) or self._previas.get(h)
+
+    def anotar(self, h: str, s_mt: float, meta_mt: Dict[str, Any], acierto: bool):
+        # lo ya calculado en esta corrida cuenta como acierto aunque al buscarlo no estuviera:
+        # con workers, las repetidas de un bloque se buscan antes de que llegue la primera
+        if acierto or h in self._usadas: self.aciertos += 1
+        else: self.calculadas += 1
+        self._usadas[h] = [s_mt, meta_mt]
+
+    def resumen(self) -> Dict[str, Any]:
+        total = self.aciertos + self.calculadas
+        return {"aciertos": self.aciertos, "calculadas": self.calculadas,
+                "tasa_aciertos": round(100.0 * self.aciertos / total, 1) if total else 0.0}
+
+    def guardar(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"huella": self.huella, "entradas": self._usadas}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+# -------- puntaje por licitación --------
+
+def puntuar(lic: Dict[str, Any], cfg, ahora: datetime.datetime, tematico: Optional[List[Any]] = None
+            ) -> Tuple[float, Dict[str, float], Dict[str, Dict[str, Any]], float]:
+    """(score_total, subscores, meta, score temático sin redondear); `tematico` viene del cache."""
+    s_mt, meta_mt = tematico if tematico is not None else score_match_tematico(lic, cfg)
+    s_vf, meta_vf = score_viabilidad_financiera(lic, cfg)
+    s_ot, meta_ot = score_oportunidad_temporal(lic, cfg, ahora)
+    s_vg, meta_vg = score_ventaja_geografica(lic, cfg)
+
+    subs = {
+        "match_tematico": round(s_mt, 2),
+        "viabilidad_financiera": round(s_vf, 2),
+        "oportunidad_temporal": round(s_ot, 2),
+        "ventaja_geografica": round(s_vg, 2),
+    }
+    meta = {"tematico": meta_mt, "financiero": meta_vf, "temporal": meta_ot, "geografico": meta_vg}
+    return combinar_scores(subs, cfg), subs, meta, s_mt
+
+# -------- workers --------
+
+TAM_BLOQUE_WORKERS = 500   # licitaciones por tarea
+_CFGS_WORKER: Dict[str, Any] = {}
+
+def _iniciar_worker(cfg_paths: List[str]):
+    """Cada proceso carga los configs una vez; las tareas sólo llevan la ruta."""
+    for p in cfg_paths:
+        _CFGS_WORKER[p] = cargar_config(Path(p))
+
+def _puntuar_bloque(cfg_path: str, ahora: datetime.datetime, bloque: List[Tuple[Dict[str, Any], Optional[List[Any]]]]):
+    cfg = _CFGS_WORKER[cfg_path]
+    return [puntuar(lic, cfg, ahora, tem) for lic, tem in bloque]
+
+def crear_pool(workers: int, cfg_paths: List[Path]) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                               initargs=([str(p) for p in cfg_paths],))
+
+def puntuar_grupos(grupos: List[Tuple[Iterable[Dict[str, Any]], List["AcumuladorCliente"]]],
+                   ahora: datetime.datetime, pool: Optional[ProcessPoolExecutor] = None):
+    """
+    Puntúa cada licitación de cada grupo (licitaciones, acumuladores) para todos los
+    acumuladores del grupo: una entrada compartida se lee una sola vez. Con pool, los
+    bloques de todos los grupos y clientes van al mismo pool (a lo más dos tareas por
+    CPU en vuelo) y se entregan en el orden en que se enviaron, así cada cliente recibe
+    sus licitaciones en el orden de entrada y el resultado es idéntico al serial. El
+    cache se consulta y se actualiza siempre en este proceso; aciertos y calculadas se
+    cuentan al entregar, en orden, así también coinciden con el serial.
+    """
+    def con_cache(acc, lic):
+        return acc.cache.buscar(lic) if acc.cache else (None, None)
+
+    def entregar(acc, lic, h, ent, res):
+        if acc.cache: acc.cache.anotar(h, res[3], res[2]["tematico"], ent is not None)
+        acc.agregar(lic, res)
+
+    if pool is None:
+        for lics, accs in grupos:
+            for lic in lics:
+                for acc in accs:
+                    h, ent = con_cache(acc, lic)
+                    entregar(acc, lic, h, ent, puntuar(lic, acc.cfg, ahora, ent))
+        return
+
+    en_vuelo: collections.deque = collections.deque()  # (bloque, [(acumulador, caches, futuro)])
+    max_en_vuelo = 2 * (os.cpu_count() or 1)
+    tareas = 0
+
+    def vaciar(hasta: int):
+        nonlocal tareas
+        while tareas > hasta:
+            bloque, envios = en_vuelo.popleft()
+            for acc, caches, fut in envios:
+                for lic, (h, ent), res in zip(bloque, caches, fut.result()):
+                    entregar(acc, lic, h, ent, res)
+            tareas -= len(envios)
+
+    def enviar(bloque, accs):
+        nonlocal tareas
+        envios = []
+        for acc in accs:
+            caches = [con_cache(acc, lic) for lic in bloque]
+            envios.append((acc, caches, pool.submit(_puntuar_bloque, str(acc.cfg_path), ahora,
+                                                    [(l, e) for l, (_, e) in zip(bloque, caches)])))
+        en_vuelo.append((bloque, envios))
+        tareas += len(envios)
+        vaciar(max_en_vuelo)
+
+    # un bloque por grupo por vuelta: todos los clientes tienen trabajo en el pool a la vez
+    activos = [(iter(lics), accs) for lics, accs in grupos]
+    while activos:
+        siguen = []
+        for it, accs in activos:
+            bloque = list(itertools.islice(it, TAM_BLOQUE_WORKERS))
+            if bloque: enviar(bloque, accs)
+            if len(bloque) == TAM_BLOQUE_WORKERS: siguen.append((it, accs))
+        activos = siguen
+    vaciar(0)
+
 # -------- IO --------
 
 def encontrar_ultimo_resultado_consolidado(dir_salida: Path) -> Optional[Path]:
     files = sorted(dir_salida.glob("resultados_consolidados_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
     return files[0] if files else None
 
-def procesar_cliente(cfg, input_path: Optional[str], min_score_override: Optional[int],
-                     dump_descartadas: bool, dump_count: int, dry_run: bool=False) -> Dict[str, Any]:
-    nombre = cfg.NOMBRE_CLIENTE
-    out_dir = Path(cfg.DIRECTORIO_SALIDA)
+def iterar_licitaciones(entrada: Path) -> Iterable[Dict[str, Any]]:
+    """Licitaciones del consolidado, leídas de a una (flujo_json)."""
+    with open(entrada, "r", encoding="utf-8") as f:
+        for lic in flujo_json.iterar_arreglo(f, "licitaciones"):
+            if isinstance(lic, dict): yield lic
+
+# -------- proceso --------
+
+def meta_resumida(meta: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Lo esencial de la meta para --meta summary."""
+    mt = meta["tematico"]
+    return {
+        "unspsc_best": mt.get("unspsc_best"),
+        "keywords_encontradas": mt.get("keywords_encontradas"),
+        "penalizadoras_encontradas": mt.get("penalizadoras_encontradas"),
+        "dias": meta["temporal"].get("dias"),
+        "region": meta["geografico"].get("region"),
+    }
 
+def entrada_cliente(cfg, input_path: Optional[str]) -> Optional[Path]:
+    """--input o el último consolidado del cliente; None (con aviso) si no hay."""
+    out_dir = Path(cfg.DIRECTORIO_SALIDA)
     entrada = Path(input_path) if input_path else encontrar_ultimo_resultado_consolidado(out_dir)
     if not entrada or not entrada.exists():
-        print(f"- {nombre}: no hay resultados_consolidados_*.json en {out_dir}")
-        return {"cliente": nombre, "procesadas": 0, "guardadas": 0}
-
-    data = leer_json(entrada)
-    licits = data.get("licitaciones", []) if isinstance(data, dict) else []
-    if not isinstance(licits, list):
-        print(f"- {nombre}: formato inesperado en {entrada.name}")
-        return {"cliente": nombre, "procesadas": 0, "guardadas": 0}
-
-    resultados: List[Dict[str, Any]] = []
-    descartadas_tmp: List[Dict[str, Any]] = []
-
-    for lic in licits:
-        s_mt, meta_mt = score_match_tematico(lic, cfg)
-        s_vf, meta_vf = score_viabilidad_financiera(lic, cfg)
-        s_ot, meta_ot = score_oportunidad_temporal(lic, cfg)
-        s_vg, meta_vg = score_ventaja_geografica(lic, cfg)
-
-        subs = {
-            "match_tematico": round(s_mt, 2),
-            "viabilidad_financiera": round(s_vf, 2),
-            "oportunidad_temporal": round(s_ot, 2),
-            "ventaja_geografica": round(s_vg, 2),
-        }
-        score_total = combinar_scores(subs, cfg)
-
+        print(f"- {cfg.NOMBRE_CLIENTE}: no hay resultados_consolidados_*.json en {out_dir}")
+        return None
+    return entrada
+
+class AcumuladorCliente:
+    """
+    Resultado de un cliente mientras llegan sus puntajes: conserva sólo las que alcanzan
+    el score mínimo (a lo más top_k, en un heap) y de las descartadas una muestra
+    uniforme (reservoir) para --dump-descartadas. cerrar() escribe y devuelve la salida.
+    """
+    def __init__(self, cfg, cfg_path: Optional[Path], entrada: Path, min_score_override: Optional[int],
+                 dump_descartadas: bool, dump_count: int, dry_run: bool, usar_cache: bool,
+                 top_k: Optional[int], meta_modo: str):
+        self.cfg, self.cfg_path, self.entrada = cfg, cfg_path, entrada
+        self.out_dir = Path(cfg.DIRECTORIO_SALIDA)
+        self.min_score = min_score_override if min_score_override is not None else cfg.SCORE_MINIMO_RESULTADO
+        self.dump_descartadas, self.dump_count, self.dry_run = dump_descartadas, dump_count, dry_run
+        self.top_k, self.meta_modo = top_k, meta_modo
+        self.cache = CacheTematico(self.out_dir / NOMBRE_CACHE, huella_tematica(cfg)) if usar_cache else None
+        self.aprobadas: List[Any] = []  # con top_k: heap de (score, -orden, registro)
+        self.muestra: List[Dict[str, Any]] = []
+        self.procesadas = self.n_aprobadas = self.n_descartadas = 0
+
+    def agregar(self, lic: Dict[str, Any], res: Tuple[float, Dict[str, float], Dict[str, Dict[str, Any]], float]):
+        score_total, subs, meta, _ = res
+        i = self.procesadas
+        self.procesadas += 1
+
+        if score_total < self.min_score:
+            self.n_descartadas += 1
+            if self.dump_descartadas and not self.dry_run:
+                # reservoir: cada descartada queda en la muestra con probabilidad dump_count/n
+                muestra = self.muestra
+                slot = len(muestra) if len(muestra) < self.dump_count else random.randrange(self.n_descartadas)
+                if slot < self.dump_count:
+                    reg = {"CodigoExterno": lic.get("CodigoExterno"), "score_total": score_total,
+                           "Nombre": lic.get("Nombre"), "Descripcion": lic.get("Descripcion")}
+                    if slot == len(muestra): muestra.append(reg)
+                    else: muestra[slot] = reg
+            return
+
+        self.n_aprobadas += 1
         lic_out = {
             "CodigoExterno": lic.get("CodigoExterno"),
             "Nombre": lic.get("Nombre"),
@@ -228,57 +518,138 @@ def procesar_cliente(cfg, input_path: Optional[str], min_score_override: Optiona
             "Fechas": lic.get("Fechas"),
             "subscores": subs,
             "score_total": score_total,
-            "meta": {
-                "tematico": meta_mt,
-                "financiero": meta_vf,
-                "temporal": meta_ot,
-                "geografico": meta_vg
-            }
         }
-        resultados.append(lic_out)
-
-    min_score = min_score_override if min_score_override is not None else cfg.SCORE_MINIMO_RESULTADO
-    aprobadas = [r for r in resultados if r["score_total"] >= min_score]
-    aprobadas.sort(key=lambda r: r["score_total"], reverse=True)
-
-    # preparar descartadas (para muestreo aleatorio opcional)
-    descartadas_tmp = [r for r in resultados if r["score_total"] < min_score]
-
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    salida = {
-        "cliente": nombre,
-        "generado": ts,
-        "archivo_entrada": str(entrada),
-        "procesadas": len(licits),
-        "guardadas": len(aprobadas),
-        "score_minimo": min_score,
-        "resultados": aprobadas
-    }
+        if self.meta_modo != "none":
+            lic_out["meta"] = meta if self.meta_modo == "full" else meta_resumida(meta)
+
+        top_k, aprobadas = self.top_k, self.aprobadas
+        if top_k is None:
+            aprobadas.append(lic_out)
+        elif len(aprobadas) < top_k:
+            heapq.heappush(aprobadas, (score_total, -i, lic_out))
+        elif top_k and (score_total, -i) > aprobadas[0][:2]:
+            heapq.heapreplace(aprobadas, (score_total, -i, lic_out))
+
+    def cerrar(self) -> Dict[str, Any]:
+        nombre, cache, top_k = self.cfg.NOMBRE_CLIENTE, self.cache, self.top_k
+        procesadas, n_descartadas, dump_count = self.procesadas, self.n_descartadas, self.dump_count
+        if top_k is not None:
+            aprobadas = [r for _, _, r in sorted(self.aprobadas, key=lambda x: (-x[0], -x[1]))]
+        else:
+            aprobadas = sorted(self.aprobadas, key=lambda r: r["score_total"], reverse=True)
+
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        salida = {
+            "cliente": nombre,
+            "generado": ts,
+            "archivo_entrada": str(self.entrada),
+            "procesadas": procesadas,
+            "guardadas": len(aprobadas),
+            "score_minimo": self.min_score,
+            "resultados": aprobadas
+        }
+        if top_k is not None: salida["top_k"] = top_k; salida["sobre_minimo"] = self.n_aprobadas
+        if cache: salida["cache_tematico"] = cache.resumen()
+
+        if not self.dry_run:
+            escribir_json(self.out_dir / f"scoring_{ts}.json", salida)
+            if cache: cache.guardar()
+
+            if self.dump_descartadas and self.muestra:
+                escribir_json(self.out_dir / f"scoring_descartadas_sample_{ts}.json", {
+                    "cliente": nombre,
+                    "generado": ts,
+                    "score_minimo": self.min_score,
+                    "total_descartadas": n_descartadas,
+                    "muestra_count": len(self.muestra),
+                    "muestra": self.muestra
+                })
+
+        print(f"- {nombre}: procesadas={procesadas}, guardadas={len(aprobadas)} (min={self.min_score}"
+              + (f", top {top_k} de {self.n_aprobadas}" if top_k is not None else "") + ")"
+              + (f", descartadas_sample={min(dump_count, n_descartadas)}" if self.dump_descartadas else "")
+              + (f", cache temático {cache.aciertos}/{procesadas} ({salida['cache_tematico']['tasa_aciertos']}%)"
+                 if cache else ""))
+        return salida
+
+def procesar_clientes(clientes: List[Tuple[Any, Path]], input_path: Optional[str], min_score_override: Optional[int],
+                      dump_descartadas: bool, dump_count: int, dry_run: bool=False,
+                      usar_cache: bool=True, top_k: Optional[int]=None, meta_modo: str="full",
+                      pool: Optional[ProcessPoolExecutor]=None) -> List[Dict[str, Any]]:
+    """
+    Scoring de varios clientes [(cfg, cfg_path), ...] a la vez. Los que leen el mismo
+    consolidado (siempre con --input) lo recorren una sola vez; con pool (--workers)
+    los bloques de todos los clientes se reparten juntos entre los procesos. La salida
+    de cada cliente es la misma que daría procesar_cliente.
+    """
+    ahora = datetime.datetime.now()  # una sola referencia para los días al cierre de toda la corrida
+    accs: List[Optional[AcumuladorCliente]] = []
+    grupos: Dict[Path, List[AcumuladorCliente]] = {}
+    for cfg, cfg_path in clientes:
+        entrada = entrada_cliente(cfg, input_path)
+        acc = None
+        if entrada is not None:
+            acc = AcumuladorCliente(cfg, cfg_path, entrada, min_score_override, dump_descartadas, dump_count,
+                                    dry_run, usar_cache, top_k, meta_modo)
+            grupos.setdefault(entrada.resolve(), []).append(acc)
+        accs.append(acc)
+
+    puntuar_grupos([(iterar_licitaciones(entrada), g) for entrada, g in grupos.items()], ahora, pool)
+    return [acc.cerrar() if acc else {"cliente": cfg.NOMBRE_CLIENTE, "procesadas": 0, "guardadas": 0}
+            for acc, (cfg, _) in zip(accs, clientes)]
 
-    if not dry_run:
-        escribir_json(out_dir / f"scoring_{ts}.json", salida)
-
-        if dump_descartadas and descartadas_tmp:
-            sample = random.sample(descartadas_tmp, k=min(dump_count, len(descartadas_tmp)))
-            # dejar solo lo necesario
-            sample_clean = [{
-                "CodigoExterno": s.get("CodigoExterno"),
-                "score_total": s.get("score_total"),
-                "Nombre": s.get("Nombre"),
-                "Descripcion": s.get("Descripcion"),
-            } for s in sample]
-            escribir_json(out_dir / f"scoring_descartadas_sample_{ts}.json", {
-                "cliente": nombre,
-                "generado": ts,
-                "score_minimo": min_score,
-                "total_descartadas": len(descartadas_tmp),
-                "muestra_count": len(sample_clean),
-                "muestra": sample_clean
-            })
-
-    print(f"- {nombre}: procesadas={len(licits)}, guardadas={len(aprobadas)} (min={min_score})"
-          + (f", descartadas_sample={min(dump_count, len(descartadas_tmp))}" if dump_descartadas else ""))
-    return salida
+def procesar_cliente(cfg, input_path: Optional[str], min_score_override: Optional[int],
+                     dump_descartadas: bool, dump_count: int, dry_run: bool=False,
+                     usar_cache: bool=True, top_k: Optional[int]=None, meta_modo: str="full",
+                     pool: Optional[ProcessPoolExecutor]=None, cfg_path: Optional[Path]=None) -> Dict[str, Any]:
+    """
+    Lee el consolidado de a una licitación y conserva sólo las que alcanzan el score
+    mínimo (ver AcumuladorCliente). Con pool (--workers) el puntaje se reparte por
+    bloques entre procesos; cfg_path identifica el config en ellos.
+    """
+    return procesar_clientes([(cfg, cfg_path)], input_path, min_score_override, dump_descartadas, dump_count,
+                             dry_run, usar_cache, top_k, meta_modo, pool)[0]
+
+def benchmark_tematico(cfg, input_path: Optional[str]) -> Dict[str, Any]:
+    """
+    Compara el matcher de keywords de una pasada con un re.search por keyword, y el
+    índice UNSPSC con la comparación contra toda la lista: mismos hallazgos y tiempos.
+    """
+    nombre = cfg.NOMBRE_CLIENTE
+    entrada = Path(input_path) if input_path else encontrar_ultimo_resultado_consolidado(Path(cfg.DIRECTORIO_SALIDA))
+    if not entrada or not entrada.exists():
+        print(f"- {nombre}: no hay resultados_consolidados_*.json para el benchmark")
+        return {"cliente": nombre}
+    data = leer_json(entrada)
+    licits = [l for l in (data.get("licitaciones", []) if isinstance(data, dict) else []) if isinstance(l, dict)]
+    bodies = [texto_keywords(l, cfg) for l in licits]
+    pos, penal = listas_keywords(cfg)
+
+    t0 = time.perf_counter()
+    ref = [(set(keywords_encontradas_regex(b, pos)), set(keywords_encontradas_regex(b, penal))) for b in bodies]
+    t_ref = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    m = MatcherKeywords(pos, penal)
+    nuevo = [m.encontrar(b) for b in bodies]
+    t_nuevo = time.perf_counter() - t0
+
+    difieren = sum(1 for a, b in zip(ref, nuevo) if a != b)
+    print(f"- {nombre}: {len(bodies)} textos, regex por keyword {t_ref:.3f}s, una pasada {t_nuevo:.3f}s "
+          f"(x{t_ref / t_nuevo if t_nuevo else 0:.1f}), difieren={difieren}")
+
+    codigos = [lc for l in licits for lc in extraer_unspsc(l)]
+    rel_codes = [str(c) for c in cfg.CATEGORIAS_UNSPSC_RELEVANTES]
+    t0 = time.perf_counter()
+    ref_u = [mejor_unspsc_lineal(lc, rel_codes) for lc in codigos]
+    t_ref = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    idx = IndiceUNSPSC(rel_codes)
+    nuevo_u = [idx.mejor(lc) for lc in codigos]
+    t_nuevo = time.perf_counter() - t0
+    difieren_u = sum(1 for a, b in zip(ref_u, nuevo_u) if a != b)
+    print(f"  UNSPSC: {len(codigos)} códigos x {len(rel_codes)} relevantes, lineal {t_ref:.3f}s, "
+          f"índice {t_nuevo:.3f}s (x{t_ref / t_nuevo if t_nuevo else 0:.1f}), difieren={difieren_u}")
+    return {"cliente": nombre, "textos": len(bodies), "difieren": difieren + difieren_u}
 
 # -------- main --------
 
@@ -290,22 +661,41 @@ def main():
     ap.add_argument("--dump-descartadas", action="store_true", help="Genera archivo con muestra aleatoria de descartadas")
     ap.add_argument("--dump-count", type=int, default=20, help="Tamaño de la muestra de descartadas (default 20)")
     ap.add_argument("--dry-run", action="store_true", help="No escribe archivos de salida")
+    ap.add_argument("--top-k", type=int, default=None, help="Guarda sólo las K mejores sobre el score mínimo")
+    ap.add_argument("--meta", choices=["full", "summary", "none"], default="full",
+                    help="Detalle de meta por licitación en la salida (default full)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Procesos para puntuar; los bloques de todos los clientes se reparten juntos entre ellos (default 1: serial)")
+    ap.add_argument("--sin-cache", action="store_true", help="Recalcula el match temático sin usar cache_scoring.json")
+    ap.add_argument("--benchmark-tematico", action="store_true",
+                    help="Compara el matcher de keywords y el índice UNSPSC con la búsqueda anterior y sale")
     args = ap.parse_args()
+    if args.top_k is not None and args.top_k < 0: ap.error("--top-k debe ser >= 0")
 
     cfg_paths = sorted(Path(args.clientes_dir).glob("*_config.py"))
     if not cfg_paths:
         print(f"No se encontraron configs en {args.clientes_dir}")
         return
 
-    resumen = []
-    for p in cfg_paths:
-        cfg = cargar_config(p)
-        res = procesar_cliente(cfg, args.input, args.min_score, args.dump_descartadas, args.dump_count, args.dry_run)
-        resumen.append({
-            "cliente": cfg.NOMBRE_CLIENTE,
-            "procesadas": res.get("procesadas", 0),
-            "guardadas": res.get("guardadas", 0)
-        })
+    if args.benchmark_tematico:
+        difieren = sum(benchmark_tematico(cargar_config(p), args.input).get("difieren", 0) for p in cfg_paths)
+        print("✅ Match temático equivalente" if not difieren else f"❌ {difieren} textos o códigos con hallazgos distintos")
+        if difieren: sys.exit(1)
+        return
+
+    pool = crear_pool(args.workers, cfg_paths) if args.workers > 1 else None
+    try:
+        salidas = procesar_clientes([(cargar_config(p), p) for p in cfg_paths], args.input, args.min_score,
+                                    args.dump_descartadas, args.dump_count, args.dry_run,
+                                    usar_cache=not args.sin_cache, top_k=args.top_k, meta_modo=args.meta, pool=pool)
+    finally:
+        if pool: pool.shutdown()
+    resumen = [{
+        "cliente": res.get("cliente"),
+        "procesadas": res.get("procesadas", 0),
+        "guardadas": res.get("guardadas", 0),
+        "cache_tematico": res.get("cache_tematico"),
+    } for res in salidas]
 
     print("\nResumen:")
     print(json.dumps(resumen, ensure_ascii=False, indent=2))
@@ -3,11 +3,10 @@
 
 import sys
 sys.dont_write_bytecode = True
-import os, json, time, random, datetime, logging, hashlib
+import os, json, random, datetime, logging
 from pathlib import Path
 import importlib.util
-import openai
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import calibrar_umbral, memoria_ia, motor_ia, prefiltro_semantico
 
 # ============================================================
 # CONFIG GENERAL
@@ -23,8 +22,6 @@ HIST_DIR.mkdir(exist_ok=True)
 logging.basicConfig(filename=LOG_DIR / "filtro_ia.log", level=logging.INFO,
                     format="%(asctime)s - %(levelname)s - %(message)s")
 
-PAUSA_ENTRE_REQ = 0.3  # pausa entre envíos (para suavizar carga)
-MAX_WORKERS = 3        # número de hilos simultáneos
 MODO_DEBUG = False
 
 # ============================================================
@@ -54,86 +51,30 @@ def fusionar_sin_duplicar(lst_exist, lst_nueva, clave="CodigoExterno"):
                 fusion.append(it); vistos.add(k)
     return fusion
 
-def hash_config(path: Path) -> str:
-    try: return hashlib.md5(path.read_bytes()).hexdigest()[:10]
-    except Exception: return "nohash"
-
-def path_historial_ia(nombre_cliente: str) -> Path:
-    return HIST_DIR / f"ia_{nombre_cliente.lower()}.json"
-
-def cargar_historial_ia(nombre_cliente: str) -> dict:
-    p = path_historial_ia(nombre_cliente)
-    if not p.exists(): return {"por_hash": {}}
-    try:
-        data = json.loads(p.read_text(encoding="utf-8"))
-        if not isinstance(data, dict): data = {"por_hash": {}}
-        if "por_hash" not in data: data["por_hash"] = {}
-        return data
-    except Exception:
-        return {"por_hash": {}}
-
-def guardar_historial_ia(nombre_cliente: str, data: dict):
-    p = path_historial_ia(nombre_cliente)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
 # NUEVO: ruta del archivo acumulado de activas por cliente
 def path_activas(nombre_cliente: str) -> Path:
     return HIST_DIR / f"licitaciones_activas_{nombre_cliente.lower()}.json"
 
-# ============================================================
-# FUNCIÓN DE EVALUACIÓN IA (una licitación)
-# ============================================================
-
-def evaluar_licitacion(lic, descripcion_cliente, modelo, nombre_cliente):
-    """Evalúa una licitación individual con la IA (retorna 'SI' o 'NO')."""
-    codigo = lic.get("CodigoExterno")
-    nombre = lic.get("Nombre", "").strip()
-    desc   = lic.get("Descripcion", "").strip()
-
-    prompt = (
-        f"El cliente se dedica a: {descripcion_cliente}\n\n"
-        f"Evalúa la siguiente licitación:\n"
-        f"{nombre}\n{desc}\n\n"
-        "¿Esta licitación corresponde al tipo de trabajo o rubro del cliente?\n"
-        "Responde solo con 'SI' o 'NO'."
-    )
-
-    try:
-        resp = openai.ChatCompletion.create(
-            model=modelo,
-            messages=[
-                {"role": "system", "content": "Responde estrictamente con 'SI' o 'NO'."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=3, temperature=0
-        )
-        decision = resp.choices[0].message["content"].strip().upper()
-        if decision not in ["SI", "NO"]:
-            decision = "NO"
-    except Exception as e:
-        logging.error(f"{nombre_cliente} - Error API ({codigo}): {e}")
-        decision = "NO"
-
-    time.sleep(PAUSA_ENTRE_REQ + random.uniform(0, 0.2))
-    return codigo, decision, nombre, desc
-
 # ============================================================
 # PROCESO POR CLIENTE
 # ============================================================
 
-def procesar_cliente(config_file: str):
+def preparar_cliente(config_file: str):
+    """Pendientes de un cliente para la IA y todo lo necesario para cerrar_cliente (None si no hay nada que hacer)."""
     nombre_cliente = config_file.replace("_config.py", "")
     print(f"\n🧾 Procesando cliente: {nombre_cliente.upper()}")
 
     try:
         cfg = cargar_config_cliente(config_file)
-        openai.api_key = getattr(cfg, "IA_API_KEY", None)
-        if not openai.api_key:
+        api_key = getattr(cfg, "IA_API_KEY", None)
+        if not api_key:
             raise ValueError("IA_API_KEY no definida en el config del cliente.")
 
         modelo = getattr(cfg, "IA_MODELO", "gpt-4o-mini")
         descripcion_cliente = getattr(cfg, "DESCRIPCION_CLIENTE", "")
+        tam_lote = max(1, int(getattr(cfg, "IA_BATCH_SIZE", 1) or 1))
+        url_base = getattr(cfg, "IA_BASE_URL", None) or os.getenv("OPENAI_BASE_URL") or None
+        concurrencia = int(getattr(cfg, "IA_CONCURRENCIA_MAXIMA", motor_ia.CONCURRENCIA_MAXIMA))
 
         # --- Archivo de ejecución más reciente (sin restringir al día de hoy) ---
         salida_base = Path(getattr(cfg, "DIRECTORIO_SALIDA", BASE_DIR / "resultados" / nombre_cliente.lower()))
@@ -148,27 +89,73 @@ def procesar_cliente(config_file: str):
 
         if not archivo_ejecucion:
             print(f"⚠️  No se encontró ningún archivo de ejecución reciente para {nombre_cliente}")
-            return
-
+            return None
 
         data = json.loads(archivo_ejecucion.read_text(encoding="utf-8"))
         licitaciones = data.get("resumen", [])
         if not licitaciones:
             print(f"⚠️  {nombre_cliente}: no hay licitaciones en 'resumen'.")
-            return
+            return None
 
-        # --- Memoria IA ---
+        # --- Memoria IA (por modelo + DESCRIPCION_CLIENTE + versión de prompt + texto) ---
         cfg_path  = CLIENTES_DIR / config_file
-        chash     = hash_config(cfg_path)
-        h_ia      = cargar_historial_ia(nombre_cliente)
-        bucket    = h_ia["por_hash"].setdefault(chash, {})
+        memoria   = memoria_ia.MemoriaIA(nombre_cliente, modelo, descripcion_cliente,
+                                         chash_legado=memoria_ia.hash_config(cfg_path))
+        if memoria.migradas:
+            print(f"🔁 {memoria.migradas} decisiones migradas del historial por hash de config")
 
         pendientes = [
             lic for lic in licitaciones
             if isinstance(lic, dict)
             and lic.get("CodigoExterno")
-            and lic["CodigoExterno"] not in bucket
+            and memoria.buscar(lic) is None
         ]
+        if memoria.texto_cambiado:
+            print(f"✏️  {memoria.texto_cambiado} licitaciones con texto cambiado se vuelven a evaluar")
+
+        # --- Umbral calibrado (calibrar_umbral.py --aplicar): lo que quede bajo él no va a la IA,
+        #     salvo la muestra de exploración, que mantiene sin sesgo las calibraciones siguientes ---
+        umbral = calibrar_umbral.umbral_aplicado(nombre_cliente)
+        bajo_umbral = 0
+        exploracion = []
+        if umbral is not None:
+            sobre = []
+            for lic in pendientes:
+                if not isinstance(lic.get("score_total"), (int, float)) or lic["score_total"] >= umbral:
+                    sobre.append(lic)
+                elif calibrar_umbral.en_exploracion(lic["CodigoExterno"]):
+                    exploracion.append(lic)
+                else:
+                    bajo_umbral += 1
+            pendientes = sobre
+            print(f"🎚️  Umbral calibrado {umbral:.2f}: {bajo_umbral} licitaciones no se envían a la IA"
+                  + (f" ({len(exploracion)} bajo él van igual como muestra de exploración)" if exploracion else ""))
+
+        # --- Prefiltro semántico (PREFILTRO_SEMANTICO): decide localmente lo que es claro ---
+        #     (las de la muestra de exploración van igual a la IA para que su decisión quede en la memoria)
+        prefiltradas = []
+        auditadas = {}  # CodigoExterno -> lo que habría decidido el prefiltro
+        if getattr(cfg, "PREFILTRO_SEMANTICO", False) and pendientes:
+            prefiltro = prefiltro_semantico.prefiltro_cliente(nombre_cliente, cfg)
+            if prefiltro is None:
+                print(f"🧠 Prefiltro semántico: historial insuficiente (< {prefiltro_semantico.MIN_EJEMPLOS} SI o NO), todo va a la IA")
+            else:
+                dudosas = []
+                for lic in pendientes:
+                    d = prefiltro.decidir(lic)
+                    if d is None: dudosas.append(lic)
+                    elif calibrar_umbral.en_exploracion(lic["CodigoExterno"]):
+                        auditadas[lic["CodigoExterno"]] = d
+                        dudosas.append(lic)
+                    else: prefiltradas.append((lic, d))
+                pendientes = dudosas
+                n_si = sum(1 for _, d in prefiltradas if d == "SI")
+                print(f"🧠 Prefiltro semántico: {len(prefiltradas)} decididas sin IA "
+                      f"({n_si} SI, {len(prefiltradas) - n_si} NO), {len(dudosas) - len(auditadas)} dudosas a la IA"
+                      + (f", {len(auditadas)} decididas de la muestra de exploración van igual a la IA" if auditadas else ""))
+
+        # la muestra de exploración va directo a la IA: el prefiltro no deja etiqueta en la memoria
+        pendientes = pendientes + exploracion
 
         if MODO_DEBUG:
             pendientes = random.sample(pendientes, min(20, len(pendientes)))
@@ -176,38 +163,60 @@ def procesar_cliente(config_file: str):
 
         total = len(licitaciones)
         por_ia = len(pendientes)
-        print(f"📊 {total} licitaciones ({por_ia} nuevas para IA, {total-por_ia} desde memoria)\n")
+        print(f"📊 {total} licitaciones ({por_ia} nuevas para IA, {total-por_ia-bajo_umbral-len(prefiltradas)} desde memoria"
+              + (f", {bajo_umbral} bajo el umbral" if bajo_umbral else "")
+              + (f", {len(prefiltradas)} por prefiltro" if prefiltradas else "") + ")")
+
+        trabajo = motor_ia.Trabajo(nombre_cliente, descripcion_cliente, modelo, api_key, url_base,
+                                   concurrencia, tam_lote, pendientes)
+        return {"nombre": nombre_cliente, "trabajo": trabajo, "data": data, "archivo": archivo_ejecucion,
+                "memoria": memoria, "prefiltradas": prefiltradas, "auditadas": auditadas, "total": total}
 
+    except Exception as e:
+        logging.error(f"{nombre_cliente} - Error general: {e}")
+        print(f"❌ Error procesando cliente {nombre_cliente}: {e}")
+        return None
+
+def cerrar_cliente(prep: dict, evaluadas: list):
+    """Guarda decisiones en la ejecución, la memoria IA y las activas del cliente."""
+    nombre_cliente = prep["nombre"]
+    data, archivo_ejecucion, memoria = prep["data"], prep["archivo"], prep["memoria"]
+    prefiltradas, total, por_ia = prep["prefiltradas"], prep["total"], len(prep["trabajo"].pendientes)
+
+    try:
         resultados_finales = []
         codigos_si_totales = set(data.get("ia_codigos_si", []))
-
-        # --- Evaluación en paralelo ---
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {
-                executor.submit(evaluar_licitacion, lic, descripcion_cliente, modelo, nombre_cliente): lic
-                for lic in pendientes
+        sin_respuesta = 0
+        # las del prefiltro no van a la memoria: ésta sólo guarda decisiones de la IA (son su entrenamiento)
+        # (licitación, decisión, versión del prompt que la produjo; None si la decidió el prefiltro)
+        decididas = list(evaluadas) + [(l, d, None) for l, d in prefiltradas]
+        for lic, decision, prompt_version in decididas:
+            if decision is None:
+                sin_respuesta += 1  # queda pendiente para la próxima corrida
+                continue
+            codigo = lic["CodigoExterno"]
+            item = {
+                "CodigoExterno": codigo,
+                "Nombre": (lic.get("Nombre") or "").strip(),
+                "Descripcion": (lic.get("Descripcion") or "").strip(),
+                "decision_ia": decision
             }
-
-            for idx, future in enumerate(as_completed(futures), start=1):
-                codigo, decision, nombre, desc = future.result()
-                print(f"[{idx}/{por_ia}] {codigo}: {decision}")
-                bucket[codigo] = decision
-                resultados_finales.append({
-                    "CodigoExterno": codigo,
-                    "Nombre": nombre,
-                    "Descripcion": desc,
-                    "decision_ia": decision
-                })
-                if decision == "SI":
-                    codigos_si_totales.add(codigo)
+            if prompt_version is None:
+                item["origen"] = "prefiltro"
+            else:
+                memoria.anotar(lic, decision, prompt_version)
+                if codigo in prep["auditadas"]:
+                    item["prefiltro"] = prep["auditadas"][codigo]  # calibrar_umbral la pondera como muestra
+            resultados_finales.append(item)
+            if decision == "SI":
+                codigos_si_totales.add(codigo)
 
         # --- Fusionar y guardar en archivo de ejecución ---
         data["ia_filtro"] = fusionar_sin_duplicar(data.get("ia_filtro", []), resultados_finales)
         data["ia_codigos_si"] = sorted(list(codigos_si_totales))
         archivo_ejecucion.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
-        h_ia["por_hash"][chash] = bucket
-        guardar_historial_ia(nombre_cliente, h_ia)
+        memoria.guardar()
 
         # --- Actualizar archivo acumulado de activas ---
         try:
@@ -225,7 +234,10 @@ def procesar_cliente(config_file: str):
 
         print(f"\n✅ Filtro IA completado para {nombre_cliente.upper()}.")
         print(f"   • Total: {total}")
-        print(f"   • Evaluadas por IA: {por_ia}")
+        if prefiltradas:
+            print(f"   • Decididas por prefiltro: {len(prefiltradas)}")
+        print(f"   • Evaluadas por IA: {por_ia - sin_respuesta}"
+              + (f" ({sin_respuesta} sin respuesta, se reintentan en la próxima corrida)" if sin_respuesta else ""))
         print(f"   • SI acumulados (día): {len(data['ia_codigos_si'])}")
         print(f"   • Activas acumuladas (global): {len(combinadas)}")
         print(f"📁 Archivo actualizado: {archivo_ejecucion.name}")
@@ -234,6 +246,41 @@ def procesar_cliente(config_file: str):
         logging.error(f"{nombre_cliente} - Error general: {e}")
         print(f"❌ Error procesando cliente {nombre_cliente}: {e}")
 
+def procesar_clientes(config_files: list):
+    """
+    Prepara todos los clientes, evalúa sus pendientes juntos y cierra cada uno.
+    La evaluación es una sola para todos (motor_ia.evaluar_clientes): los clientes
+    van en paralelo y una licitación pendiente para varios se envía una sola vez,
+    con las descripciones de todos ellos.
+    """
+    preparados = [p for p in (preparar_cliente(c) for c in config_files) if p]
+    trabajos = [p["trabajo"] for p in preparados]
+    total_ia = sum(len(t.pendientes) for t in trabajos)
+    if total_ia:
+        print(f"\n🤖 Enviando a la IA {total_ia} pendientes de {sum(1 for t in trabajos if t.pendientes)} clientes")
+    avance = {"n": 0}
+
+    def al_evaluar(nombre, lic, decision):
+        avance["n"] += 1
+        print(f"[{avance['n']}/{total_ia}] {nombre.upper()} {lic.get('CodigoExterno')}: {decision or 'sin respuesta'}")
+
+    try:
+        evaluadas, resumenes = motor_ia.evaluar_clientes(trabajos, al_evaluar)
+    except Exception as e:
+        logging.error(f"Error general en la evaluación IA: {e}")
+        print(f"❌ Error en la evaluación IA: {e}")
+        return
+    for uso_api in resumenes:
+        print(f"   • API: {uso_api['solicitudes']} solicitudes ({uso_api['solicitudes_compartidas']} compartidas, "
+              f"{uso_api['pares_compartidos']} pares cliente-licitación), {uso_api['reintentos']} reintentos, "
+              f"{uso_api['limitadas_429']} con 429, concurrencia máx. {uso_api['concurrencia_pico']}")
+
+    for p in preparados:
+        cerrar_cliente(p, evaluadas.get(p["nombre"], []))
+
+def procesar_cliente(config_file: str):
+    procesar_clientes([config_file])
+
 # ============================================================
 # MAIN
 # ============================================================
@@ -245,8 +292,7 @@ def main():
         return
 
     print(f"🔍 Clientes detectados: {', '.join([c.replace('_config.py','') for c in clientes])}")
-    for config_file in clientes:
-        procesar_cliente(config_file)
+    procesar_clientes(clientes)
 
     print("\n🏁 Proceso completado para todos los clientes.")
 
@@ -7,6 +7,7 @@ sys.dont_write_bytecode = True
 import os, json, time, logging, datetime, random
 from pathlib import Path
 import requests, importlib.util
+import http_sesion, almacen_local, base_sqlite
 
 # ============================================================
 # CONFIGURACIÓN GENERAL
@@ -14,10 +15,9 @@ import requests, importlib.util
 
 ESTADOS_VIGENTES = [5, 6]
 PAUSA_ENTRE_LIC = 2.5
-REINTENTOS = 3
-BACKOFF_SEG = [5, 10, 20]
 
 BASE_DIR     = Path(__file__).resolve().parent
+BASE_LOCAL   = BASE_DIR / "base_local"
 CLIENTES_DIR = BASE_DIR / "clientes"
 HIST_DIR     = BASE_DIR / "historial"
 LOG_DIR      = BASE_DIR / "log"
@@ -32,16 +32,15 @@ logging.basicConfig(
 # UTILIDADES
 # ============================================================
 
-def safe_get(url: str, retries: int = REINTENTOS, backoff=BACKOFF_SEG, timeout=30):
-    for i in range(retries):
-        try:
-            r = requests.get(url, timeout=timeout)
-            if r.status_code == 200:
-                return r
-            logging.warning(f"GET {url} -> {r.status_code}")
-        except Exception as e:
-            logging.warning(f"Excepción GET ({url}): {e}")
-        time.sleep(backoff[min(i, len(backoff)-1)] + random.uniform(0, 1))
+def safe_get(url: str, timeout=30):
+    # Reintentos/backoff y keep-alive los maneja la sesión compartida de http_sesion.
+    try:
+        r = http_sesion.get(url, timeout=timeout)
+        if r.status_code == 200:
+            return r
+        logging.warning(f"GET {url} -> {r.status_code}")
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Excepción GET ({url}): {e}")
     return None
 
 def cargar_config_cliente(nombre_archivo: str):
@@ -83,6 +82,32 @@ def guardar_json(path: Path, data):
 def path_activas(nombre_cliente: str) -> Path:
     return HIST_DIR / f"licitaciones_activas_{nombre_cliente.lower()}.json"
 
+def actualizar_estados_en_dia(fecha: str, cambios: dict, con_sqlite=None, indice=None) -> int:
+    """
+    Reescribe el día completo de base_local cambiando sólo CodigoEstado de los
+    códigos en `cambios` ({codigo: estado}); el resto del día queda intacto.
+    Si hay índice de códigos, se re-apuntan los offsets del día reescrito.
+    """
+    path = almacen_local.ubicar_dia(BASE_LOCAL, fecha)
+    if not path:
+        return 0
+    registros = almacen_local.leer_archivo(path)
+    n = 0
+    for lic in registros:
+        cod = str(lic.get("CodigoExterno") or "").strip()
+        if cod in cambios:
+            lic["CodigoEstado"] = cambios[cod]
+            n += 1
+            if con_sqlite is not None:
+                base_sqlite.actualizar_estado(con_sqlite, fecha, cod, lic)
+    if n:
+        ubicaciones = []
+        almacen_local.escribir_archivo(
+            path, registros, registrar=lambda lic, off: ubicaciones.append((almacen_local.codigo_de(lic), off)))
+        if indice is not None and fecha in indice["dias"]:
+            almacen_local.indexar_dia(indice, fecha, indice["dias"][fecha], ubicaciones)
+    return n
+
 # ============================================================
 # PROCESO PRINCIPAL POR CLIENTE
 # ============================================================
@@ -126,27 +151,34 @@ def procesar_cliente(config_file: str):
         resumen_exec = data_exec.get("resumen", []) or []
         mapa_exec = {str(x.get("CodigoExterno")): x for x in resumen_exec if isinstance(x, dict) and x.get("CodigoExterno")}
 
-        # ----- Cargar base_local del mes actual (simple y corto) -----
-        base_mes_dir = BASE_DIR / "base_local" / str(hoy.year) / f"{hoy.month:02d}"
-        if not base_mes_dir.exists():
-            print(f"⚠️  No existe carpeta base_local del mes: {base_mes_dir}")
-            # seguimos, pero sólo podremos actualizar ejecución / activas
-        archivos_dia = sorted(base_mes_dir.glob("*.json")) if base_mes_dir.exists() else []
-
-        mapa_global = {}
-        for path in archivos_dia:
-            data = load_json(path, [])
-            if not isinstance(data, list):
-                continue
-            for lic in data:
-                cod = str(lic.get("CodigoExterno"))
-                if cod:
-                    mapa_global[cod] = (path, lic)
+        # ----- Ubicar las activas en base_local: réplica SQLite, índice de códigos o mes actual -----
+        con_sqlite = base_sqlite.conectar_si_activo()
+        indice = almacen_local.cargar_indice() if almacen_local.RUTA_INDICE.exists() else None
+        mapa_global = {}  # codigo -> (fecha del día, licitación)
+        if con_sqlite is not None:
+            mapa_global = base_sqlite.buscar_codigos(con_sqlite, codigos_activas)
+            origen_base = "réplica SQLite"
+        elif indice is not None and indice["codigos"]:
+            mapa_global = almacen_local.buscar_en_indice(BASE_LOCAL, codigos_activas, indice)
+            origen_base = "índice de códigos"
+        else:
+            base_mes_dir = BASE_LOCAL / str(hoy.year) / f"{hoy.month:02d}"
+            if not base_mes_dir.exists():
+                print(f"⚠️  No existe carpeta base_local del mes: {base_mes_dir}")
+                # seguimos, pero sólo podremos actualizar ejecución / activas
+            for path in almacen_local.archivos_mes(BASE_LOCAL, hoy.year, hoy.month):
+                fecha_path = almacen_local.fecha_de_ruta(path)
+                for lic in almacen_local.leer_archivo(path):
+                    cod = str(lic.get("CodigoExterno") or "").strip()
+                    if cod in codigos_activas:
+                        mapa_global[cod] = (fecha_path, lic)
+            origen_base = "mes actual"
 
         print(f"🔍 Comprobando vigencia de {len(codigos_activas)} licitaciones (fuente: activas) …")
 
         vigentes, no_vigentes, sin_detalle = 0, 0, 0
         siguen_vigentes = set()
+        cambios_por_dia = {}  # fecha -> {codigo: estado}
 
         for idx, codigo in enumerate(sorted(codigos_activas), start=1):
             print(f"[{idx}/{len(codigos_activas)}] {nombre_cliente}: consultando {codigo} …")
@@ -173,9 +205,10 @@ def procesar_cliente(config_file: str):
 
                 # --- Actualizar en base_local (si está presente ahí) ---
                 if codigo in mapa_global:
-                    path_archivo, lic_local = mapa_global[codigo]
-                    lic_local["CodigoEstado"] = estado
-                    mapa_global[codigo] = (path_archivo, lic_local)
+                    fecha_lic, lic_local = mapa_global[codigo]
+                    if lic_local.get("CodigoEstado") != estado:
+                        lic_local["CodigoEstado"] = estado
+                        cambios_por_dia.setdefault(fecha_lic, {})[codigo] = estado
                 else:
                     sin_detalle += 1
 
@@ -188,18 +221,13 @@ def procesar_cliente(config_file: str):
 
             time.sleep(PAUSA_ENTRE_LIC + random.uniform(-0.5, 0.5))
 
-        # ----- Guardar cambios en cada archivo base_local -----
-        if archivos_dia:
-            actualizados_por_archivo = {}
-            for cod, (path, lic) in mapa_global.items():
-                if not path.exists():
-                    continue
-                if path not in actualizados_por_archivo:
-                    actualizados_por_archivo[path] = []
-                actualizados_por_archivo[path].append(lic)
-
-            for path, lic_list in actualizados_por_archivo.items():
-                guardar_json(path, lic_list)
+        # ----- Guardar cambios sólo en los días de base_local afectados -----
+        for fecha_lic, cambios in sorted(cambios_por_dia.items()):
+            actualizar_estados_en_dia(fecha_lic, cambios, con_sqlite, indice)
+        if con_sqlite is not None:
+            con_sqlite.close()
+        if indice is not None and cambios_por_dia:
+            almacen_local.guardar_indice(indice)
 
         # ----- Actualizar archivo de ejecución (si había uno) -----
         if resumen_exec and archivo_ejecucion:
@@ -215,14 +243,14 @@ def procesar_cliente(config_file: str):
         print(f"🟢 Vigentes: {vigentes}")
         print(f"🔴 No vigentes: {no_vigentes}")
         if sin_detalle:
-            print(f"⚠️  Códigos no presentes en base_local (mes actual): {sin_detalle}")
+            print(f"⚠️  Códigos no presentes en base_local ({origen_base}): {sin_detalle}")
         if archivo_ejecucion:
             print(f"📁 Ejecución actualizada: {archivo_ejecucion.name}")
         else:
             print("ℹ️  No había archivo de ejecución reciente para actualizar.")
         print(f"📁 Activas actualizadas: {p_act.name}")
-        if archivos_dia:
-            print(f"📁 Base local actualizada: {base_mes_dir}")
+        if cambios_por_dia:
+            print(f"📁 Base local actualizada: {len(cambios_por_dia)} días con cambios de estado")
 
     except Exception as e:
         logging.error(f"{nombre_cliente} - error general: {e}")
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
+import almacen_local, base_sqlite
 
 # ============================================================
 # CONFIG
@@ -53,6 +54,25 @@ def buscar_licitaciones_en_base_local(codigos: List[str]) -> Tuple[List[dict], L
     if not objetivos:
         return [], []
 
+    # Réplica SQLite: búsqueda puntual por índice de CodigoExterno, sin límite de días
+    con = base_sqlite.conectar_si_activo()
+    if con is not None:
+        try:
+            encontradas_db = {cod: lic for cod, (_, lic) in base_sqlite.buscar_codigos(con, objetivos).items()}
+            return list(encontradas_db.values()), sorted(list(objetivos - set(encontradas_db.keys())))
+        except Exception as e:
+            logging.warning(f"Réplica SQLite no disponible ({e}); se recorre base_local")
+        finally:
+            con.close()
+
+    # Índice de códigos mantenido por 0_actualizar_licitaciones.py: un acceso por código
+    if almacen_local.RUTA_INDICE.exists():
+        indice = almacen_local.cargar_indice()
+        if indice["codigos"]:
+            ubicadas = almacen_local.buscar_en_indice(BASE_LOCAL, objetivos, indice)
+            encontradas_idx = {cod: lic for cod, (_, lic) in ubicadas.items()}
+            return list(encontradas_idx.values()), sorted(list(objetivos - set(encontradas_idx.keys())))
+
     encontradas: Dict[str, dict] = {}
     hoy = date.today()
     ya_cargados: Dict[Path, Optional[List[dict]]] = {}
@@ -61,13 +81,12 @@ def buscar_licitaciones_en_base_local(codigos: List[str]) -> Tuple[List[dict], L
         if len(encontradas) == len(objetivos):
             break
         dt = hoy - timedelta(days=delta)
-        p = BASE_LOCAL / f"{dt.year}" / f"{dt.month:02d}" / f"{dt.day:02d}.json"
-        if not p.exists():
+        p = almacen_local.ubicar_dia(BASE_LOCAL, dt.isoformat())
+        if not p:
             continue
 
         if p not in ya_cargados:
-            data = load_json(p, [])
-            ya_cargados[p] = data if isinstance(data, list) else []
+            ya_cargados[p] = almacen_local.leer_archivo(p)
 
         for lic in ya_cargados[p] or []:
             cod = str(lic.get("CodigoExterno", "")).strip()
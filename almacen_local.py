@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+almacen_local.py
+Backend de almacenamiento de base_local/AAAA/MM/DD.<ext>.
+
+Formatos:
+  json       -> DD.json        arreglo JSON (modo compatible, el histórico)
+  jsonl.gz   -> DD.jsonl.gz    JSON Lines comprimido con gzip
+  jsonl.zst  -> DD.jsonl.zst   JSON Lines comprimido con zstd (requiere `zstandard`)
+
+El formato de escritura se elige con BASE_LOCAL_FORMATO (.env); la lectura
+detecta el formato de cada día por su extensión, así que una base mixta
+(a medio migrar) sigue funcionando.
+
+También mantiene el índice de códigos (indice_codigos.json): CodigoExterno ->
+[día de su versión más reciente, byte donde empieza el registro o null si el
+formato del día no permite acceso directo].
+
+Uso como comando:
+  python almacen_local.py migrar --a jsonl.gz     # convierte toda la base
+  python almacen_local.py benchmark --dias 10     # throughput de lectura por formato
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, gzip, io, json, os, shutil, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from flujo_json import iterar_arreglo, escribir_arreglo, iterar_con_offsets, leer_en_offset
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "base_local"
+RUTA_INDICE = BASE_DIR / "indice_codigos.json"
+
+EXTENSIONES = {"json": ".json", "jsonl.gz": ".jsonl.gz", "jsonl.zst": ".jsonl.zst"}
+FORMATO_DEFECTO = "json"
+NIVEL_GZIP = 6
+NIVEL_ZSTD = 10
+
+def formato_activo() -> str:
+    fmt = os.getenv("BASE_LOCAL_FORMATO", FORMATO_DEFECTO).strip().lower()
+    return validar_formato(fmt)
+
+def validar_formato(fmt: str) -> str:
+    if fmt not in EXTENSIONES:
+        raise ValueError(f"Formato de base_local desconocido: {fmt} (opciones: {', '.join(EXTENSIONES)})")
+    if fmt == "jsonl.zst" and zstandard is None:
+        raise ValueError("El formato jsonl.zst requiere el paquete 'zstandard' (pip install zstandard)")
+    return fmt
+
+def formato_de_ruta(path: Path) -> Optional[str]:
+    for fmt, ext in sorted(EXTENSIONES.items(), key=lambda x: -len(x[1])):
+        if path.name.endswith(ext): return fmt
+    return None
+
+# ============================================================
+# RUTAS
+# ============================================================
+
+def ruta_dia(base_dir: Path, fecha: str, formato: Optional[str] = None) -> Path:
+    y, m, d = fecha.split("-")
+    return base_dir / y / m / f"{d}{EXTENSIONES[formato or formato_activo()]}"
+
+def ubicar_dia(base_dir: Path, fecha: str) -> Optional[Path]:
+    """Archivo existente del día en cualquier formato (prefiere el formato activo)."""
+    activo = formato_activo()
+    for fmt in [activo] + [f for f in EXTENSIONES if f != activo]:
+        p = ruta_dia(base_dir, fecha, fmt)
+        if p.exists(): return p
+    return None
+
+def firma_dia(base_dir: Path, fecha: str) -> Optional[str]:
+    """
+    Firma barata (nombre, tamaño, mtime) del archivo del día: cambia cuando algo lo
+    reescribe fuera de 0_actualizar (p. ej. los estados de 5_comprobar_vigencia.py),
+    aunque el checksum del catálogo siga igual. None si el día no existe.
+    """
+    p = ubicar_dia(base_dir, fecha)
+    if p is None: return None
+    try: st = p.stat()
+    except OSError: return None
+    return f"{p.name}:{st.st_size}:{st.st_mtime_ns}"
+
+def fecha_de_ruta(path: Path) -> str:
+    d = path.name.split(".", 1)[0]
+    return f"{path.parent.parent.name}-{path.parent.name}-{d}"
+
+def archivos_mes(base_dir: Path, year: int, month: int) -> List[Path]:
+    """Días del mes presentes en base_local (uno por fecha), ordenados."""
+    carpeta = base_dir / str(year) / f"{month:02d}"
+    if not carpeta.exists(): return []
+    por_fecha: Dict[str, Path] = {}
+    for p in sorted(carpeta.iterdir()):
+        if p.is_file() and formato_de_ruta(p):
+            por_fecha.setdefault(fecha_de_ruta(p), ubicar_dia(base_dir, fecha_de_ruta(p)) or p)
+    return [por_fecha[f] for f in sorted(por_fecha)]
+
+def todos_los_dias(base_dir: Path) -> List[Path]:
+    out: List[Path] = []
+    for carpeta_y in sorted(p for p in base_dir.glob("[0-9][0-9][0-9][0-9]") if p.is_dir()):
+        for carpeta_m in sorted(p for p in carpeta_y.glob("[0-9][0-9]") if p.is_dir()):
+            out.extend(archivos_mes(base_dir, int(carpeta_y.name), int(carpeta_m.name)))
+    return out
+
+# ============================================================
+# LECTURA / ESCRITURA
+# ============================================================
+
+def _abrir_texto(path: Path, modo: str, fmt: str):
+    """Abre `path` en texto ("r" o "w") comprimiendo/descomprimiendo según `fmt`."""
+    if fmt == "jsonl.gz":
+        return gzip.open(path, modo + "t", encoding="utf-8", compresslevel=NIVEL_GZIP)
+    if fmt == "jsonl.zst":
+        if zstandard is None:
+            raise ValueError(f"{path.name}: falta el paquete 'zstandard' para jsonl.zst")
+        raw = open(path, modo + "b")
+        if modo == "w":
+            flujo = zstandard.ZstdCompressor(level=NIVEL_ZSTD).stream_writer(raw, closefd=True)
+        else:
+            flujo = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(flujo, encoding="utf-8")
+    return open(path, modo, encoding="utf-8")
+
+def iterar_archivo(path: Path) -> Iterator[Dict[str, Any]]:
+    """Registros de un archivo de día, en streaming, según su formato."""
+    if formato_de_ruta(path) == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iterar_arreglo(f)
+        return
+    with _abrir_texto(path, "r", formato_de_ruta(path)) as f:
+        for linea in f:
+            if linea.strip(): yield json.loads(linea)
+
+def leer_archivo(path: Path) -> List[Dict[str, Any]]:
+    """Día completo en memoria (json.load directo si es el formato compatible)."""
+    try:
+        if formato_de_ruta(path) == "json":
+            with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+            if not isinstance(data, list): return []
+        else:
+            data = iterar_archivo(path)
+        return [x for x in data if isinstance(x, dict)]
+    except Exception:
+        return []
+
+def escribir_archivo(path: Path, registros: Iterable[Dict[str, Any]], registrar=None) -> int:
+    """
+    Escribe un día en el formato que indica la extensión de `path` (renombre atómico).
+    `registrar(reg, offset)` recibe cada registro con su byte de inicio (None si comprimido).
+    """
+    if formato_de_ruta(path) == "json":
+        return escribir_arreglo(path, registros, registrar)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    n = 0
+    try:
+        with _abrir_texto(tmp, "w", formato_de_ruta(path)) as f:
+            for reg in registros:
+                f.write(json.dumps(reg, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+                if registrar: registrar(reg, None)
+                n += 1
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists(): tmp.unlink()
+    return n
+
+def leer_dia(base_dir: Path, fecha: str) -> List[Dict[str, Any]]:
+    p = ubicar_dia(base_dir, fecha)
+    return leer_archivo(p) if p else []
+
+def escribir_dia(base_dir: Path, fecha: str, registros: Iterable[Dict[str, Any]],
+                 formato: Optional[str] = None, registrar=None) -> int:
+    """Escribe el día en `formato` (o el activo) y borra copias del mismo día en otros formatos."""
+    fmt = validar_formato(formato or formato_activo())
+    destino = ruta_dia(base_dir, fecha, fmt)
+    n = escribir_archivo(destino, registros, registrar)
+    for otro in EXTENSIONES:
+        p = ruta_dia(base_dir, fecha, otro)
+        if otro != fmt and p.exists(): p.unlink()
+    return n
+
+# ============================================================
+# ÍNDICE DE CÓDIGOS
+# ============================================================
+
+def codigo_de(lic: Dict[str, Any]) -> str:
+    return str(lic.get("CodigoExterno") or "").strip()
+
+def cargar_indice(ruta: Path = RUTA_INDICE) -> Dict[str, Any]:
+    """{"dias": {fecha: checksum indexado}, "codigos": {codigo: [fecha, offset|None]}}"""
+    try:
+        data = json.loads(ruta.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    if not isinstance(data, dict): data = {}
+    if not isinstance(data.get("dias"), dict): data["dias"] = {}
+    if not isinstance(data.get("codigos"), dict): data["codigos"] = {}
+    return data
+
+def guardar_indice(indice: Dict[str, Any], ruta: Path = RUTA_INDICE):
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, ruta)
+
+def indexar_dia(indice: Dict[str, Any], fecha: str, checksum: Optional[str],
+                ubicaciones: Iterable[Tuple[str, Optional[int]]], base_dir: Optional[Path] = None):
+    """
+    Apunta cada código de `ubicaciones` a `fecha` salvo que ya esté en un día más reciente.
+    Los códigos que apuntaban a `fecha` y ya no vienen en él se reubican en el día
+    indexado más reciente que los traiga (si se da `base_dir`) o se quitan del índice.
+    """
+    cods = indice["codigos"]
+    vistos = set()
+    for cod, offset in ubicaciones:
+        if not cod: continue
+        vistos.add(cod)
+        actual = cods.get(cod)
+        if actual is None or actual[0] <= fecha:
+            cods[cod] = [fecha, offset]
+    indice["dias"][fecha] = checksum
+    perdidos = {cod for cod, ent in cods.items() if ent[0] == fecha and cod not in vistos}
+    for cod in perdidos:
+        del cods[cod]
+    if perdidos and base_dir is not None:
+        reubicar(indice, base_dir, perdidos, antes_de=fecha)
+
+def reubicar(indice: Dict[str, Any], base_dir: Path, codigos: Set[str], antes_de: Optional[str] = None) -> int:
+    """Busca `codigos` en los días indexados (anteriores a `antes_de`), del más reciente al más antiguo."""
+    faltan, n = set(codigos), 0
+    for fecha in sorted((f for f in indice["dias"] if antes_de is None or f < antes_de), reverse=True):
+        if not faltan: break
+        p = ubicar_dia(base_dir, fecha)
+        if not p: continue
+        for cod, off in ubicaciones_de_archivo(p):
+            if cod in faltan:
+                indice["codigos"][cod] = [fecha, off]
+                faltan.discard(cod); n += 1
+    return n
+
+def ubicaciones_de_archivo(path: Path) -> Iterator[Tuple[str, Optional[int]]]:
+    """(codigo, offset) de cada registro del día; offset None si el formato no lo permite."""
+    if formato_de_ruta(path) == "json":
+        try:
+            with open(path, "rb") as f:
+                out = [(codigo_de(reg), off) for reg, off in iterar_con_offsets(f)]
+            yield from out
+            return
+        except ValueError:
+            pass  # día antiguo (indent=2): se indexa sin offsets
+    for reg in iterar_archivo(path):
+        if isinstance(reg, dict): yield codigo_de(reg), None
+
+def sincronizar_indice(indice: Dict[str, Any], base_dir: Path, catalogo: Dict[str, str], log=print) -> int:
+    """Indexa los días del catálogo que faltan en el índice o tienen otro checksum."""
+    pendientes = sorted(f for f, cs in catalogo.items() if indice["dias"].get(f) != cs)
+    for i, fecha in enumerate(pendientes, start=1):
+        p = ubicar_dia(base_dir, fecha)
+        indexar_dia(indice, fecha, catalogo[fecha], ubicaciones_de_archivo(p) if p else [], base_dir)
+        log(f"[índice] ({i}/{len(pendientes)}) {fecha}")
+    return len(pendientes)
+
+def buscar_en_indice(base_dir: Path, codigos: Iterable[str], indice: Dict[str, Any]
+                     ) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """
+    {codigo: (fecha, licitación)} resolviendo cada código por el índice: lectura
+    directa por offset cuando se puede y, si no, una sola pasada por su día.
+    Un código cuyo día indexado ya no lo trae (índice desfasado) se busca en los
+    demás días, del más reciente al más antiguo, y se corrige su entrada.
+    Los códigos que no están en el índice no aparecen en el resultado.
+    """
+    por_dia: Dict[str, List[Tuple[str, Optional[int]]]] = {}
+    for cod in {str(c).strip() for c in codigos if c}:
+        ent = indice["codigos"].get(cod)
+        if ent: por_dia.setdefault(ent[0], []).append((cod, ent[1]))
+
+    out: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    desfasados: Set[str] = set()
+    for fecha, lista in sorted(por_dia.items()):
+        path = ubicar_dia(base_dir, fecha)
+        if not path:
+            desfasados |= {cod for cod, _ in lista}
+            continue
+        pendientes = set()
+        if formato_de_ruta(path) == "json" and any(off is not None for _, off in lista):
+            with open(path, "rb") as f:
+                for cod, off in lista:
+                    reg = leer_en_offset(f, off) if off is not None else None
+                    if reg is not None and codigo_de(reg) == cod: out[cod] = (fecha, reg)
+                    else: pendientes.add(cod)
+        else:
+            pendientes = {cod for cod, _ in lista}
+        if pendientes:
+            for reg in iterar_archivo(path):
+                if isinstance(reg, dict) and codigo_de(reg) in pendientes:
+                    out[codigo_de(reg)] = (fecha, reg)
+        desfasados |= {cod for cod, _ in lista if cod not in out}
+
+    if desfasados:
+        for cod in desfasados: indice["codigos"].pop(cod, None)
+        reubicar(indice, base_dir, desfasados)
+        por_dia = {}
+        for cod in desfasados & set(indice["codigos"]):
+            por_dia.setdefault(indice["codigos"][cod][0], set()).add(cod)
+        for fecha, cods in por_dia.items():
+            for reg in iterar_archivo(ubicar_dia(base_dir, fecha)):
+                if isinstance(reg, dict) and codigo_de(reg) in cods:
+                    out[codigo_de(reg)] = (fecha, reg)
+    return out
+
+# ============================================================
+# COMANDOS
+# ============================================================
+
+def migrar(base_dir: Path, formato: str):
+    formato = validar_formato(formato)
+    dias = [p for p in todos_los_dias(base_dir) if formato_de_ruta(p) != formato]
+    if not dias:
+        print(f"Nada que migrar: base_local ya está en {formato}.")
+        return
+    t0 = time.time()
+    antes = despues = total = 0
+    indice = cargar_indice() if RUTA_INDICE.exists() else None
+    for i, p in enumerate(dias, start=1):
+        fecha = fecha_de_ruta(p)
+        antes += p.stat().st_size
+        ubic: List[Tuple[str, Optional[int]]] = []
+        n = escribir_dia(base_dir, fecha, iterar_archivo(p), formato,
+                         registrar=lambda reg, off: ubic.append((codigo_de(reg), off)))
+        if indice is not None and fecha in indice["dias"]:
+            indexar_dia(indice, fecha, indice["dias"][fecha], ubic)  # los offsets cambian con el formato
+        despues += ruta_dia(base_dir, fecha, formato).stat().st_size
+        total += n
+        print(f"({i}/{len(dias)}) {fecha}: {n} licitaciones → {formato}")
+    if indice is not None:
+        guardar_indice(indice)
+    print(f"Migrados {len(dias)} días ({total} licitaciones) en {time.time()-t0:.1f}s: "
+          f"{antes/1e6:.1f} MB → {despues/1e6:.1f} MB")
+
+def _leer_legado(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f: return json.load(f)
+
+def _medir_lectura(paths: List[Path], repeticiones: int, lector=leer_archivo) -> Tuple[float, int]:
+    mejor, n = float("inf"), 0
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        n = sum(len(lector(p)) for p in paths)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, n
+
+def benchmark(base_dir: Path, dias: int, repeticiones: int):
+    fuentes = todos_los_dias(base_dir)[-dias:]
+    if not fuentes:
+        print(f"No hay días en {base_dir} para medir.")
+        return
+    formatos = [f for f in EXTENSIONES if f != "jsonl.zst" or zstandard is not None]
+    tmp = Path(tempfile.mkdtemp(prefix="bench_base_local_"))
+    try:
+        filas = []
+        registros_cache = {fecha_de_ruta(p): leer_archivo(p) for p in fuentes}
+        # referencia: el formato histórico (indent=2 + json.load) de las etapas 0/1/5/6
+        legado = []
+        for fecha, regs in registros_cache.items():
+            p = tmp / "legado" / f"{fecha}.json"
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(json.dumps(regs, ensure_ascii=False, indent=2), encoding="utf-8")
+            legado.append(p)
+        seg, n = _medir_lectura(legado, repeticiones, _leer_legado)
+        filas.append(("json (indent=2, legado)", sum(p.stat().st_size for p in legado), seg, n))
+        for fmt in formatos:
+            paths = []
+            for fecha, regs in registros_cache.items():
+                escribir_dia(tmp / fmt, fecha, regs, fmt)
+                paths.append(ruta_dia(tmp / fmt, fecha, fmt))
+            seg, n = _medir_lectura(paths, repeticiones)
+            filas.append((fmt, sum(p.stat().st_size for p in paths), seg, n))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"Lectura de {len(fuentes)} días (mejor de {repeticiones}):")
+    print(f"{'formato':<26}{'MB':>9}{'seg':>9}{'lic/s':>12}{'MB/s':>9}")
+    for fmt, size, seg, n in filas:
+        print(f"{fmt:<26}{size/1e6:>9.2f}{seg:>9.3f}{n/seg if seg else 0:>12.0f}{size/1e6/seg if seg else 0:>9.1f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Backend de almacenamiento de base_local")
+    ap.add_argument("--base-dir", default=str(DATA_DIR), help="Directorio raíz de la base local")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    m = sub.add_parser("migrar", help="Convierte todos los días de base_local a otro formato")
+    m.add_argument("--a", dest="formato", required=True, choices=sorted(EXTENSIONES))
+    b = sub.add_parser("benchmark", help="Mide throughput de lectura de cada formato")
+    b.add_argument("--dias", type=int, default=10, help="Cantidad de días (los más recientes) a usar")
+    b.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+
+    base_dir = Path(args.base_dir)
+    if args.comando == "migrar":
+        migrar(base_dir, args.formato)
+    else:
+        benchmark(base_dir, args.dias, args.repeticiones)
+
+if __name__ == "__main__":
+    main()
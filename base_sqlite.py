@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+base_sqlite.py
+Réplica opcional de base_local en SQLite, indexada por CodigoExterno,
+CodigoEstado, FechaCierre, Tipo y Moneda.
+
+0_actualizar_licitaciones.py la mantiene al día durante la sincronización
+(cada día guarda el checksum del catálogo con que se cargó) y las etapas
+1, 5 y 6 la consultan en vez de recorrer archivos de día. Se activa con
+BASE_LOCAL_SQLITE=1 en el .env; los archivos de base_local siguen siendo
+la fuente de verdad.
+
+Uso como comando:
+  python base_sqlite.py reconstruir     # carga/actualiza todos los días del catálogo local
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, json, os, sqlite3, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+import almacen_local
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parent
+RUTA_DB = Path(os.getenv("BASE_LOCAL_SQLITE_RUTA", str(BASE_DIR / "base_local.sqlite")))
+CATALOGO_LOCAL = BASE_DIR / "catalog_local.json"
+TAM_LOTE_IN = 500  # códigos por consulta IN (...)
+
+# `estado` va sin tipo declarado: SQLite guarda el valor tal cual viene en el JSON
+# (5 y "5" no son lo mismo), igual que la comparación de pasa_filtros_duros.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS licitaciones (
+    dia          TEXT    NOT NULL,
+    pos          INTEGER NOT NULL,
+    codigo       TEXT,
+    estado,
+    fecha_cierre TEXT,
+    tipo         TEXT,
+    moneda       TEXT,
+    datos        TEXT    NOT NULL,
+    PRIMARY KEY (dia, pos)
+);
+CREATE INDEX IF NOT EXISTS idx_lic_codigo       ON licitaciones(codigo);
+CREATE INDEX IF NOT EXISTS idx_lic_estado       ON licitaciones(dia, estado);
+CREATE INDEX IF NOT EXISTS idx_lic_fecha_cierre ON licitaciones(fecha_cierre);
+CREATE INDEX IF NOT EXISTS idx_lic_tipo         ON licitaciones(tipo);
+CREATE INDEX IF NOT EXISTS idx_lic_moneda       ON licitaciones(moneda);
+CREATE TABLE IF NOT EXISTS dias (
+    dia         TEXT PRIMARY KEY,
+    checksum    TEXT,
+    n           INTEGER,
+    actualizado TEXT
+);
+"""
+
+def activo() -> bool:
+    return os.getenv("BASE_LOCAL_SQLITE", "0").strip().lower() in ("1", "true", "si", "sí")
+
+def conectar(ruta: Path = RUTA_DB) -> sqlite3.Connection:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(ruta), timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(ESQUEMA)
+    return con
+
+def conectar_si_activo(ruta: Path = RUTA_DB) -> Optional[sqlite3.Connection]:
+    """Conexión sólo si la réplica está habilitada y ya existe (las etapas lectoras no la crean)."""
+    if not activo() or not ruta.exists(): return None
+    try: return conectar(ruta)
+    except sqlite3.Error: return None
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+
+def _texto(v: Any) -> Optional[str]:
+    return None if v is None else str(v).strip()
+
+def _fila(fecha: str, pos: int, lic: Dict[str, Any]) -> Tuple:
+    return (
+        fecha, pos, _texto(lic.get("CodigoExterno")), lic.get("CodigoEstado"),
+        _texto((lic.get("Fechas") or {}).get("FechaCierre")),
+        (_texto(lic.get("Tipo")) or "").upper() or None,
+        (_texto(lic.get("Moneda")) or "").upper() or None,
+        json.dumps(lic, ensure_ascii=False, separators=(",", ":")),
+    )
+
+def reemplazar_dia(con: sqlite3.Connection, fecha: str, checksum: Optional[str],
+                   registros: Iterable[Dict[str, Any]]) -> int:
+    """Reemplaza todas las filas de `fecha` en una sola transacción."""
+    n = 0
+    def filas():
+        nonlocal n
+        for pos, lic in enumerate(registros):
+            if isinstance(lic, dict):
+                n += 1
+                yield _fila(fecha, pos, lic)
+    with con:
+        con.execute("DELETE FROM licitaciones WHERE dia = ?", (fecha,))
+        con.executemany("INSERT INTO licitaciones VALUES (?,?,?,?,?,?,?,?)", filas())
+        con.execute("INSERT OR REPLACE INTO dias VALUES (?,?,?,datetime('now'))", (fecha, checksum, n))
+    return n
+
+def cargar_dia_desde_archivo(con: sqlite3.Connection, base_dir: Path, fecha: str, checksum: Optional[str]) -> int:
+    p = almacen_local.ubicar_dia(base_dir, fecha)
+    return reemplazar_dia(con, fecha, checksum, almacen_local.iterar_archivo(p) if p else [])
+
+def sincronizar_con_catalogo(con: sqlite3.Connection, base_dir: Path, catalogo: Dict[str, str],
+                             log=print) -> int:
+    """Carga los días del catálogo local que faltan en la réplica o tienen otro checksum."""
+    cargados = dict(con.execute("SELECT dia, checksum FROM dias"))
+    pendientes = sorted(f for f, cs in catalogo.items() if cargados.get(f) != cs)
+    for i, fecha in enumerate(pendientes, start=1):
+        n = cargar_dia_desde_archivo(con, base_dir, fecha, catalogo[fecha])
+        log(f"[sqlite] ({i}/{len(pendientes)}) {fecha}: {n} licitaciones")
+    return len(pendientes)
+
+def actualizar_estado(con: sqlite3.Connection, fecha: str, codigo: str, lic: Dict[str, Any]):
+    """Refleja en la réplica un cambio hecho a un registro de base_local (p. ej. CodigoEstado)."""
+    with con:
+        con.execute("UPDATE licitaciones SET estado = ?, datos = ? WHERE dia = ? AND codigo = ?",
+                    (lic.get("CodigoEstado"), json.dumps(lic, ensure_ascii=False, separators=(",", ":")),
+                     fecha, codigo))
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def dia_vigente(con: sqlite3.Connection, fecha: str, checksum: Optional[str]) -> bool:
+    """True si la réplica tiene `fecha` cargada con el mismo checksum del catálogo local."""
+    row = con.execute("SELECT checksum FROM dias WHERE dia = ?", (fecha,)).fetchone()
+    return row is not None and row[0] == checksum
+
+def leer_dia(con: sqlite3.Connection, fecha: str, estados: Optional[Iterable[Any]] = None
+             ) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Registros de `fecha` en el orden original y el total del día. Si se pasan
+    `estados`, sólo se decodifican las filas con CodigoEstado en ese conjunto.
+    """
+    total = con.execute("SELECT n FROM dias WHERE dia = ?", (fecha,)).fetchone()
+    total = total[0] if total else 0
+    if estados is None:
+        rows = con.execute("SELECT datos FROM licitaciones WHERE dia = ? ORDER BY pos", (fecha,))
+    else:
+        estados = list(estados)
+        if not estados: return [], total
+        marcas = ",".join("?" * len(estados))
+        rows = con.execute(f"SELECT datos FROM licitaciones WHERE dia = ? AND estado IN ({marcas}) ORDER BY pos",
+                           (fecha, *estados))
+    return [json.loads(r[0]) for r in rows], total
+
+def versiones_dia(con: sqlite3.Connection, fecha: str, campos: Iterable[str]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    (codigo, valores de Fechas.<campo>) de todas las filas del día, sin decodificar
+    `datos` en Python (json_extract). Sirve para deduplicar versiones cuando la
+    consulta del filtro sólo trajo algunos estados.
+    """
+    campos = list(campos)
+    cols = ", ".join(f"json_extract(datos, '$.Fechas.{c}')" for c in campos)
+    rows = con.execute(f"SELECT codigo, {cols} FROM licitaciones WHERE dia = ? ORDER BY pos", (fecha,))
+    return [(r[0] or "", tuple(str(v or "") for v in r[1:])) for r in rows]
+
+def buscar_codigos(con: sqlite3.Connection, codigos: Iterable[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """{codigo: (dia, licitación)} con la versión del día más reciente de cada código."""
+    objetivos = sorted({str(c).strip() for c in codigos if c})
+    out: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for i in range(0, len(objetivos), TAM_LOTE_IN):
+        lote = objetivos[i:i + TAM_LOTE_IN]
+        marcas = ",".join("?" * len(lote))
+        for cod, dia, datos in con.execute(
+                f"SELECT codigo, dia, datos FROM licitaciones WHERE codigo IN ({marcas}) ORDER BY dia, pos", lote):
+            out[cod] = (dia, json.loads(datos))
+    return out
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    ap = argparse.ArgumentParser(description="Réplica SQLite de base_local")
+    ap.add_argument("--base-dir", default=str(almacen_local.DATA_DIR), help="Directorio raíz de la base local")
+    ap.add_argument("--catalog", default=str(CATALOGO_LOCAL), help="Ruta a catalog_local.json")
+    ap.add_argument("--db", default=str(RUTA_DB), help="Ruta del archivo SQLite")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir", help="Carga los días del catálogo local que falten o hayan cambiado")
+    args = ap.parse_args()
+
+    try:
+        catalogo = json.loads(Path(args.catalog).read_text(encoding="utf-8"))
+    except Exception:
+        catalogo = {}
+    if not isinstance(catalogo, dict) or not catalogo:
+        print(f"No hay catálogo local en {args.catalog}")
+        return
+
+    t0 = time.time()
+    con = conectar(Path(args.db))
+    n = sincronizar_con_catalogo(con, Path(args.base_dir), catalogo)
+    con.close()
+    print(f"Réplica SQLite al día ({n} días cargados en {time.time()-t0:.1f}s): {args.db}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+correr.py
+Benchmarks del filtro duro y del scoring sobre licitaciones sintéticas (generador.py).
+
+Suites:
+  filtro_duro           pasa_filtros_duros (versión sin compilar)
+  filtro_compilado      FiltroDuro.filtrar (compilar_filtro)
+  match_tematico        score_match_tematico
+  procesar_cliente      2_scoring.procesar_cliente completo (dry-run, sin cache) sobre un archivo generado
+
+Cada caso es (suite, registros, clientes). Para no medir la generación ni llenar
+la memoria, las suites por función recorren una muestra de a lo más MUESTRA
+licitaciones distintas hasta completar los registros pedidos.
+
+Uso:
+  python benchmarks/correr.py                       # 10k registros, 1 y 10 clientes
+  python benchmarks/correr.py --completo            # 10k/100k/1M registros x 1/10/100 clientes
+  python benchmarks/correr.py --comparar benchmarks/resultados/bench_<ts>.json
+
+Costo de --completo: procesar_cliente lee un consolidado real, así que por cada
+tamaño se escribe uno en un directorio temporal (--tmp, default el del sistema):
+~1,5 KB por registro, ~1,5 GB para 1M. Si no hay espacio libre suficiente, ese
+tamaño se salta para procesar_cliente con un aviso. Con 1M registros x 100
+clientes esa suite tarda horas; --suites permite dejarla fuera.
+
+Las mismas suites están como funciones de pytest-benchmark en test_benchmarks.py
+(pytest benchmarks/ --benchmark-only) para quien tenga ese plugin; este script
+no lo requiere y además guarda el JSON comparable con --comparar.
+
+Los resultados quedan en benchmarks/resultados/bench_<timestamp>.json. Con
+--comparar se imprime la razón contra una corrida anterior y se marca como
+regresión lo que tarde más de --tolerancia (default 10%); en ese caso sale con 1.
+Los casos de menos de MIN_SEGUNDOS_COMPARABLE no cuentan.
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, contextlib, datetime, importlib.util, io, json, platform, shutil, subprocess, tempfile, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+import flujo_json
+import generador
+
+MUESTRA = 20_000
+BYTES_POR_REGISTRO = 1_600  # tamaño aproximado de una licitación de generador.py en el consolidado
+MIN_SEGUNDOS_COMPARABLE = 0.05  # casos más cortos son puro ruido: se muestran pero no cuentan como regresión
+SUITES = ("filtro_duro", "filtro_compilado", "match_tematico", "procesar_cliente")
+
+def _cargar_script(nombre: str):
+    spec = importlib.util.spec_from_file_location(Path(nombre).stem.replace("-", "_"), str(BASE_DIR / nombre))
+    mod = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(mod)                # type: ignore
+    return mod
+
+def _ciclo(muestra: List[Dict[str, Any]], n: int):
+    p = len(muestra)
+    for k in range(n):
+        yield muestra[k % p]
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+# ============================================================
+# SUITES
+# ============================================================
+
+def _caso_funcion(fn: Callable[[Dict[str, Any], Any], Any], muestra, cfgs, n: int) -> float:
+    t0 = time.perf_counter()
+    for cfg in cfgs:
+        for lic in _ciclo(muestra, n):
+            fn(lic, cfg)
+    return time.perf_counter() - t0
+
+def _caso_compilado(filtro_duro, muestra, cfgs, n: int) -> float:
+    ahora = datetime.datetime.now()
+    lics = list(_ciclo(muestra, n))
+    t0 = time.perf_counter()
+    for cfg in cfgs:
+        filtro_duro.compilar_filtro(cfg, ahora).filtrar(lics)
+    return time.perf_counter() - t0
+
+def _caso_procesar(scoring, entrada: Path, cfgs) -> float:
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for cfg in cfgs:
+            scoring.procesar_cliente(cfg, str(entrada), None, False, 20, dry_run=True, usar_cache=False)
+    return time.perf_counter() - t0
+
+def correr(suites: List[str], registros: List[int], clientes: List[int], repeticiones: int,
+           densidad: float, semilla: int, tmp_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    filtro_duro = _cargar_script("1_filtro_duro.py")
+    scoring = _cargar_script("2_scoring.py")
+    muestra = list(generador.generar(min(MUESTRA, max(registros)), semilla, densidad))
+    casos: List[Dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        for n in registros:
+            entrada = Path(tmp) / f"consolidado_{n}.json"
+            suites_n = list(suites)
+            if "procesar_cliente" in suites:
+                necesario, libre = n * BYTES_POR_REGISTRO, shutil.disk_usage(tmp).free
+                if necesario > 0.9 * libre:
+                    print(f"  ⚠️ procesar_cliente n={n} omitido: el consolidado ocupa ~{necesario / 1e6:,.0f} MB "
+                          f"y en {tmp} hay {libre / 1e6:,.0f} MB libres")
+                    suites_n.remove("procesar_cliente")
+                else:
+                    print(f"  📝 consolidado de {n} registros (~{necesario / 1e6:,.1f} MB) en {tmp}")
+                    flujo_json.escribir_arreglo(entrada, generador.generar(n, semilla, densidad))
+            for c in clientes:
+                for suite in suites_n:
+                    tiempos = []
+                    for _ in range(repeticiones):
+                        # configs nuevos en cada repetición: sin matchers ni índices ya armados
+                        cfgs = [generador.config_sintetico(j, str(Path(tmp) / "salida"), semilla) for j in range(c)]
+                        if suite == "filtro_duro":
+                            tiempos.append(_caso_funcion(filtro_duro.pasa_filtros_duros, muestra, cfgs, n))
+                        elif suite == "filtro_compilado":
+                            tiempos.append(_caso_compilado(filtro_duro, muestra, cfgs, n))
+                        elif suite == "match_tematico":
+                            tiempos.append(_caso_funcion(scoring.score_match_tematico, muestra, cfgs, n))
+                        else:
+                            tiempos.append(_caso_procesar(scoring, entrada, cfgs))
+                    seg = min(tiempos)
+                    caso = {"suite": suite, "registros": n, "clientes": c, "segundos": round(seg, 4),
+                            "us_por_evaluacion": round(seg * 1e6 / (n * c), 3)}
+                    casos.append(caso)
+                    print(f"  {suite:<17} n={n:<8} clientes={c:<4} {seg:9.3f}s  {caso['us_por_evaluacion']:8.2f} µs/eval")
+            if entrada.exists(): entrada.unlink()
+    return casos
+
+# ============================================================
+# COMPARACIÓN
+# ============================================================
+
+def comparar(actual: List[Dict[str, Any]], previo_path: Path, tolerancia: float) -> int:
+    """Imprime actual/previo por caso y retorna cuántas regresiones hay."""
+    with open(previo_path, "r", encoding="utf-8") as f:
+        previo = {(c["suite"], c["registros"], c["clientes"]): c for c in json.load(f).get("casos", [])}
+    regresiones = 0
+    print(f"\nComparación con {previo_path.name}:")
+    for c in actual:
+        p = previo.get((c["suite"], c["registros"], c["clientes"]))
+        if not p or not p.get("segundos"): continue
+        razon = c["segundos"] / p["segundos"]
+        if max(c["segundos"], p["segundos"]) < MIN_SEGUNDOS_COMPARABLE: marca = "(muy corto)"
+        elif razon > 1 + tolerancia: marca = "⚠️ regresión"; regresiones += 1
+        elif razon < 1 - tolerancia: marca = "🚀"
+        else: marca = ""
+        print(f"  {c['suite']:<17} n={c['registros']:<8} clientes={c['clientes']:<4} x{razon:.2f} {marca}")
+    return regresiones
+
+# ============================================================
+# CLI
+# ============================================================
+
+def _lista_int(s: str) -> List[int]:
+    return [int(x.replace("_", "")) for x in s.split(",") if x.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks de filtro duro y scoring con datos sintéticos")
+    ap.add_argument("--suites", default=",".join(SUITES), help=f"Suites separadas por coma ({', '.join(SUITES)})")
+    ap.add_argument("--registros", type=_lista_int, default=[10_000], help="Tamaños, p. ej. 10000,100000")
+    ap.add_argument("--clientes", type=_lista_int, default=[1, 10], help="Cantidades de clientes, p. ej. 1,10,100")
+    ap.add_argument("--completo", action="store_true",
+                    help="10k/100k/1M registros x 1/10/100 clientes (escribe ~1,5 GB temporales y tarda horas)")
+    ap.add_argument("--tmp", default=None, help="Directorio para los consolidados temporales de procesar_cliente")
+    ap.add_argument("--repeticiones", type=int, default=1, help="Se reporta el mejor tiempo (default 1)")
+    ap.add_argument("--densidad", type=float, default=0.1, help="Fracción de palabras que son keywords")
+    ap.add_argument("--semilla", type=int, default=1)
+    ap.add_argument("--salida", default=None, help="JSON de resultados (default benchmarks/resultados/bench_<ts>.json)")
+    ap.add_argument("--comparar", default=None, help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--tolerancia", type=float, default=0.10, help="Holgura antes de marcar regresión (default 0.10)")
+    args = ap.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    desconocidas = [s for s in suites if s not in SUITES]
+    if desconocidas: ap.error(f"suites desconocidas: {desconocidas}")
+    registros = [10_000, 100_000, 1_000_000] if args.completo else args.registros
+    clientes = [1, 10, 100] if args.completo else args.clientes
+
+    print(f"🏁 Benchmarks: suites={suites}, registros={registros}, clientes={clientes}")
+    casos = correr(suites, registros, clientes, max(1, args.repeticiones), args.densidad, args.semilla, args.tmp)
+
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    salida = Path(args.salida) if args.salida else BENCH_DIR / "resultados" / f"bench_{ts}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "generado": ts, "commit": _commit(), "python": platform.python_version(),
+            "plataforma": platform.platform(), "densidad": args.densidad, "semilla": args.semilla,
+            "muestra": MUESTRA, "casos": casos,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"💾 {salida}")
+
+    if args.comparar and comparar(casos, Path(args.comparar), args.tolerancia):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+generador.py
+Licitaciones y configs de cliente sintéticos para los benchmarks.
+
+Las licitaciones tienen la forma que usan pasa_filtros_duros y los score_* de
+2_scoring.py: CodigoEstado, Tipo, Moneda, MontoEstimado, Fechas, Comprador,
+Items.Listado con códigos UNSPSC y Nombre/Descripcion en español, donde una
+fracción `densidad` de las palabras sale del vocabulario de keywords.
+
+Uso:
+  python benchmarks/generador.py --n 10000 --salida /tmp/consolidado.json [--densidad 0.1] [--semilla 1]
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, datetime, random
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import flujo_json
+
+# ============================================================
+# VOCABULARIO
+# ============================================================
+
+KEYWORDS = [
+    "educación", "capacitación", "formación", "enseñanza", "aprendizaje", "curso", "cursos",
+    "taller", "talleres", "social", "comunitario", "inclusión", "vulnerable", "participación",
+    "ciudadana", "empoderamiento", "liderazgo", "jóvenes", "mujeres", "adulto mayor",
+    "proyecto social", "consultoría", "asesoría", "estudio", "diagnóstico", "evaluación",
+    "investigación", "informe", "seminario", "diplomado",
+]
+PENALIZADORAS = [
+    "construcción", "mantenimiento", "obras", "infraestructura", "pavimento", "iluminación",
+    "plaza", "pintura", "electricidad", "equipamiento", "muebles", "hospital", "edificio",
+    "camino", "insumos", "equipamiento médico",
+]
+RELLENO = (
+    "servicio de para la del en los las con por municipalidad región comuna programa "
+    "adquisición contratación ejecución apoyo gestión desarrollo mejoramiento licitación "
+    "pública bases técnicas administrativas plazo entrega unidad requirente dirección "
+    "departamento oficina anual período año según anexo oferta proveedor"
+).split()
+TIPOS = ["L1", "LE", "LP", "LQ", "LR", "LS", "E2", "CO", "B2", "H2"]
+MONEDAS = ["CLP", "CLP", "CLP", "CLP", "CLF", "UTM", "USD", "EUR"]
+ESTADOS = [5, 5, 5, 6, 6, 7, 8, 18, 19]
+REGIONES = [
+    "Región Metropolitana de Santiago", "Región de Valparaíso", "Región del Biobío",
+    "Región de la Araucanía", "Región de Los Lagos", "Región de Antofagasta",
+    "Región de Coquimbo", "Región del Maule", "Región de Ñuble", "Región de Tarapacá",
+]
+SEGMENTOS_UNSPSC = ["86", "93", "80", "92", "72", "43", "44", "42", "25", "56", "30", "81"]
+
+# ============================================================
+# LICITACIONES
+# ============================================================
+
+def _codigo_unspsc(rnd: random.Random) -> str:
+    return rnd.choice(SEGMENTOS_UNSPSC) + "".join(str(rnd.randint(0, 9)) for _ in range(2)) + \
+        rnd.choice(["15", "16", "17"]) + rnd.choice(["00", "01", "02", "05", "10"])
+
+def _frase(rnd: random.Random, palabras: int, densidad: float) -> str:
+    out: List[str] = []
+    for _ in range(palabras):
+        r = rnd.random()
+        if r < densidad * 0.75: out.append(rnd.choice(KEYWORDS))
+        elif r < densidad: out.append(rnd.choice(PENALIZADORAS))
+        else: out.append(rnd.choice(RELLENO))
+    if out: out[0] = out[0].capitalize()
+    return " ".join(out)
+
+def generar_licitacion(rnd: random.Random, i: int, ahora: datetime.datetime, densidad: float = 0.1) -> Dict[str, Any]:
+    publicacion = ahora - datetime.timedelta(days=rnd.randint(0, 30), seconds=rnd.randint(0, 86399))
+    cierre = ahora + datetime.timedelta(days=rnd.randint(-5, 60), seconds=rnd.randint(0, 86399))
+    monto = rnd.choice([None, 0, rnd.randint(100_000, 2_000_000_000), rnd.randint(1_000_000, 80_000_000)])
+    items = [{
+        "Correlativo": k + 1,
+        "CodigoCategoria": _codigo_unspsc(rnd),
+        "NombreProducto": _frase(rnd, 4, densidad),
+        "Cantidad": rnd.randint(1, 50),
+    } for k in range(rnd.choice([1, 1, 2, 3, 5, 8, 20]))]
+    lic = {
+        "CodigoExterno": f"{1000 + i % 9000}-{i // 9000 + 1}-{rnd.choice(TIPOS)}25",
+        "Nombre": _frase(rnd, rnd.randint(4, 12), densidad),
+        "Descripcion": _frase(rnd, rnd.randint(15, 80), densidad),
+        "CodigoEstado": rnd.choice(ESTADOS),
+        "Tipo": rnd.choice(TIPOS),
+        "Moneda": rnd.choice(MONEDAS),
+        "MontoEstimado": monto,
+        "VisibilidadMonto": 1 if monto else rnd.choice([0, 1]),
+        "Fechas": {
+            "FechaPublicacion": publicacion.strftime("%Y-%m-%dT%H:%M:%S"),
+            "FechaCierre": cierre.strftime("%Y-%m-%dT%H:%M:%S"),
+            "FechaAdjudicacion": (cierre + datetime.timedelta(days=20)).strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "Comprador": {"NombreOrganismo": "Municipalidad de " + rnd.choice(RELLENO).capitalize(),
+                      "RegionUnidad": rnd.choice(REGIONES)},
+        "Items": {"Cantidad": len(items), "Listado": items},
+    }
+    if rnd.random() < 0.3:
+        lic["DiasCierreLicitacion"] = str((cierre - ahora).days)
+    return lic
+
+def generar(n: int, semilla: int = 1, densidad: float = 0.1,
+            ahora: datetime.datetime = None) -> Iterator[Dict[str, Any]]:
+    rnd = random.Random(semilla)
+    ahora = ahora or datetime.datetime.now()
+    for i in range(n):
+        yield generar_licitacion(rnd, i, ahora, densidad)
+
+# ============================================================
+# CONFIGS DE CLIENTE
+# ============================================================
+
+def config_sintetico(j: int, directorio_salida: str = "./resultados/bench", semilla: int = 1) -> SimpleNamespace:
+    """Config con las claves que usan 1_filtro_duro.py y 2_scoring.py; varía con j."""
+    rnd = random.Random(semilla * 1000 + j)
+    return SimpleNamespace(
+        NOMBRE_CLIENTE=f"BENCH_{j:03d}",
+        DIRECTORIO_SALIDA=directorio_salida,
+        MONTO_MINIMO=rnd.choice([0, 500_000, 1_000_000]),
+        MONTO_MAXIMO=rnd.choice([300_000_000, 900_000_000, 2_000_000_000]),
+        TIPOS_LICITACION_ACEPTABLES=rnd.sample(TIPOS, rnd.randint(4, 8)),
+        ESTADOS_ACEPTABLES=[5, 6],
+        MONEDAS_ACEPTABLES=["CLP", "CLF", "UTM"],
+        DIAS_MINIMOS_PREPARACION=rnd.choice([3, 5, 7, 10]),
+        MAX_DIAS_ATRAS=15,
+        PONDERACIONES={"match_tematico": 40, "viabilidad_financiera": 25,
+                       "oportunidad_temporal": 20, "ventaja_geografica": 15},
+        CATEGORIAS_UNSPSC_RELEVANTES=[_codigo_unspsc(rnd) for _ in range(rnd.randint(5, 40))],
+        KEYWORDS_TEMATICAS=rnd.sample(KEYWORDS, rnd.randint(10, len(KEYWORDS))),
+        KEYWORDS_PENALIZADORAS=rnd.sample(PENALIZADORAS, rnd.randint(4, len(PENALIZADORAS))),
+        NORMALIZAR_TEXTO=rnd.random() < 0.5,
+        PESO_CATEGORIA_UNSPSC=0.6, PESO_KEYWORDS=0.4, MIN_KEYWORDS_MATCH=2,
+        MONTO_OPTIMO_MIN=5_000_000, MONTO_OPTIMO_MAX=50_000_000,
+        DIAS_OPTIMOS_PREPARACION=14, DIAS_MAXIMOS_BENEFICIO=30,
+        REGIONES_PRIORITARIAS=rnd.sample(REGIONES, rnd.randint(1, 3)),
+        SCORE_MINIMO_RESULTADO=30,
+    )
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main():
+    ap = argparse.ArgumentParser(description="Genera un resultados_consolidados sintético")
+    ap.add_argument("--n", type=int, default=10_000, help="Cantidad de licitaciones")
+    ap.add_argument("--salida", required=True, help="Archivo JSON a escribir")
+    ap.add_argument("--densidad", type=float, default=0.1, help="Fracción de palabras que son keywords (default 0.1)")
+    ap.add_argument("--semilla", type=int, default=1)
+    args = ap.parse_args()
+    n = flujo_json.escribir_arreglo(Path(args.salida), generar(args.n, args.semilla, args.densidad))
+    print(f"✅ {n} licitaciones en {args.salida}")
+
+if __name__ == "__main__":
+    main()
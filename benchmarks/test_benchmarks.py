@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+test_benchmarks.py
+Las suites de correr.py como funciones de pytest-benchmark, con 10k registros y
+1 y 10 clientes (lo mismo que correr.py por defecto):
+
+  pytest benchmarks/ --benchmark-only [--benchmark-autosave] [--benchmark-compare]
+
+Se saltan si el plugin pytest-benchmark no está instalado.
+"""
+import sys
+sys.dont_write_bytecode = True
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import correr, flujo_json, generador
+
+REGISTROS = 10_000
+CLIENTES = [1, 10]
+SEMILLA, DENSIDAD = 1, 0.1
+RONDAS = 3
+
+@pytest.fixture(scope="module")
+def filtro_duro():
+    return correr._cargar_script("1_filtro_duro.py")
+
+@pytest.fixture(scope="module")
+def scoring():
+    return correr._cargar_script("2_scoring.py")
+
+@pytest.fixture(scope="module")
+def muestra():
+    return list(generador.generar(min(correr.MUESTRA, REGISTROS), SEMILLA, DENSIDAD))
+
+@pytest.fixture(scope="module")
+def entrada(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bench") / f"consolidado_{REGISTROS}.json"
+    flujo_json.escribir_arreglo(path, generador.generar(REGISTROS, SEMILLA, DENSIDAD))
+    return path
+
+def _medir(benchmark, caso, clientes: int, salida: Path):
+    def cfgs():
+        # configs nuevos en cada ronda: sin matchers ni índices ya armados
+        return ([generador.config_sintetico(j, str(salida), SEMILLA) for j in range(clientes)],), {}
+    benchmark.extra_info.update(registros=REGISTROS, clientes=clientes)
+    benchmark.pedantic(caso, setup=cfgs, rounds=RONDAS)
+
+@pytest.mark.parametrize("clientes", CLIENTES)
+def test_filtro_duro(benchmark, filtro_duro, muestra, clientes, tmp_path):
+    _medir(benchmark, lambda cfgs: correr._caso_funcion(filtro_duro.pasa_filtros_duros, muestra, cfgs, REGISTROS),
+           clientes, tmp_path)
+
+@pytest.mark.parametrize("clientes", CLIENTES)
+def test_filtro_compilado(benchmark, filtro_duro, muestra, clientes, tmp_path):
+    _medir(benchmark, lambda cfgs: correr._caso_compilado(filtro_duro, muestra, cfgs, REGISTROS), clientes, tmp_path)
+
+@pytest.mark.parametrize("clientes", CLIENTES)
+def test_match_tematico(benchmark, scoring, muestra, clientes, tmp_path):
+    _medir(benchmark, lambda cfgs: correr._caso_funcion(scoring.score_match_tematico, muestra, cfgs, REGISTROS),
+           clientes, tmp_path)
+
+@pytest.mark.parametrize("clientes", CLIENTES)
+def test_procesar_cliente(benchmark, scoring, entrada, clientes, tmp_path):
+    _medir(benchmark, lambda cfgs: correr._caso_procesar(scoring, entrada, cfgs), clientes, tmp_path)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+calibrar_umbral.py
+Calibra, por cliente, el score mínimo con que una licitación pasa a la IA (etapa 4).
+
+Cruza el score_total de las ejecuciones guardadas (resultados/<cliente>/AAAA/MM/*_alas_*.json,
+lista "resumen") con las decisiones SI/NO de historial/ia_<cliente>.json (memoria_ia.py) y arma, para
+cada umbral, el recall de los SI y el volumen de llamadas que quedarían. Recomienda el
+umbral más alto que mantiene el recall objetivo y lo deja en historial/umbral_ia_<cliente>.json.
+Con --aplicar, 4_filtro_IA.py deja de enviar a la IA lo que quede bajo ese umbral, salvo una
+muestra fija de FRACCION_EXPLORACION (por hash del CodigoExterno). Desde que se aplica un umbral,
+bajo el más alto aplicado sólo cuentan las decisiones de esa muestra, cada una con peso
+1/FRACCION_EXPLORACION: así las calibraciones siguientes no quedan sesgadas hacia arriba.
+Lo mismo con el prefiltro semántico: lo que decide no llega a la memoria, salvo la misma
+muestra, que va igual a la IA (queda en ia_filtro con "prefiltro") y aquí pesa 1/FRACCION_EXPLORACION.
+
+Uso:
+  python calibrar_umbral.py [--recall 0.95] [--cliente cenda] [--aplicar]
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, datetime, importlib.util, json, zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import memoria_ia
+
+BASE_DIR     = Path(__file__).resolve().parent
+CLIENTES_DIR = BASE_DIR / "clientes"
+HIST_DIR     = BASE_DIR / "historial"
+
+RECALL_OBJETIVO = 0.95
+MIN_SI = 20  # con menos SI etiquetados la curva no es confiable: no se recomienda umbral
+FRACCION_EXPLORACION = 0.05  # bajo el umbral aplicado, esta fracción igual va a la IA
+
+# ============================================================
+# UTILIDADES
+# ============================================================
+
+def path_umbral(nombre_cliente: str) -> Path:
+    return HIST_DIR / f"umbral_ia_{nombre_cliente.lower()}.json"
+
+def umbral_aplicado(nombre_cliente: str) -> Optional[float]:
+    """Umbral calibrado y marcado para aplicar (None si no hay o no se aplica)."""
+    data = leer_umbral(nombre_cliente)
+    if not data.get("aplicar") or data.get("umbral") is None: return None
+    try: return float(data["umbral"])
+    except (TypeError, ValueError): return None
+
+def leer_umbral(nombre_cliente: str) -> Dict[str, Any]:
+    try: data = json.loads(path_umbral(nombre_cliente).read_text(encoding="utf-8"))
+    except Exception: return {}
+    return data if isinstance(data, dict) else {}
+
+def umbral_max_aplicado(data: Dict[str, Any]) -> Optional[float]:
+    """El umbral más alto que se ha aplicado (bajo él, sólo la muestra de exploración tiene etiqueta segura)."""
+    vals = [data.get("umbral_max_aplicado")] + ([data.get("umbral")] if data.get("aplicar") else [])
+    vals = [float(v) for v in vals if isinstance(v, (int, float))]
+    return max(vals) if vals else None
+
+def en_exploracion(codigo: str) -> bool:
+    """Muestra determinística (crc32 del CodigoExterno) de lo bajo el umbral que igual va a la IA."""
+    return zlib.crc32(f"exploracion\x00{codigo}".encode("utf-8")) % 10_000 < FRACCION_EXPLORACION * 10_000
+
+def cargar_config_cliente(path: Path):
+    spec = importlib.util.spec_from_file_location(path.stem, str(path))
+    mod  = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(mod)                  # type: ignore
+    return mod
+
+def scores_ejecuciones(salida_base: Path) -> Dict[str, float]:
+    """CodigoExterno -> score_total de la ejecución más reciente que lo trae."""
+    out: Dict[str, float] = {}
+    for p in sorted(salida_base.glob("*/*/*_alas_*.json"), key=lambda x: x.stat().st_mtime):
+        try: data = json.loads(p.read_text(encoding="utf-8"))
+        except Exception: continue
+        for it in (data.get("resumen") or []) if isinstance(data, dict) else []:
+            if isinstance(it, dict) and it.get("CodigoExterno") and isinstance(it.get("score_total"), (int, float)):
+                out[it["CodigoExterno"]] = float(it["score_total"])
+    return out
+
+def auditadas_prefiltro(salida_base: Path) -> Set[str]:
+    """Códigos que el prefiltro habría decidido y fueron a la IA como muestra de exploración."""
+    out: Set[str] = set()
+    for p in salida_base.glob("*/*/*_alas_*.json"):
+        try: data = json.loads(p.read_text(encoding="utf-8"))
+        except Exception: continue
+        for it in (data.get("ia_filtro") or []) if isinstance(data, dict) else []:
+            if isinstance(it, dict) and it.get("CodigoExterno") and it.get("prefiltro"):
+                out.add(it["CodigoExterno"])
+    return out
+
+# ============================================================
+# CALIBRACIÓN
+# ============================================================
+
+def curva(muestras: List[Tuple[float, bool, float]]) -> List[Dict[str, Any]]:
+    """
+    Por cada score distinto (como umbral): recall de los SI y llamadas que quedan (score >= umbral).
+    Cada muestra (score, es_si, peso) cuenta `peso` veces (1/probabilidad de que se haya etiquetado).
+    """
+    total, total_si = sum(p for _, _, p in muestras), sum(p for _, si, p in muestras if si)
+    puntos: List[Dict[str, Any]] = []
+    llamadas = si_sobre = 0.0
+    # de mayor a menor score: al bajar el umbral se acumulan llamadas y SI
+    orden = sorted(muestras, key=lambda x: -x[0])
+    i = 0
+    while i < len(orden):
+        s = orden[i][0]
+        while i < len(orden) and orden[i][0] == s:
+            llamadas += orden[i][2]; si_sobre += orden[i][2] * orden[i][1]; i += 1
+        puntos.append({
+            "umbral": s, "llamadas": round(llamadas, 2), "llamadas_pct": round(100.0 * llamadas / total, 2),
+            "si": round(si_sobre, 2), "recall": round(si_sobre / total_si, 4) if total_si else 0.0,
+        })
+    return list(reversed(puntos))
+
+def recomendar(puntos: List[Dict[str, Any]], recall_objetivo: float) -> Optional[Dict[str, Any]]:
+    """Umbral más alto (menos llamadas) con recall >= objetivo."""
+    ok = [p for p in puntos if p["recall"] >= recall_objetivo]
+    return max(ok, key=lambda p: p["umbral"]) if ok else None
+
+def calibrar_cliente(cfg_path: Path, recall_objetivo: float, aplicar: bool, dry_run: bool) -> Optional[Dict[str, Any]]:
+    nombre_cliente = cfg_path.name.replace("_config.py", "")
+    cfg = cargar_config_cliente(cfg_path)
+    salida_base = Path(getattr(cfg, "DIRECTORIO_SALIDA", BASE_DIR / "resultados" / nombre_cliente.lower()))
+    ctxs = memoria_ia.contextos_cfg(cfg)
+
+    decisiones = memoria_ia.decisiones_cliente(nombre_cliente, ctxs)
+    scores = scores_ejecuciones(salida_base)
+    # bajo el umbral más alto aplicado, y entre lo que decide el prefiltro, sólo la muestra
+    # de exploración se etiquetó sin sesgo: pesa por todas las que representa
+    previo = leer_umbral(nombre_cliente)
+    limite = umbral_max_aplicado(previo)
+    auditadas = auditadas_prefiltro(salida_base)
+    muestras: List[Tuple[float, bool, float]] = []
+    fuera = 0
+    for c, d in decisiones.items():
+        if c not in scores: continue
+        if limite is not None and scores[c] < limite:
+            if not en_exploracion(c): fuera += 1; continue
+            muestras.append((scores[c], d == "SI", 1.0 / FRACCION_EXPLORACION))
+        else:
+            muestras.append((scores[c], d == "SI", 1.0 / FRACCION_EXPLORACION if c in auditadas else 1.0))
+    n_si = sum(1 for _, si, _ in muestras if si)
+
+    print(f"\n🧾 {nombre_cliente.upper()}: {len(decisiones)} decisiones IA, {len(scores)} scores, "
+          f"{len(muestras)} cruzadas ({n_si} SI)")
+    if auditadas:
+        print(f"   {len(auditadas)} decisiones de la muestra que el prefiltro habría decidido (peso {1 / FRACCION_EXPLORACION:g})")
+    if limite is not None:
+        print(f"   bajo el umbral aplicado {limite:.2f}: sólo la muestra de exploración "
+              f"(peso {1 / FRACCION_EXPLORACION:g}), {fuera} decisiones fuera de ella no cuentan")
+    if n_si < MIN_SI:
+        print(f"⚠️  Menos de {MIN_SI} SI con score: no se recomienda umbral.")
+        return None
+
+    puntos = curva(muestras)
+    rec = recomendar(puntos, recall_objetivo)
+    actual = getattr(cfg, "SCORE_MINIMO_RESULTADO", None)
+    for q in (1.0, 0.99, 0.95, 0.9, 0.8):
+        p = recomendar(puntos, q)
+        if p: print(f"   recall>={q:.2f}: umbral {p['umbral']:.2f} → {p['llamadas_pct']:.1f}% de las llamadas")
+    total = sum(p for _, _, p in muestras)
+    print(f"✅ Recomendado (recall>={recall_objetivo:.2f}): umbral {rec['umbral']:.2f}, recall {rec['recall']:.3f}, "
+          f"llamadas {rec['llamadas']:g}/{total:g} ({rec['llamadas_pct']}%)"
+          + (f" [SCORE_MINIMO_RESULTADO={actual}]" if actual is not None else "")
+          + (" — aplicado en 4_filtro_IA.py" if aplicar and not dry_run else ""))
+
+    salida = {
+        "cliente": nombre_cliente, "contextos_ia": ctxs,
+        "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+        "recall_objetivo": recall_objetivo, "umbral": rec["umbral"], "recall": rec["recall"],
+        "llamadas_pct": rec["llamadas_pct"], "muestras": len(muestras), "si": n_si,
+        "aplicar": aplicar, "fraccion_exploracion": FRACCION_EXPLORACION,
+        "umbral_max_aplicado": max([v for v in (limite, rec["umbral"] if aplicar else None) if v is not None], default=None),
+        "curva": puntos,
+    }
+    if not dry_run:
+        HIST_DIR.mkdir(exist_ok=True)
+        path_umbral(nombre_cliente).write_text(json.dumps(salida, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"📁 {path_umbral(nombre_cliente).name}")
+    return salida
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    ap = argparse.ArgumentParser(description="Calibra el umbral de score para el filtro IA")
+    ap.add_argument("--recall", type=float, default=RECALL_OBJETIVO, help=f"Recall objetivo de los SI (default {RECALL_OBJETIVO})")
+    ap.add_argument("--cliente", default=None, help="Sólo este cliente (nombre del *_config.py sin sufijo)")
+    ap.add_argument("--aplicar", action="store_true", help="4_filtro_IA.py usará el umbral recomendado")
+    ap.add_argument("--dry-run", action="store_true", help="Sólo muestra la recomendación")
+    args = ap.parse_args()
+    if not 0 < args.recall <= 1: ap.error("--recall debe estar en (0, 1]")
+
+    cfgs = sorted(CLIENTES_DIR.glob("*_config.py"))
+    if args.cliente: cfgs = [p for p in cfgs if p.name == f"{args.cliente}_config.py"]
+    if not cfgs:
+        print("⚠️  No se encontraron archivos *_config.py.")
+        return
+    for p in cfgs:
+        calibrar_cliente(p, args.recall, args.aplicar, args.dry_run)
+
+if __name__ == "__main__":
+    main()
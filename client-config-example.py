@@ -50,9 +50,13 @@ CATEGORIAS_UNSPSC_RELEVANTES = [
     "80101500", "80111600", "92121500"
 ]
 
+# Con NORMALIZAR_TEXTO = True las keywords y el texto se comparan sin tildes ni
+# mayúsculas ("educacion" encuentra "Educación"): basta escribir cada palabra una vez.
+NORMALIZAR_TEXTO = True
+
 KEYWORDS_TEMATICAS = [
-    "educacion", "educación", "capacitacion", "capacitación",
-    "formacion", "formación", "enseñanza", "aprendizaje",
+    "educación", "capacitación",
+    "formación", "enseñanza", "aprendizaje",
     "curso", "cursos", "taller", "talleres",
     "social", "comunitario", "inclusion", "vulnerable",
     "participacion", "ciudadana", "empoderamiento", "liderazgo",
@@ -110,7 +114,17 @@ IA_API_KEY = os.getenv("OPENAI_API_KEY", "")
 # 🔸 Tamaño máximo de lote por solicitud a la IA
 IA_BATCH_SIZE = 10  # número de licitaciones por bloque
 
-# 🔸 Tiempo de espera entre llamadas para evitar rate limit
-IA_PAUSA_ENTRE_LOTES = 2.0  # segundos
+# 🔸 Máximo de solicitudes simultáneas a la IA. El ritmo real se ajusta solo según
+#    los límites de tasa que informa la API (headers x-ratelimit-* y respuestas 429)
+IA_CONCURRENCIA_MAXIMA = 32
+
+# 🔸 Prefiltro semántico local (prefiltro_semantico.py): con historial suficiente de
+#    decisiones de la IA, decide sin IA las licitaciones claramente SI o NO
+PREFILTRO_SEMANTICO = False
+PREFILTRO_PRECISION = 0.98  # precisión mínima exigida a cada franja automática
+
+# 🔸 URL base de una API compatible con OpenAI (opcional; por defecto la de OpenAI
+#    o la variable de entorno OPENAI_BASE_URL)
+# IA_BASE_URL = "http://127.0.0.1:8765/v1"
 
 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+flujo_json.py
+Lectura y escritura incremental de arreglos JSON grandes (días de base_local,
+respuestas de la API) sin materializar el documento completo en memoria.
+"""
+import json, os
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+TAM_BLOQUE = 1 << 16  # 64 KiB por lectura
+
+_WS = " \t\n\r"
+_NUM = "0123456789.eE+-"
+_DEC = json.JSONDecoder()
+
+class _Lector:
+    """Buffer deslizante sobre un archivo de texto, con decodificación valor a valor."""
+    def __init__(self, f: TextIO, tam_bloque: int):
+        self.f, self.tam = f, tam_bloque
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _leer(self) -> bool:
+        trozo = self.f.read(self.tam)
+        if not trozo:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + trozo
+        self.pos = 0
+        return True
+
+    def caracter(self) -> str:
+        """Siguiente carácter no blanco (sin consumirlo); '' al final del archivo."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._leer():
+                return ""
+
+    def consumir(self, esperado: str):
+        c = self.caracter()
+        if c != esperado:
+            raise ValueError(f"JSON inválido: se esperaba '{esperado}' y vino '{c}'")
+        self.pos += 1
+
+    def valor(self) -> Any:
+        self.caracter()
+        while True:
+            try:
+                obj, fin = _DEC.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof: raise
+                obj, fin = None, -1
+            # un número al borde del buffer ("12" | "3.5") podría continuar en el siguiente bloque
+            if fin != -1 and (self.eof or (fin < len(self.buf) and self.buf[fin] not in _NUM)):
+                self.pos = fin
+                return obj
+            self._leer()
+
+def _elementos(lec: _Lector) -> Iterator[Any]:
+    lec.consumir("[")
+    if lec.caracter() == "]":
+        lec.pos += 1
+        return
+    while True:
+        yield lec.valor()
+        c = lec.caracter()
+        if c == ",": lec.pos += 1
+        elif c == "]": lec.pos += 1; return
+        else: raise ValueError(f"JSON inválido: se esperaba ',' o ']' y vino '{c}'")
+
+def iterar_arreglo(f: TextIO, clave: str = "licitaciones", tam_bloque: int = TAM_BLOQUE) -> Iterator[Any]:
+    """
+    Itera los elementos de un arreglo JSON de nivel superior o, si el documento
+    es un objeto, del arreglo bajo `clave` (las demás claves se descartan y lo
+    que venga después del arreglo no se lee). Memoria: un elemento + un bloque.
+    """
+    lec = _Lector(f, tam_bloque)
+    c = lec.caracter()
+    if c == "":
+        return
+    if c == "[":
+        yield from _elementos(lec)
+        return
+    if c != "{":
+        raise ValueError(f"JSON inválido: se esperaba arreglo u objeto y vino '{c}'")
+    lec.pos += 1
+    if lec.caracter() == "}":
+        return
+    while True:
+        k = lec.valor()
+        lec.consumir(":")
+        if k == clave and lec.caracter() == "[":
+            yield from _elementos(lec)
+            return
+        lec.valor()
+        c = lec.caracter()
+        if c == ",": lec.pos += 1
+        elif c == "}": return
+        else: raise ValueError(f"JSON inválido: se esperaba ',' o '}}' y vino '{c}'")
+
+def escribir_arreglo(path: Path, registros: Iterable[Dict[str, Any]],
+                     registrar: Optional[Callable[[Dict[str, Any], int], None]] = None) -> int:
+    """
+    Escribe `registros` como arreglo JSON compacto, un registro por línea, en un
+    archivo temporal junto a `path` y lo renombra atómicamente. Si se pasa
+    `registrar`, se llama con cada registro y el byte donde empieza su línea.
+    Retorna cuántos escribió.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    n = 0
+    try:
+        with open(tmp, "wb") as f:
+            pos = f.write(b"[")
+            for reg in registros:
+                pos += f.write(b",\n" if n else b"\n")
+                if registrar: registrar(reg, pos)
+                pos += f.write(json.dumps(reg, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                n += 1
+            f.write(b"\n]\n")
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists(): tmp.unlink()
+    return n
+
+def leer_en_offset(f: BinaryIO, offset: int) -> Optional[Dict[str, Any]]:
+    """Registro que empieza en `offset` de un archivo escrito por escribir_arreglo (None si no calza)."""
+    f.seek(offset)
+    txt = f.readline().strip()
+    if txt.endswith(b","): txt = txt[:-1]
+    try: reg = json.loads(txt)
+    except ValueError: return None
+    return reg if isinstance(reg, dict) else None
+
+def iterar_con_offsets(f: BinaryIO) -> Iterator[Tuple[Any, int]]:
+    """
+    (registro, offset) de un archivo escrito por escribir_arreglo, leyendo línea a
+    línea en binario. Lanza ValueError si el archivo no tiene ese formato
+    (p. ej. un día antiguo con indent=2).
+    """
+    pos = 0
+    for linea in f:
+        inicio, pos = pos, pos + len(linea)
+        txt = linea.strip()
+        if txt in (b"[", b"]", b""): continue
+        if txt.endswith(b","): txt = txt[:-1]
+        reg = json.loads(txt)
+        if not isinstance(reg, dict):
+            raise ValueError("línea sin un registro completo")
+        yield reg, inicio
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+http_sesion.py
+Capa HTTP compartida por las etapas que llaman APIs externas
+(0_actualizar_licitaciones.py y 5_comprobar_vigencia.py).
+
+- Conexiones keep-alive reutilizadas (pool por host) en vez de un
+  handshake TCP/TLS por request.
+- Pide respuestas comprimidas (gzip y, si hay decodificador, brotli).
+- Una sola política de reintentos/backoff para requests (síncrono) y
+  aiohttp (asíncrono).
+"""
+import random
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ============================================================
+# POLÍTICA COMÚN
+# ============================================================
+
+REINTENTOS = 3                                # reintentos tras el primer intento
+ESTADOS_REINTENTO = (429, 500, 502, 503, 504)
+BACKOFF_FACTOR = 2.5                          # espera = factor * 2^(n-1) segundos
+BACKOFF_MAX = 30.0
+BACKOFF_JITTER = 1.0
+
+POOL_DEFECTO = 10                             # conexiones vivas por host
+POOL_POR_HOST: Dict[str, int] = {
+    "api.mercadopublico.cl": 4,               # la API pública limita requests concurrentes
+}
+
+try:
+    import brotli  # noqa: F401  (urllib3 y aiohttp sólo decodifican br si está instalado)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+HEADERS_DEFECTO = {"Accept-Encoding": ACCEPT_ENCODING}
+
+def espera_backoff(intento: int, retry_after: Optional[float] = None) -> float:
+    """Segundos a esperar antes del reintento `intento` (1, 2, ...)."""
+    if retry_after:
+        return min(BACKOFF_MAX, retry_after)
+    base = BACKOFF_FACTOR * (2 ** (intento - 1))
+    return min(BACKOFF_MAX, base) + random.uniform(0, BACKOFF_JITTER)
+
+def retry_after(headers) -> Optional[float]:
+    try: return float(headers.get("Retry-After", ""))
+    except Exception: return None
+
+# ============================================================
+# CLIENTE SÍNCRONO (requests)
+# ============================================================
+
+_SESION: Optional[requests.Session] = None
+
+def _adapter(pool: int) -> HTTPAdapter:
+    retry = Retry(
+        total=REINTENTOS, connect=REINTENTOS, read=REINTENTOS, status=REINTENTOS,
+        status_forcelist=ESTADOS_REINTENTO, allowed_methods=frozenset({"GET", "HEAD"}),
+        backoff_factor=BACKOFF_FACTOR, backoff_max=BACKOFF_MAX, backoff_jitter=BACKOFF_JITTER,
+        respect_retry_after_header=True,
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+
+def obtener_sesion() -> requests.Session:
+    """Sesión única del proceso, con un pool dimensionado por host."""
+    global _SESION
+    if _SESION is None:
+        s = requests.Session()
+        s.headers.update(HEADERS_DEFECTO)
+        s.mount("http://", _adapter(POOL_DEFECTO))
+        s.mount("https://", _adapter(POOL_DEFECTO))
+        for host, pool in POOL_POR_HOST.items():
+            s.mount(f"http://{host}", _adapter(pool))
+            s.mount(f"https://{host}", _adapter(pool))
+        _SESION = s
+    return _SESION
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET con reintentos; 429/5xx persistentes terminan en requests.exceptions.RetryError."""
+    return obtener_sesion().get(url, **kwargs)
+
+# ============================================================
+# CLIENTE ASÍNCRONO (aiohttp)
+# ============================================================
+
+def crear_sesion_async(url_base: str, limite: Optional[int] = None) -> aiohttp.ClientSession:
+    """
+    ClientSession con las mismas cabeceras y un pool acotado para el host de `url_base`.
+    Debe crearse dentro del event loop que la usará.
+    """
+    host = urlsplit(url_base).hostname or ""
+    por_host = limite or POOL_POR_HOST.get(host, POOL_DEFECTO)
+    conector = aiohttp.TCPConnector(limit_per_host=por_host, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=conector, headers=HEADERS_DEFECTO)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+memoria_ia.py
+Memoria de decisiones SI/NO de la IA por cliente (historial/ia_<cliente>.json).
+
+Las decisiones se agrupan por contexto: modelo + DESCRIPCION_CLIENTE + versión del prompt que
+las produjo (motor_ia.PROMPT_VERSION para el prompt de un cliente, PROMPT_VERSION_COMPARTIDO
+para el compartido entre clientes). Hay así dos contextos vigentes por cliente; una licitación
+está en a lo más uno de ellos (la última decisión). Cada decisión guarda además el hash
+de Nombre+Descripcion de la licitación; si el texto cambia, se vuelve a evaluar.
+Editar montos, keywords o comentarios del config ya no invalida la memoria.
+
+Formato:
+  {"version": 2,
+   "contextos": {"<ctx>": {"modelo": ..., "prompt_version": ..., "descripcion_hash": ...,
+                           "decisiones": {"<CodigoExterno>": ["SI", "<hash texto>"], ...}}}}
+
+Los historiales antiguos ({"por_hash": {<hash config>: {codigo: decision}}}) se migran
+al contexto actual al cargarlos; el bucket del config actual manda sobre los demás.
+Esas decisiones no traen hash de texto: se adoptan tal cual y toman el hash del texto
+la primera vez que se vuelve a ver la licitación.
+"""
+import sys
+sys.dont_write_bytecode = True
+import hashlib, json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import motor_ia
+
+BASE_DIR = Path(__file__).resolve().parent
+HIST_DIR = BASE_DIR / "historial"
+VERSION_FORMATO = 2
+VERSIONES_PROMPT = (motor_ia.PROMPT_VERSION, motor_ia.PROMPT_VERSION_COMPARTIDO)  # las vigentes
+
+def _md5(s: str) -> str:
+    return hashlib.md5(s.encode("utf-8")).hexdigest()[:12]
+
+def path_historial_ia(nombre_cliente: str) -> Path:
+    return HIST_DIR / f"ia_{nombre_cliente.lower()}.json"
+
+def contexto(modelo: str, descripcion_cliente: str, prompt_version: int = motor_ia.PROMPT_VERSION) -> str:
+    return _md5(f"{modelo}\x00{prompt_version}\x00{descripcion_cliente or ''}")
+
+def contextos_cfg(cfg) -> List[str]:
+    """Contextos vigentes (uno por versión de prompt) con los mismos defaults que 4_filtro_IA.py."""
+    modelo = getattr(cfg, "IA_MODELO", "gpt-4o-mini")
+    descripcion = getattr(cfg, "DESCRIPCION_CLIENTE", "")
+    return [contexto(modelo, descripcion, v) for v in VERSIONES_PROMPT]
+
+def hash_texto(lic: Dict[str, Any]) -> str:
+    """Hash del texto que ve la IA (mismo recorte que motor_ia.prompt_*)."""
+    return _md5(f"{(lic.get('Nombre') or '').strip()}\x00{(lic.get('Descripcion') or '').strip()}")
+
+def hash_config(path: Path) -> str:
+    """Hash del config completo con que se guardaban los buckets antiguos (sólo para migrar)."""
+    try: return hashlib.md5(path.read_bytes()).hexdigest()[:10]
+    except Exception: return "nohash"
+
+# ============================================================
+# MEMORIA
+# ============================================================
+
+def cargar(nombre_cliente: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(path_historial_ia(nombre_cliente).read_text(encoding="utf-8"))
+    except Exception:
+        data = None
+    if not isinstance(data, dict): data = {}
+    if not isinstance(data.get("contextos"), dict): data["contextos"] = {}
+    return data
+
+class MemoriaIA:
+    """Decisiones de un cliente en los contextos (modelo, descripción, versión de prompt) vigentes."""
+
+    def __init__(self, nombre_cliente: str, modelo: str, descripcion_cliente: str, chash_legado: Optional[str] = None):
+        self.nombre, self.modelo, self.descripcion = nombre_cliente, modelo, descripcion_cliente
+        self.data = cargar(nombre_cliente)
+        self.decisiones = self._decisiones(motor_ia.PROMPT_VERSION)  # las antiguas vienen del prompt de un cliente
+        self.migradas = self._migrar(chash_legado)
+        self.texto_cambiado = 0
+
+    def _decisiones(self, prompt_version: Any, crear: bool = True) -> Optional[Dict[str, list]]:
+        ctx = contexto(self.modelo, self.descripcion, prompt_version)
+        if ctx not in self.data["contextos"]:
+            if not crear: return None
+            self.data["contextos"][ctx] = {
+                "modelo": self.modelo, "prompt_version": prompt_version,
+                "descripcion_hash": _md5(self.descripcion or ""), "decisiones": {},
+            }
+        return self.data["contextos"][ctx].setdefault("decisiones", {})
+
+    def _migrar(self, chash_legado: Optional[str]) -> int:
+        buckets = self.data.pop("por_hash", None)
+        if not isinstance(buckets, dict): return 0
+        orden = [h for h in buckets if h != chash_legado] + ([chash_legado] if chash_legado in buckets else [])
+        n = 0
+        for h in orden:
+            if not isinstance(buckets[h], dict): continue
+            for codigo, d in buckets[h].items():
+                if d in ("SI", "NO"):
+                    self.decisiones[codigo] = [d, None]; n += 1
+        return n
+
+    def buscar(self, lic: Dict[str, Any]) -> Optional[str]:
+        """Decisión guardada con un prompt vigente si el texto no cambió (None = hay que evaluar)."""
+        ent = None
+        for v in VERSIONES_PROMPT:
+            ent = (self._decisiones(v, crear=False) or {}).get(lic.get("CodigoExterno"))
+            if ent: break
+        if not ent: return None
+        h = hash_texto(lic)
+        if ent[1] is None:
+            ent[1] = h  # decisión migrada: adopta el texto actual
+        elif ent[1] != h:
+            self.texto_cambiado += 1
+            return None
+        return ent[0]
+
+    def anotar(self, lic: Dict[str, Any], decision: str, prompt_version: Any = motor_ia.PROMPT_VERSION):
+        """Guarda la decisión en el contexto del prompt que la produjo; la de otro prompt vigente se descarta."""
+        codigo = lic["CodigoExterno"]
+        for v in VERSIONES_PROMPT:
+            if v != prompt_version: (self._decisiones(v, crear=False) or {}).pop(codigo, None)
+        self._decisiones(prompt_version)[codigo] = [decision, hash_texto(lic)]
+
+    def guardar(self):
+        self.data["version"] = VERSION_FORMATO
+        p = path_historial_ia(self.nombre)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def decisiones_cliente(nombre_cliente: str, vigentes: Iterable[str] = ()) -> Dict[str, str]:
+    """CodigoExterno -> SI/NO de todos los contextos (y buckets antiguos); los contextos `vigentes` mandan."""
+    data = cargar(nombre_cliente)
+    fuentes = []
+    if isinstance(data.get("por_hash"), dict):
+        fuentes += [b for b in data["por_hash"].values() if isinstance(b, dict)]
+    ctxs, vigentes = data["contextos"], list(vigentes)
+    orden = [c for c in ctxs if c not in vigentes] + [c for c in vigentes if c in ctxs]
+    fuentes += [{c: e[0] for c, e in (ctxs[k].get("decisiones") or {}).items() if isinstance(e, list) and e}
+                for k in orden if isinstance(ctxs[k], dict)]
+    out: Dict[str, str] = {}
+    for b in fuentes:
+        out.update({c: d for c, d in b.items() if d in ("SI", "NO")})
+    return out
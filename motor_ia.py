@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+motor_ia.py
+Motor asíncrono (aiohttp) de evaluación SI/NO para 4_filtro_IA.py contra una API de
+chat compatible con OpenAI (POST <base>/chat/completions).
+
+- Presupuesto de solicitudes y tokens alimentado por los headers x-ratelimit-* de
+  cada respuesta y por los 429 (Retry-After).
+- Concurrencia adaptativa: parte en CONCURRENCIA_INICIAL y sube de a uno mientras
+  queda holgura en el presupuesto; un 429 la reduce a la mitad.
+- 429, 5xx, timeouts y errores de red se reintentan con backoff. Si aun así no hay
+  respuesta, o si la respuesta no se entiende, la decisión queda en None (no "NO"),
+  para no guardarla en el historial.
+- evaluar_clientes evalúa los pendientes de todos los clientes a la vez; una licitación
+  pendiente para varios clientes va una sola vez con sus descripciones (prompt_compartido).
+
+Para probarlo sin la API real:
+  python motor_ia.py servidor-falso --puerto 8765 --limite 20 --ventana 2 --error 0.05
+  python motor_ia.py probar --url http://127.0.0.1:8765/v1 --n 300 --lote 10 [--clientes 3]
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, asyncio, hashlib, json, logging, random, re, time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import aiohttp
+
+URL_BASE_DEFECTO = "https://api.openai.com/v1"
+CONCURRENCIA_INICIAL = 2
+CONCURRENCIA_MAXIMA = 32
+MAX_REINTENTOS = 5
+ESPERA_BASE = 1.0       # segundos; se duplica en cada reintento (con jitter)
+TIMEOUT_SOLICITUD = 60  # segundos
+HOLGURA_MINIMA = 0.1    # fracción del límite que debe quedar libre para subir la concurrencia
+TOKENS_POR_CODIGO = 20  # '"1234-56-LE25": "SI", ' con holgura
+
+Decision = Optional[str]  # "SI", "NO" o None (sin respuesta)
+Evaluada = Tuple[Dict[str, Any], Decision, Any]  # (licitación, decisión, versión del prompt que la produjo)
+
+# ============================================================
+# PROMPTS
+# ============================================================
+
+# subirlas al cambiar el texto de los prompts: invalidan la memoria de decisiones (memoria_ia).
+# Cada decisión se guarda con la versión del prompt que la produjo.
+PROMPT_VERSION = 1                         # prompt_individual y prompt_lote
+PROMPT_VERSION_COMPARTIDO = "compartido-1"  # prompt_compartido
+
+SISTEMA_INDIVIDUAL = "Responde estrictamente con 'SI' o 'NO'."
+SISTEMA_LOTE = "Responde estrictamente con un objeto JSON de códigos a 'SI' o 'NO'."
+SISTEMA_COMPARTIDO = "Responde estrictamente con un objeto JSON de códigos a objetos de letras de cliente a 'SI' o 'NO'."
+ETIQUETAS = "ABCDEFGH"  # clientes por solicitud compartida
+
+def prompt_individual(lic: Dict[str, Any], descripcion_cliente: str) -> str:
+    nombre = (lic.get("Nombre") or "").strip()
+    desc = (lic.get("Descripcion") or "").strip()
+    return (
+        f"El cliente se dedica a: {descripcion_cliente}\n\n"
+        f"Evalúa la siguiente licitación:\n"
+        f"{nombre}\n{desc}\n\n"
+        "¿Esta licitación corresponde al tipo de trabajo o rubro del cliente?\n"
+        "Responde solo con 'SI' o 'NO'."
+    )
+
+def prompt_lote(lote: List[Dict[str, Any]], descripcion_cliente: str) -> str:
+    bloques = "\n\n".join(
+        f"[{lic.get('CodigoExterno')}]\n{(lic.get('Nombre') or '').strip()}\n{(lic.get('Descripcion') or '').strip()}"
+        for lic in lote
+    )
+    return (
+        f"El cliente se dedica a: {descripcion_cliente}\n\n"
+        f"Evalúa cada una de las siguientes {len(lote)} licitaciones, identificadas por su código entre corchetes:\n\n"
+        f"{bloques}\n\n"
+        "¿Cada licitación corresponde al tipo de trabajo o rubro del cliente?\n"
+        'Responde solo con un objeto JSON con todos los códigos: {"<código>": "SI" o "NO", ...}'
+    )
+
+def prompt_compartido(lote: List[Dict[str, Any]], descripciones: Dict[str, str]) -> str:
+    """Cada licitación una sola vez, con varios clientes identificados por una letra."""
+    clientes = "\n".join(f"({et}) {' '.join(str(d or '').split())}" for et, d in descripciones.items())
+    bloques = "\n\n".join(
+        f"[{lic.get('CodigoExterno')}]\n{(lic.get('Nombre') or '').strip()}\n{(lic.get('Descripcion') or '').strip()}"
+        for lic in lote
+    )
+    return (
+        f"Hay {len(descripciones)} clientes, identificados por una letra entre paréntesis:\n{clientes}\n\n"
+        f"Evalúa cada una de las siguientes {len(lote)} licitaciones, identificadas por su código entre corchetes:\n\n"
+        f"{bloques}\n\n"
+        "¿Cada licitación corresponde al tipo de trabajo o rubro de cada cliente?\n"
+        'Responde solo con un objeto JSON con todos los códigos y clientes: {"<código>": {"<letra>": "SI" o "NO", ...}, ...}'
+    )
+
+def _si_no(v: Any) -> Optional[str]:
+    """SI/NO tolerando acento, comillas y puntuación alrededor ("Sí." -> SI); otra cosa -> None."""
+    d = str(v or "").strip().upper().replace("SÍ", "SI").strip(" \t\n.,;:!?¡¿\"'*`")
+    return d if d in ("SI", "NO") else None
+
+def parsear_decisiones(texto: str, codigos: List[str]) -> Dict[str, str]:
+    """Decisiones SI/NO por código de la respuesta; los códigos que no vengan bien quedan fuera."""
+    ini, fin = texto.find("{"), texto.rfind("}")
+    if ini < 0 or fin < ini: return {}
+    try:
+        data = json.loads(texto[ini:fin + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict): return {}
+    out = {}
+    for c in codigos:
+        d = _si_no(data.get(c))
+        if d: out[c] = d
+    return out
+
+def parsear_compartidas(texto: str, codigos: List[str], etiquetas: List[str]) -> Dict[Tuple[str, str], str]:
+    """(código, letra) -> SI/NO de una respuesta compartida; los pares que no vengan bien quedan fuera."""
+    ini, fin = texto.find("{"), texto.rfind("}")
+    if ini < 0 or fin < ini: return {}
+    try:
+        data = json.loads(texto[ini:fin + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict): return {}
+    out = {}
+    for c in codigos:
+        por_cliente = data.get(c)
+        if not isinstance(por_cliente, dict): continue
+        for et in etiquetas:
+            d = _si_no(por_cliente.get(et))
+            if d: out[(c, et)] = d
+    return out
+
+# ============================================================
+# PRESUPUESTO DE TASA
+# ============================================================
+
+_DURACION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIDAD = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duracion(s: Any) -> Optional[float]:
+    """'1s', '6m0s', '20ms', '1h2m3.5s' o un número de segundos -> segundos."""
+    if s is None: return None
+    s = str(s).strip()
+    try: return float(s)
+    except ValueError: pass
+    partes = _DURACION.findall(s)
+    return sum(float(n) * _UNIDAD[u] for n, u in partes) if partes else None
+
+def _int(v: Any) -> Optional[int]:
+    try: return int(str(v).strip())
+    except (TypeError, ValueError): return None
+
+class Presupuesto:
+    """
+    Solicitudes y tokens restantes según el último x-ratelimit-* recibido, con su
+    instante de reinicio. Entre respuestas se descuenta localmente lo enviado para
+    que las tareas concurrentes no se pasen antes de que llegue el siguiente header.
+    """
+    def __init__(self):
+        self.limite_req: Optional[int] = None
+        self.limite_tok: Optional[int] = None
+        self.req: Optional[int] = None
+        self.tok: Optional[int] = None
+        self.reinicio_req = self.reinicio_tok = 0.0
+        self.pausa_hasta = 0.0
+
+    def actualizar(self, headers: Mapping[str, str]):
+        ahora = time.monotonic()
+        lr, lt = _int(headers.get("x-ratelimit-limit-requests")), _int(headers.get("x-ratelimit-limit-tokens"))
+        rr, rt = _int(headers.get("x-ratelimit-remaining-requests")), _int(headers.get("x-ratelimit-remaining-tokens"))
+        if lr is not None: self.limite_req = lr
+        if lt is not None: self.limite_tok = lt
+        if rr is not None:
+            self.req = rr
+            self.reinicio_req = ahora + (parse_duracion(headers.get("x-ratelimit-reset-requests")) or 1.0)
+        if rt is not None:
+            self.tok = rt
+            self.reinicio_tok = ahora + (parse_duracion(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    def pausar(self, segundos: float):
+        self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + segundos)
+
+    def espera(self, tokens: int) -> float:
+        """Segundos a esperar antes de enviar una solicitud de `tokens` (0 si se puede ya)."""
+        ahora = time.monotonic()
+        if self.req is not None and ahora >= self.reinicio_req: self.req = None
+        if self.tok is not None and ahora >= self.reinicio_tok: self.tok = None
+        w = self.pausa_hasta - ahora
+        if self.req is not None and self.req <= 0: w = max(w, self.reinicio_req - ahora)
+        if self.tok is not None and self.tok < tokens: w = max(w, self.reinicio_tok - ahora)
+        return max(0.0, w)
+
+    def consumir(self, tokens: int):
+        if self.req is not None: self.req -= 1
+        if self.tok is not None: self.tok -= tokens
+
+    def holgura(self) -> bool:
+        """True si queda más de HOLGURA_MINIMA de ambos límites (o no se conocen)."""
+        if self.req is not None and self.limite_req and self.req < HOLGURA_MINIMA * self.limite_req: return False
+        if self.tok is not None and self.limite_tok and self.tok < HOLGURA_MINIMA * self.limite_tok: return False
+        return True
+
+class Concurrencia:
+    """Semáforo con límite ajustable: +1 por éxito con holgura, /2 con un 429."""
+    def __init__(self, inicial: int = CONCURRENCIA_INICIAL, maxima: int = CONCURRENCIA_MAXIMA):
+        self.limite, self.maxima, self.en_curso = min(inicial, maxima), maxima, 0
+        self.pico = self.limite
+        self._cond = asyncio.Condition()
+
+    async def entrar(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.en_curso < self.limite)
+            self.en_curso += 1
+
+    async def salir(self, subir: bool = False, bajar: bool = False):
+        async with self._cond:
+            self.en_curso -= 1
+            if bajar: self.limite = max(1, self.limite // 2)
+            elif subir: self.limite = min(self.maxima, self.limite + 1)
+            self.pico = max(self.pico, self.limite)
+            self._cond.notify_all()
+
+# ============================================================
+# CLIENTE
+# ============================================================
+
+class ClienteIA:
+    """Sesión aiohttp + presupuesto + concurrencia compartidos por todas las solicitudes."""
+    def __init__(self, api_key: str, modelo: str, url_base: Optional[str] = None,
+                 concurrencia_maxima: int = CONCURRENCIA_MAXIMA, nombre: str = ""):
+        self.api_key, self.modelo, self.nombre = api_key, modelo, nombre
+        self.url = (url_base or URL_BASE_DEFECTO).rstrip("/") + "/chat/completions"
+        self.presupuesto = Presupuesto()
+        self.concurrencia = Concurrencia(maxima=concurrencia_maxima)
+        self.solicitudes = self.reintentos = self.limitadas = self.fallidas = 0
+        self._sesion: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "ClienteIA":
+        self._sesion = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=TIMEOUT_SOLICITUD))
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._sesion: await self._sesion.close()
+
+    def resumen(self) -> Dict[str, int]:
+        return {"solicitudes": self.solicitudes, "reintentos": self.reintentos, "limitadas_429": self.limitadas,
+                "fallidas": self.fallidas, "concurrencia_pico": self.concurrencia.pico}
+
+    async def completar(self, sistema: str, usuario: str, max_tokens: int) -> Optional[str]:
+        """Texto de la respuesta, o None si no se obtuvo tras MAX_REINTENTOS."""
+        cuerpo = {"model": self.modelo, "temperature": 0, "max_tokens": max_tokens,
+                  "messages": [{"role": "system", "content": sistema}, {"role": "user", "content": usuario}]}
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        tokens = (len(sistema) + len(usuario)) // 4 + max_tokens
+
+        for intento in range(MAX_REINTENTOS + 1):
+            if intento: self.reintentos += 1
+            espera: Optional[float] = None
+            await self.concurrencia.entrar()
+            subir = bajar = False
+            try:
+                w = self.presupuesto.espera(tokens)
+                while w > 0:
+                    await asyncio.sleep(w)
+                    w = self.presupuesto.espera(tokens)
+                self.presupuesto.consumir(tokens)
+                self.solicitudes += 1
+                async with self._sesion.post(self.url, json=cuerpo, headers=headers) as r:
+                    self.presupuesto.actualizar(r.headers)
+                    if r.status == 200:
+                        data = await r.json(content_type=None)
+                        subir = self.presupuesto.holgura()
+                        return str(data["choices"][0]["message"]["content"] or "")
+                    texto = (await r.text())[:200]
+                    if r.status == 429:
+                        self.limitadas += 1
+                        bajar = True
+                        espera = parse_duracion(r.headers.get("retry-after"))
+                        self.presupuesto.pausar(espera if espera is not None else ESPERA_BASE * 2 ** intento)
+                    elif r.status < 500:
+                        # 400/401/403/404: reintentar no cambia nada
+                        logging.error(f"{self.nombre} - Error API {r.status}: {texto}")
+                        self.fallidas += 1
+                        return None
+                    else:
+                        logging.warning(f"{self.nombre} - API {r.status} (intento {intento + 1}): {texto}")
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, IndexError, ValueError) as e:
+                logging.warning(f"{self.nombre} - Error transitorio (intento {intento + 1}): {e!r}")
+            finally:
+                await self.concurrencia.salir(subir=subir, bajar=bajar)
+            if espera is None:
+                await asyncio.sleep(ESPERA_BASE * 2 ** intento * random.uniform(0.5, 1.0))
+
+        logging.error(f"{self.nombre} - Sin respuesta tras {MAX_REINTENTOS + 1} intentos")
+        self.fallidas += 1
+        return None
+
+# ============================================================
+# EVALUACIÓN
+# ============================================================
+
+async def evaluar_licitacion(cliente: ClienteIA, lic: Dict[str, Any], descripcion_cliente: str) -> Decision:
+    """
+    SI/NO de una licitación. Una respuesta ilegible queda en None, como la falta de
+    respuesta: no se guarda en la memoria y se vuelve a preguntar en la próxima corrida.
+    """
+    texto = await cliente.completar(SISTEMA_INDIVIDUAL, prompt_individual(lic, descripcion_cliente), 3)
+    if texto is None: return None
+    d = _si_no(texto)
+    if d is None:
+        logging.warning(f"{cliente.nombre} - respuesta ilegible para {lic.get('CodigoExterno')}: {texto[:200]!r}")
+    return d
+
+async def evaluar_lote(cliente: ClienteIA, lote: List[Dict[str, Any]], descripcion_cliente: str
+                       ) -> List[Tuple[Dict[str, Any], Decision]]:
+    """
+    Evalúa varias licitaciones en una sola solicitud. Los códigos cuya decisión no
+    se pudo leer de la respuesta se reintentan de a uno.
+    """
+    if len(lote) == 1:
+        return [(lote[0], await evaluar_licitacion(cliente, lote[0], descripcion_cliente))]
+    codigos = [lic.get("CodigoExterno") for lic in lote]
+    texto = await cliente.completar(SISTEMA_LOTE, prompt_lote(lote, descripcion_cliente),
+                                    TOKENS_POR_CODIGO * len(lote) + 20)
+    if texto is None:
+        return [(lic, None) for lic in lote]
+    decisiones = parsear_decisiones(texto, codigos)
+    faltan = [lic for lic in lote if lic.get("CodigoExterno") not in decisiones]
+    if faltan:
+        logging.warning(f"{cliente.nombre} - {len(faltan)} códigos sin decisión legible en el lote, se reintentan solos")
+    solos = await asyncio.gather(*(evaluar_licitacion(cliente, lic, descripcion_cliente) for lic in faltan))
+    por_codigo = dict(zip((lic.get("CodigoExterno") for lic in faltan), solos))
+    return [(lic, decisiones.get(lic.get("CodigoExterno"), por_codigo.get(lic.get("CodigoExterno"))))
+            for lic in lote]
+
+# ============================================================
+# VARIOS CLIENTES
+# ============================================================
+
+@dataclass
+class Trabajo:
+    """Pendientes de un cliente para evaluar_clientes."""
+    nombre: str
+    descripcion: str
+    modelo: str
+    api_key: str
+    url_base: Optional[str] = None
+    concurrencia_maxima: int = CONCURRENCIA_MAXIMA
+    tam_lote: int = 1
+    pendientes: List[Dict[str, Any]] = field(default_factory=list)
+
+def _clave(lic: Dict[str, Any]) -> Tuple[Any, str, str]:
+    return lic.get("CodigoExterno"), (lic.get("Nombre") or "").strip(), (lic.get("Descripcion") or "").strip()
+
+def planificar(trabajos: List[Trabajo]) -> List[Tuple[List[str], List[Dict[str, Any]]]]:
+    """
+    Solicitudes (nombres de cliente, lote) para trabajos de una misma cuenta y modelo.
+    Una licitación (mismo código y texto) pendiente para varios clientes va una sola
+    vez, con hasta len(ETIQUETAS) descripciones; las de un solo cliente van en sus lotes
+    de siempre. El lote compartido usa el IA_BATCH_SIZE más chico de sus clientes.
+    """
+    por_clave: Dict[Tuple[Any, str, str], Tuple[Dict[str, Any], List[str]]] = {}
+    for t in trabajos:
+        for lic in t.pendientes:
+            ent = por_clave.setdefault(_clave(lic), (lic, []))
+            if t.nombre not in ent[1]: ent[1].append(t.nombre)
+    grupos: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for lic, nombres in por_clave.values():
+        for i in range(0, len(nombres), len(ETIQUETAS)):
+            grupos.setdefault(tuple(nombres[i:i + len(ETIQUETAS)]), []).append(lic)
+    tam = {t.nombre: t.tam_lote for t in trabajos}
+    solicitudes = []
+    for nombres, lics in grupos.items():
+        n = max(1, min(tam[x] for x in nombres))
+        solicitudes += [(list(nombres), lics[i:i + n]) for i in range(0, len(lics), n)]
+    return solicitudes
+
+async def evaluar_compartido(cliente: ClienteIA, lote: List[Dict[str, Any]], descripciones: Dict[str, str]
+                             ) -> Dict[str, List[Evaluada]]:
+    """
+    Evalúa un lote para varios clientes (letra -> descripción) en una sola solicitud.
+    Los pares (licitación, cliente) sin decisión legible se reintentan de a uno, con
+    el prompt individual: cada decisión lleva la versión del prompt que la produjo.
+    """
+    etiquetas = list(descripciones)
+    codigos = [lic.get("CodigoExterno") for lic in lote]
+    texto = await cliente.completar(SISTEMA_COMPARTIDO, prompt_compartido(lote, descripciones),
+                                    len(lote) * (TOKENS_POR_CODIGO + 8 * len(etiquetas)) + 20)
+    if texto is None:
+        return {et: [(lic, None, PROMPT_VERSION_COMPARTIDO) for lic in lote] for et in etiquetas}
+    decisiones = {k: (d, PROMPT_VERSION_COMPARTIDO) for k, d in parsear_compartidas(texto, codigos, etiquetas).items()}
+    faltan = [(lic, et) for lic in lote for et in etiquetas if (lic.get("CodigoExterno"), et) not in decisiones]
+    if faltan:
+        logging.warning(f"{cliente.nombre} - {len(faltan)} pares sin decisión legible en el lote compartido, se reintentan solos")
+    solos = await asyncio.gather(*(evaluar_licitacion(cliente, lic, descripciones[et]) for lic, et in faltan))
+    decisiones.update({(lic.get("CodigoExterno"), et): (d, PROMPT_VERSION) for (lic, et), d in zip(faltan, solos)})
+    return {et: [(lic, *decisiones.get((lic.get("CodigoExterno"), et), (None, PROMPT_VERSION))) for lic in lote]
+            for et in etiquetas}
+
+async def _evaluar_cuenta(trabajos: List[Trabajo], resultados: Dict[str, List[Evaluada]],
+                          al_evaluar: Optional[Callable[[str, Dict[str, Any], Decision], None]]) -> Dict[str, int]:
+    por_nombre = {t.nombre: t for t in trabajos}
+    # cada cliente recibe de vuelta su propio registro (el de su resumen)
+    propios = {t.nombre: {_clave(lic): lic for lic in t.pendientes} for t in trabajos}
+    compartidas = {"solicitudes_compartidas": 0, "pares_compartidos": 0}
+
+    def anotar(nombre: str, res: List[Evaluada]):
+        for lic, d, version in res:
+            lic = propios[nombre][_clave(lic)]
+            resultados[nombre].append((lic, d, version))
+            if al_evaluar: al_evaluar(nombre, lic, d)
+
+    async with ClienteIA(trabajos[0].api_key, trabajos[0].modelo, trabajos[0].url_base,
+                         max(t.concurrencia_maxima for t in trabajos), ", ".join(por_nombre)) as cli:
+        async def una(nombres: List[str], lote: List[Dict[str, Any]]):
+            if len(nombres) == 1:
+                res = await evaluar_lote(cli, lote, por_nombre[nombres[0]].descripcion)
+                anotar(nombres[0], [(lic, d, PROMPT_VERSION) for lic, d in res])
+                return
+            compartidas["solicitudes_compartidas"] += 1
+            compartidas["pares_compartidos"] += len(lote) * len(nombres)
+            etiquetas = dict(zip(ETIQUETAS, nombres))
+            res = await evaluar_compartido(cli, lote, {et: por_nombre[x].descripcion for et, x in etiquetas.items()})
+            for et, r in res.items():
+                anotar(etiquetas[et], r)
+        await asyncio.gather(*(una(n, l) for n, l in planificar(trabajos)))
+        return {**cli.resumen(), **compartidas}
+
+def evaluar_clientes(trabajos: List[Trabajo],
+                     al_evaluar: Optional[Callable[[str, Dict[str, Any], Decision], None]] = None
+                     ) -> Tuple[Dict[str, List[Evaluada]], List[Dict[str, int]]]:
+    """
+    Todos los clientes a la vez: (nombre -> [(licitación, decisión, versión del prompt)], resumen por cuenta).
+    Los trabajos con la misma API key, URL y modelo comparten sesión, presupuesto de tasa
+    y solicitudes (planificar); cada cuenta corre en paralelo con las demás.
+    """
+    cuentas: Dict[Tuple[str, Optional[str], str], List[Trabajo]] = {}
+    for t in trabajos:
+        if t.pendientes:
+            cuentas.setdefault((t.api_key, t.url_base, t.modelo), []).append(t)
+    resultados: Dict[str, List[Evaluada]] = {t.nombre: [] for t in trabajos}
+
+    async def correr():
+        return await asyncio.gather(*(_evaluar_cuenta(ts, resultados, al_evaluar) for ts in cuentas.values()))
+    resumenes = asyncio.run(correr()) if cuentas else []
+    return resultados, list(resumenes)
+
+# ============================================================
+# SERVIDOR FALSO Y PRUEBA
+# ============================================================
+
+def decision_falsa(descripcion_cliente: str, texto: str) -> str:
+    clave = " ".join(str(descripcion_cliente or "").split()) + "\n" + texto
+    return "SI" if hashlib.md5(clave.encode("utf-8")).digest()[0] % 2 else "NO"
+
+def crear_servidor_falso(limite: int, ventana: float, p_error: float, p_basura: float):
+    """
+    App aiohttp compatible con /v1/chat/completions: x-ratelimit-* con `limite`
+    solicitudes por `ventana` segundos, 429 al pasarse y 500 al azar.
+    """
+    from aiohttp import web
+    estado = {"inicio": time.monotonic(), "usadas": 0}
+
+    async def chat(request):
+        ahora = time.monotonic()
+        if ahora - estado["inicio"] >= ventana: estado.update(inicio=ahora, usadas=0)
+        resta = ventana - (ahora - estado["inicio"])
+        if estado["usadas"] >= limite:
+            return web.json_response({"error": {"message": "rate limit"}}, status=429,
+                                     headers={"retry-after": str(round(resta, 3))})
+        estado["usadas"] += 1
+        headers = {"x-ratelimit-limit-requests": str(limite),
+                   "x-ratelimit-remaining-requests": str(limite - estado["usadas"]),
+                   "x-ratelimit-reset-requests": f"{int(resta * 1000)}ms"}
+        if random.random() < p_error:
+            return web.json_response({"error": {"message": "falla simulada"}}, status=500, headers=headers)
+        await asyncio.sleep(random.uniform(0.05, 0.2))
+        usuario = (await request.json())["messages"][-1]["content"]
+        bloques = re.findall(r"^\[(.+?)\]\n(.*?)(?=\n\n\[|\n\n¿)", usuario, re.M | re.S)
+        m = re.search(r"El cliente se dedica a: (.*?)\n\n", usuario, re.S)
+        if usuario.startswith("Hay "):
+            clientes = re.findall(r"^\((\w)\) (.*)$", usuario.split("\n\nEvalúa", 1)[0], re.M)
+            contenido = json.dumps({c: {et: decision_falsa(d, t) for et, d in clientes if random.random() >= p_basura}
+                                    for c, t in bloques})
+        elif bloques:
+            contenido = json.dumps({c: decision_falsa(m.group(1), t) for c, t in bloques if random.random() >= p_basura})
+        else:
+            cuerpo = usuario.split("Evalúa la siguiente licitación:\n", 1)[-1].split("\n\n¿", 1)[0]
+            contenido = decision_falsa(m.group(1) if m else "", cuerpo)
+            if random.random() < p_basura: contenido = {"SI": "Sí.", "NO": "No."}[contenido]
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": contenido}}]}, headers=headers)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+def probar(url: str, n: int, tam_lote: int, concurrencia_maxima: int, clientes: int = 1) -> bool:
+    """
+    Evalúa n licitaciones sintéticas contra `url` y compara con las decisiones del servidor falso.
+    Con clientes > 1 cada cliente tiene pendientes dos tercios de las licitaciones, y las
+    que se repiten entre clientes van en solicitudes compartidas (evaluar_clientes).
+    """
+    lics = [{"CodigoExterno": f"{1000 + i}-1-LE25", "Nombre": f"Licitación {i}", "Descripcion": f"Servicio número {i}"}
+            for i in range(n)]
+    trabajos = [Trabajo(f"cliente{j}", f"pruebas {j}", "falso", "sk-falsa", url, concurrencia_maxima, tam_lote,
+                        [lic for i, lic in enumerate(lics) if clientes == 1 or (i + j) % 3])
+                for j in range(clientes)]
+    t0 = time.perf_counter()
+    res, resumenes = evaluar_clientes(trabajos)
+    seg = time.perf_counter() - t0
+    malas = sin = 0
+    for t in trabajos:
+        for lic, d, _ in res[t.nombre]:
+            if d is None: sin += 1
+            elif d != decision_falsa(t.descripcion, f"{lic['Nombre']}\n{lic['Descripcion']}"): malas += 1
+    pares = sum(len(t.pendientes) for t in trabajos)
+    evaluados = sum(len(r) for r in res.values())
+    print(f"{pares} pares cliente-licitación en {seg:.1f}s ({evaluados} con resultado), {resumenes}, "
+          f"sin respuesta={sin}, distintas={malas}")
+    return malas == 0 and evaluados == pares
+
+def main():
+    ap = argparse.ArgumentParser(description="Motor asíncrono de IA: servidor falso y prueba")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("servidor-falso", help="API compatible con OpenAI local, con límites de tasa")
+    s.add_argument("--puerto", type=int, default=8765)
+    s.add_argument("--limite", type=int, default=120, help="Solicitudes por ventana antes de responder 429")
+    s.add_argument("--ventana", type=float, default=60.0, help="Segundos de la ventana de --limite")
+    s.add_argument("--error", type=float, default=0.05, help="Probabilidad de un 500")
+    s.add_argument("--basura", type=float, default=0.02, help="Probabilidad de omitir un código en un lote (o de responder 'Sí.'/'No.' a una sola)")
+    p = sub.add_parser("probar", help="Evalúa licitaciones sintéticas contra un servidor")
+    p.add_argument("--url", default="http://127.0.0.1:8765/v1")
+    p.add_argument("--n", type=int, default=200)
+    p.add_argument("--lote", type=int, default=10)
+    p.add_argument("--concurrencia-maxima", type=int, default=CONCURRENCIA_MAXIMA)
+    p.add_argument("--clientes", type=int, default=1, help="Clientes con pendientes en común (solicitudes compartidas)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    if args.cmd == "servidor-falso":
+        from aiohttp import web
+        print(f"🧪 Servidor falso en http://127.0.0.1:{args.puerto}/v1 "
+              f"({args.limite} solicitudes cada {args.ventana}s, error={args.error})")
+        web.run_app(crear_servidor_falso(args.limite, args.ventana, args.error, args.basura), host="127.0.0.1", port=args.puerto,
+                    print=None)
+    else:
+        ok = probar(args.url, args.n, max(1, args.lote), args.concurrencia_maxima, max(1, args.clientes))
+        print("✅ Decisiones correctas" if ok else "❌ Hay decisiones distintas a las del servidor")
+        sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+motor_vectorial.py
+Filtro duro y subscores numéricos de scoring evaluados por columnas (pandas/NumPy).
+
+Un día de licitaciones se aplana una vez a una tabla con CodigoEstado, Tipo,
+Moneda, MontoEstimado, DiasCierreLicitacion, FechaCierre y RegionUnidad, y
+sobre ella se evalúan como operaciones de arreglo:
+  - las reglas de pasa_filtros_duros (1_filtro_duro.py), para uno o varios clientes
+  - score_viabilidad_financiera, score_oportunidad_temporal y
+    score_ventaja_geografica (2_scoring.py)
+
+Las filas con tipos que no calzan con la versión por diccionario (p. ej. un
+CodigoEstado que no es entero o un monto no numérico) se marcan irregulares y
+se evalúan fila a fila con la función de referencia, así el resultado es
+siempre idéntico.
+
+2_scoring.py todavía no usa subscores(): puntúa registro a registro en streaming y
+también necesita la meta de cada subscore. Hoy la usan verificar y
+tests/test_motor_vectorial.py, que prueba la paridad sobre licitaciones sintéticas.
+
+Uso como comando:
+  python motor_vectorial.py verificar [--max-dias N]   # paridad y tiempos vs las funciones por diccionario
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, datetime, functools, importlib.util, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import almacen_local
+
+BASE_DIR = Path(__file__).resolve().parent
+US_POR_DIA = 86_400_000_000
+_ENTERO_EXACTO = 2 ** 53  # montos más grandes no caben exactos en float64
+
+# ============================================================
+# APLANADO
+# ============================================================
+
+@functools.lru_cache(maxsize=1 << 16)
+def _fecha(s: str) -> Optional[datetime.datetime]:
+    # mismo parseo que parse_iso (1) y dias_hasta_cierre (2) para strings
+    try: return datetime.datetime.fromisoformat(s.rstrip("Z").split(".")[0])
+    except Exception: return None
+
+def _entero(v: Any) -> Optional[int]:
+    # int(str(v)) como parse_int_safe (1) y dias_hasta_cierre (2); None si no aplica
+    if type(v) is int: return v
+    if v is None: return None
+    s = str(v)
+    if s.strip() == "": return None
+    try: return int(s)
+    except Exception: return None
+
+def _dict_o_vacio(v: Any) -> Optional[Dict[str, Any]]:
+    # `(x or {})` sólo es seguro si x es dict o falsy
+    if not v: return {}
+    return v if isinstance(v, dict) else None
+
+def aplanar(lics: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Tabla con una fila por licitación (mismo orden que `lics`). La columna
+    `regular` marca las filas que el motor puede evaluar por columnas.
+    """
+    n = len(lics)
+    estado = np.zeros(n, dtype=np.int64)
+    monto = np.full(n, np.nan)
+    dias = np.full(n, np.nan)
+    regular = np.ones(n, dtype=bool)
+    basicos = np.zeros(n, dtype=bool)
+    tipos: List[str] = [""] * n
+    monedas: List[str] = [""] * n
+    regiones: List[str] = [""] * n
+    cierres: List[Optional[datetime.datetime]] = [None] * n
+
+    for i, lic in enumerate(lics):
+        ok = True
+        e = lic.get("CodigoEstado")
+        if type(e) is int and abs(e) < _ENTERO_EXACTO: estado[i] = e
+        else: ok = False
+        t = lic.get("Tipo") or ""
+        m = lic.get("Moneda") or ""
+        if type(t) is str and type(m) is str: tipos[i], monedas[i] = t, m
+        else: ok = False
+        mo = lic.get("MontoEstimado")
+        if type(mo) in (int, float) and abs(mo) < _ENTERO_EXACTO: monto[i] = mo
+        elif mo is not None: ok = False
+        d = _entero(lic.get("DiasCierreLicitacion"))
+        if d is not None: dias[i] = d
+        f = _dict_o_vacio(lic.get("Fechas"))
+        fc = f.get("FechaCierre") if f is not None else None
+        if f is None or (fc and type(fc) is not str): ok = False
+        elif fc:
+            dt = _fecha(fc)
+            if dt is not None and dt.tzinfo is not None: ok = False  # restar contra now() falla
+            else: cierres[i] = dt
+        c = _dict_o_vacio(lic.get("Comprador"))
+        r = (c.get("RegionUnidad") or "") if c is not None else None
+        if type(r) is str: regiones[i] = r
+        else: ok = False
+        basicos[i] = bool(lic.get("CodigoExterno")) and bool(lic.get("Nombre"))
+        regular[i] = ok
+
+    return pd.DataFrame({
+        "estado": estado,
+        "tipo": pd.Series(tipos, dtype=object),
+        "moneda": pd.Series(monedas, dtype=object),
+        "monto": monto,
+        "dias_api": dias,
+        "cierre": np.array(cierres, dtype="datetime64[us]"),
+        "region": pd.Series(regiones, dtype=object),
+        "basicos": basicos,
+        "regular": regular,
+    })
+
+def _por_valor(col: pd.Series, fn: Callable[[str], Any], dtype=bool) -> np.ndarray:
+    """Aplica `fn` una vez por valor distinto de la columna (tipos, monedas y regiones se repiten mucho)."""
+    codigos, unicos = pd.factorize(col)
+    return np.array([fn(u) for u in unicos], dtype=dtype)[codigos] if len(unicos) else np.zeros(len(col), dtype=dtype)
+
+def _dias_por_cierre(tabla: pd.DataFrame, ahora: datetime.datetime) -> np.ndarray:
+    """(FechaCierre - ahora).days con NaN donde no hay fecha; timedelta.days redondea hacia abajo."""
+    cierre = tabla["cierre"].to_numpy(dtype="datetime64[us]")
+    delta = (cierre - np.datetime64(ahora, "us")).astype(np.int64)
+    return np.where(np.isnat(cierre), np.nan, np.floor_divide(delta, US_POR_DIA).astype(float))
+
+# ============================================================
+# FILTRO DURO
+# ============================================================
+
+def _ok_dias(tabla: pd.DataFrame, filtro) -> np.ndarray:
+    # DiasCierreLicitacion si es >= 0; si no, días hasta FechaCierre; sin ninguno, pasa
+    dias_api = tabla["dias_api"].to_numpy()
+    dias = np.where(dias_api >= 0, dias_api, _dias_por_cierre(tabla, filtro.ahora))
+    return np.isnan(dias) | (dias >= filtro.dias_minimos)
+
+def mascara_filtro_con_metricas(tabla: pd.DataFrame, filtro, lics: List[Dict[str, Any]]
+                                ) -> Tuple[np.ndarray, Dict[str, Dict[str, Any]]]:
+    """
+    (True para las filas que pasan el filtro duro, métricas por regla como
+    FiltroDuro.filtrar_con_metricas). `filtro` es un FiltroDuro de 1_filtro_duro.py
+    (estados, tipos, monedas, cotas, ahora); las filas irregulares se resuelven con
+    su regla_rechazo.
+    """
+    monto = tabla["monto"].to_numpy()
+    # `e in frozenset` compara por igualdad: 5 == 5.0 == True cuentan como el entero
+    estados = [int(e) for e in filtro.estados if isinstance(e, (int, float)) and float(e).is_integer()]
+    calculos = {
+        "estado": lambda: np.isin(tabla["estado"].to_numpy(), estados),
+        "tipo": lambda: _por_valor(tabla["tipo"], lambda t: not t.strip() or t.strip().upper() in filtro.tipos),
+        "moneda": lambda: _por_valor(tabla["moneda"], lambda m: not m.strip() or m.strip().upper() in filtro.monedas),
+        "campos": lambda: tabla["basicos"].to_numpy(),
+        "monto_minimo": lambda: ~((monto > 0) & (monto < filtro.monto_minimo)),
+        "monto_maximo": lambda: ~((monto > 0) & (monto > filtro.monto_maximo)),
+        "dias": lambda: _ok_dias(tabla, filtro),
+    }
+
+    regular = tabla["regular"].to_numpy()
+    vivos = regular.copy()
+    met: Dict[str, Dict[str, Any]] = {"evaluadas": {}, "rechazos": {}, "segundos": {}}
+    irregulares = np.flatnonzero(~regular)
+    falla = {i: filtro.regla_rechazo(lics[i]) for i in irregulares}
+    pendientes_irr = len(irregulares)
+    with np.errstate(invalid="ignore"):
+        for regla in filtro.REGLAS:
+            t0 = time.perf_counter()
+            ok = calculos[regla]()
+            met["segundos"][regla] = time.perf_counter() - t0
+            rechazadas = vivos & ~ok
+            irr = sum(1 for r in falla.values() if r == regla)
+            met["evaluadas"][regla] = int(vivos.sum()) + pendientes_irr
+            met["rechazos"][regla] = int(rechazadas.sum()) + irr
+            pendientes_irr -= irr
+            vivos &= ok
+
+    for i, regla in falla.items():
+        vivos[i] = regla is None
+    return vivos, met
+
+def mascara_filtro(tabla: pd.DataFrame, filtro, lics: List[Dict[str, Any]]) -> np.ndarray:
+    """True para las filas que pasan el filtro duro."""
+    return mascara_filtro_con_metricas(tabla, filtro, lics)[0]
+
+def filtrar_con_metricas(tabla: pd.DataFrame, lics: List[Dict[str, Any]], filtro
+                         ) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Mismo resultado que filtro.filtrar_con_metricas(lics), usando la tabla ya aplanada."""
+    mascara, met = mascara_filtro_con_metricas(tabla, filtro, lics)
+    return [lics[i] for i in np.flatnonzero(mascara)], met
+
+def filtrar(tabla: pd.DataFrame, lics: List[Dict[str, Any]], filtro) -> List[Dict[str, Any]]:
+    """Mismo resultado que filtro.filtrar(lics), usando la tabla ya aplanada."""
+    return [lics[i] for i in np.flatnonzero(mascara_filtro(tabla, filtro, lics))]
+
+# ============================================================
+# SUBSCORES NUMÉRICOS
+# ============================================================
+
+def subscores(tabla: pd.DataFrame, cfg, ahora: datetime.datetime,
+              respaldo: Callable[[Dict[str, Any]], Tuple[float, float, float]],
+              lics: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    viabilidad_financiera, oportunidad_temporal y ventaja_geografica (sin redondear,
+    igual que las funciones de 2_scoring.py). `respaldo(lic)` devuelve los tres para
+    una fila irregular.
+    """
+    monto = tabla["monto"].to_numpy()
+    a, b = cfg.MONTO_OPTIMO_MIN, cfg.MONTO_OPTIMO_MAX
+    lo = getattr(cfg, "MONTO_MINIMO", 0) or 0
+    hi = getattr(cfg, "MONTO_MAXIMO", b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bajo = np.zeros_like(monto) if a == lo else np.clip((monto - lo) / float(a - lo), 0.0, 1.0) * 100.0
+        alto = np.zeros_like(monto) if hi == b else np.clip((hi - monto) / float(hi - b), 0.0, 1.0) * 100.0
+    sin_monto = np.isnan(monto) | (monto == 0)
+    vf = np.select(
+        [sin_monto, monto < 0, (a <= monto) & (monto <= b), monto < a],
+        [50.0, 0.0, 100.0, bajo], default=alto,
+    )
+
+    dias_api = tabla["dias_api"].to_numpy()
+    dias = np.where(~np.isnan(dias_api), dias_api, _dias_por_cierre(tabla, ahora))
+    dmin, dopt = cfg.DIAS_MINIMOS_PREPARACION, cfg.DIAS_OPTIMOS_PREPARACION
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medio = np.clip((dias - dmin) / float(dopt - dmin), 0.0, 1.0) * 100.0 if dopt != dmin else np.zeros_like(dias)
+    ot = np.select([np.isnan(dias), dias <= dmin, dias >= dopt], [0.0, 0.0, 100.0], default=medio)
+
+    prioritarias = cfg.REGIONES_PRIORITARIAS or []
+    vg = _por_valor(tabla["region"], lambda r: 100.0 if r.strip() and r.strip() in prioritarias else 0.0, float)
+
+    for i in np.flatnonzero(~tabla["regular"].to_numpy()):
+        vf[i], ot[i], vg[i] = respaldo(lics[i])
+    return {"viabilidad_financiera": vf, "oportunidad_temporal": ot, "ventaja_geografica": vg}
+
+# ============================================================
+# VERIFICACIÓN
+# ============================================================
+
+def _cargar_script(nombre: str):
+    spec = importlib.util.spec_from_file_location(Path(nombre).stem.replace("-", "_"), str(BASE_DIR / nombre))
+    mod = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(mod)                # type: ignore
+    return mod
+
+def _cronometrar(fn) -> Tuple[float, Any]:
+    t0 = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - t0, res
+
+def verificar(clientes_dir: Path, base_dir: Path, catalog_path: Path, max_dias: Optional[int]) -> bool:
+    """Compara motor vectorial vs funciones por diccionario sobre los días de cada cliente."""
+    filtro_duro = _cargar_script("1_filtro_duro.py")
+    scoring = _cargar_script("2_scoring.py")
+    catalogo = filtro_duro.cargar_catalogo_local(catalog_path)
+    cfg_paths = sorted(clientes_dir.glob("*_config.py"))
+    if not catalogo or not cfg_paths:
+        print(f"Nada que verificar (catálogo en {catalog_path}, configs en {clientes_dir})")
+        return True
+
+    todo_ok = True
+    ahora = datetime.datetime.now()
+    for p in cfg_paths:
+        cfg = filtro_duro.cargar_config(p)
+        dias = filtro_duro.fechas_a_procesar(catalogo, max_dias or getattr(cfg, "MAX_DIAS_ATRAS", 30))
+        lics = [lic for d in dias for lic in almacen_local.leer_dia(base_dir, d)]
+        if not lics: continue
+
+        filtro = filtro_duro.compilar_filtro(cfg, ahora)
+        t_ref, ref = _cronometrar(lambda: filtro.filtrar(lics))
+        t_apl, tabla = _cronometrar(lambda: aplanar(lics))
+        t_vec, vec = _cronometrar(lambda: filtrar(tabla, lics, filtro))
+        filtro_ok = [id(x) for x in ref] == [id(x) for x in vec]
+
+        scfg = scoring.cargar_config(p) if hasattr(cfg, "PONDERACIONES") else None
+        score_ok, t_sref, t_svec = True, 0.0, 0.0
+        if scfg is not None:
+            def por_dict(lic):
+                return (scoring.score_viabilidad_financiera(lic, scfg)[0],
+                        scoring.score_oportunidad_temporal(lic, scfg, ahora)[0],
+                        scoring.score_ventaja_geografica(lic, scfg)[0])
+            t_sref, sref = _cronometrar(lambda: [por_dict(lic) for lic in lics])
+            t_svec, svec = _cronometrar(lambda: subscores(tabla, scfg, ahora, por_dict, lics))
+            cols = (svec["viabilidad_financiera"], svec["oportunidad_temporal"], svec["ventaja_geografica"])
+            malos = [i for i, s in enumerate(sref) if s != tuple(float(c[i]) for c in cols)]
+            score_ok = not malos
+            for i in malos[:5]:
+                print(f"   ❌ {lics[i].get('CodigoExterno')}: por dict={sref[i]} vectorial={tuple(float(c[i]) for c in cols)}")
+
+        irregulares = int((~tabla["regular"]).sum())
+        print(f"- {cfg.NOMBRE_CLIENTE}: {len(lics)} licitaciones ({irregulares} irregulares), aplanado {t_apl:.3f}s")
+        print(f"   filtro duro  {'✅' if filtro_ok else '❌'} por dict {t_ref:.3f}s | vectorial {t_vec:.3f}s"
+              f" (+aplanado {t_apl + t_vec:.3f}s) | pasan {len(ref)}")
+        if scfg is not None:
+            print(f"   subscores    {'✅' if score_ok else '❌'} por dict {t_sref:.3f}s | vectorial {t_svec:.3f}s")
+        todo_ok &= filtro_ok and score_ok
+    return todo_ok
+
+def main():
+    ap = argparse.ArgumentParser(description="Motor vectorial de filtro duro y subscores")
+    ap.add_argument("--clientes_dir", default=str(BASE_DIR / "clientes"))
+    ap.add_argument("--base-dir", default=str(BASE_DIR / "base_local"), help="Directorio raíz de la base local")
+    ap.add_argument("--catalog", default=str(BASE_DIR / "catalog_local.json"), help="Ruta a catalog_local.json")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    v = sub.add_parser("verificar", help="Paridad exacta y tiempos frente a las funciones por diccionario")
+    v.add_argument("--max-dias", type=int, default=None, help="Días a usar (default: MAX_DIAS_ATRAS de cada cliente)")
+    args = ap.parse_args()
+
+    ok = verificar(Path(args.clientes_dir), Path(args.base_dir), Path(args.catalog), args.max_dias)
+    print("\n✅ Resultados idénticos" if ok else "\n❌ Hay diferencias")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+normalizacion.py
+Texto normalizado de una licitación para buscar keywords: NFKD sin tildes,
+casefold y tokens \\w+ separados por un espacio ("Capacitación  en C.F.T." ->
+"capacitacion en c f t"). 1_filtro_duro.py lo guarda en cada licitación
+filtrada (CAMPO_NORMALIZADO) y 2_scoring.py lo usa si el config tiene
+NORMALIZAR_TEXTO = True, así cada keyword se escribe una sola vez.
+"""
+import re, unicodedata
+from typing import Any, Dict, Iterable, List
+
+CAMPO_NORMALIZADO = "_texto_normalizado"
+
+_TOKEN = re.compile(r"\w+")
+
+def normalizar(s: Any) -> str:
+    s = unicodedata.normalize("NFKD", str(s or "").casefold())
+    # las marcas combinantes no son \w: hay que quitarlas antes de tokenizar
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(_TOKEN.findall(s))
+
+def texto_normalizado(lic: Dict[str, Any]) -> str:
+    """El precalculado de la etapa 1 si viene en el registro; si no, se calcula."""
+    t = lic.get(CAMPO_NORMALIZADO)
+    if isinstance(t, str): return t
+    return normalizar(str(lic.get("Nombre") or "") + " " + str(lic.get("Descripcion") or ""))
+
+def anotar(lics: Iterable[Dict[str, Any]]) -> int:
+    """Guarda CAMPO_NORMALIZADO en los registros que no lo tienen; retorna cuántos anotó."""
+    n = 0
+    for lic in lics:
+        if isinstance(lic, dict) and not isinstance(lic.get(CAMPO_NORMALIZADO), str):
+            lic[CAMPO_NORMALIZADO] = texto_normalizado(lic)
+            n += 1
+    return n
+
+def keywords_normalizadas(keywords: Iterable[Any]) -> List[str]:
+    """Keywords en la misma forma que el texto, sin repetidas ni vacías, en el orden original."""
+    return list(dict.fromkeys(k for k in (normalizar(kw) for kw in keywords) if k))
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+prefiltro_semantico.py
+Preclasificador local (NumPy) delante del filtro IA: decide solo las licitaciones
+claramente SI o claramente NO y deja a la IA la franja dudosa.
+
+- Vectores TF-IDF de n-gramas de caracteres (N_GRAMAS) del texto normalizado
+  (normalizacion.py), con hashing a DIMENSION columnas; cada documento es disperso
+  (índices, pesos) y sólo los centroides son densos.
+- Se entrena con las decisiones SI/NO de la memoria IA del cliente (memoria_ia.py),
+  cruzadas con Nombre/Descripcion de las ejecuciones guardadas (*_alas_*.json).
+- margen = cos(doc, centroide SI) - cos(doc, centroide NO) + PESO_DESCRIPCION * cos(doc, DESCRIPCION_CLIENTE)
+- Los umbrales salen de una partición de calibración: margen >= umbral_si es SI y
+  margen <= umbral_no es NO, cada uno con precisión >= la pedida. Lo demás va a la IA.
+
+Uso:
+  python prefiltro_semantico.py [--cliente cenda] [--precision 0.98] [--prueba 0.2]
+    Entrena con el historial menos una fracción de prueba y reporta, sobre esa fracción,
+    cuántas llamadas a la IA se ahorran y cuánto coincide el prefiltro con la IA.
+
+En 4_filtro_IA.py se activa con PREFILTRO_SEMANTICO = True en el config del cliente.
+"""
+import sys
+sys.dont_write_bytecode = True
+import argparse, hashlib, importlib.util, json, zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import memoria_ia, normalizacion
+
+BASE_DIR     = Path(__file__).resolve().parent
+CLIENTES_DIR = BASE_DIR / "clientes"
+
+DIMENSION = 1 << 18
+N_GRAMAS = (3, 4, 5)
+PESO_DESCRIPCION = 0.5
+PRECISION_OBJETIVO = 0.98
+MIN_EJEMPLOS = 30       # por clase; con menos no se entrena
+FRACCION_CALIBRACION = 0.25
+
+Vector = Tuple[np.ndarray, np.ndarray]  # (índices, pesos)
+
+# ============================================================
+# VECTORES
+# ============================================================
+
+def texto(lic: Dict[str, Any]) -> str:
+    return normalizacion.normalizar(f"{lic.get('Nombre') or ''} {lic.get('Descripcion') or ''}")
+
+def ngramas(t: str) -> np.ndarray:
+    """Índices hasheados de los n-gramas de caracteres (con repetición) de ' t '."""
+    t = f" {t} "
+    idx = [zlib.crc32(t[i:i + n].encode("utf-8")) for n in N_GRAMAS for i in range(len(t) - n + 1)]
+    return np.asarray(idx, dtype=np.int64) % DIMENSION
+
+def _tf(t: str) -> Vector:
+    ind, cuenta = np.unique(ngramas(t), return_counts=True)
+    return ind, 1.0 + np.log(cuenta)
+
+def _unitario(ind: np.ndarray, pesos: np.ndarray) -> Vector:
+    n = np.linalg.norm(pesos)
+    return ind, (pesos / n if n else pesos)
+
+class Vectorizador:
+    def __init__(self, textos: List[str]):
+        df = np.zeros(DIMENSION, dtype=np.float32)
+        for t in textos:
+            df[np.unique(ngramas(t))] += 1
+        self.idf = (np.log((1.0 + len(textos)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    def vector(self, t: str) -> Vector:
+        ind, tf = _tf(t)
+        return _unitario(ind, tf * self.idf[ind])
+
+def centroide(vecs: List[Vector]) -> np.ndarray:
+    c = np.zeros(DIMENSION, dtype=np.float64)
+    for ind, w in vecs:
+        c[ind] += w
+    n = np.linalg.norm(c)
+    return c / n if n else c
+
+def denso(v: Vector) -> np.ndarray:
+    c = np.zeros(DIMENSION, dtype=np.float64)
+    c[v[0]] = v[1]
+    return c
+
+# ============================================================
+# MODELO
+# ============================================================
+
+def umbrales(margenes: np.ndarray, es_si: np.ndarray, precision: float) -> Tuple[float, float]:
+    """(umbral_si, umbral_no) más amplios con precisión >= objetivo en cada extremo; inf si no hay."""
+    orden = np.argsort(-margenes, kind="stable")
+    m, y = margenes[orden], es_si[orden]
+    k = np.arange(1, len(m) + 1)
+    # sólo se corta entre márgenes distintos
+    corte = np.append(m[1:] != m[:-1], True)
+    prec_si = np.cumsum(y) / k
+    ok = np.flatnonzero((prec_si >= precision) & corte)
+    umbral_si = float(m[ok[-1]]) if len(ok) else float("inf")
+    m2, y2 = m[::-1], ~y[::-1]
+    corte2 = np.append(m2[1:] != m2[:-1], True)
+    prec_no = np.cumsum(y2) / k
+    ok = np.flatnonzero((prec_no >= precision) & corte2)
+    umbral_no = float(m2[ok[-1]]) if len(ok) else float("-inf")
+    if umbral_no >= umbral_si:  # franjas cruzadas: mejor no decidir nada
+        return float("inf"), float("-inf")
+    return umbral_si, umbral_no
+
+class Prefiltro:
+    """Centroides SI/NO + descripción del cliente y umbrales de confianza."""
+
+    def __init__(self, textos: List[str], etiquetas: List[bool], descripcion_cliente: str,
+                 precision: float = PRECISION_OBJETIVO):
+        self.vectorizador = Vectorizador(textos + [normalizacion.normalizar(descripcion_cliente)])
+        self.desc = denso(self.vectorizador.vector(normalizacion.normalizar(descripcion_cliente)))
+        vecs = [self.vectorizador.vector(t) for t in textos]
+        y = np.asarray(etiquetas, dtype=bool)
+        # calibración con ejemplos que no entran a los centroides (partición determinista por texto)
+        calib = np.asarray([zlib.crc32(t.encode("utf-8")) % 1000 < FRACCION_CALIBRACION * 1000 for t in textos])
+        self._ajustar([v for v, c in zip(vecs, calib) if not c], y[~calib])
+        m = np.asarray([self.margen_vector(v) for v, c in zip(vecs, calib) if c])
+        self.umbral_si, self.umbral_no = umbrales(m, y[calib], precision)
+        # los umbrales quedan; los centroides finales usan todos los ejemplos
+        self._ajustar(vecs, y)
+
+    def _ajustar(self, vecs: List[Vector], y: np.ndarray):
+        self.c_si = centroide([v for v, s in zip(vecs, y) if s])
+        self.c_no = centroide([v for v, s in zip(vecs, y) if not s])
+
+    def margen_vector(self, v: Vector) -> float:
+        ind, w = v
+        return float(w @ self.c_si[ind] - w @ self.c_no[ind] + PESO_DESCRIPCION * (w @ self.desc[ind]))
+
+    def margen(self, lic: Dict[str, Any]) -> float:
+        return self.margen_vector(self.vectorizador.vector(texto(lic)))
+
+    def decidir(self, lic: Dict[str, Any]) -> Optional[str]:
+        """'SI'/'NO' si el margen cae fuera de la franja dudosa; None = a la IA."""
+        m = self.margen(lic)
+        if m >= self.umbral_si: return "SI"
+        if m <= self.umbral_no: return "NO"
+        return None
+
+# ============================================================
+# DATOS DEL CLIENTE
+# ============================================================
+
+def textos_ejecuciones(salida_base: Path) -> Dict[str, str]:
+    """CodigoExterno -> texto normalizado, de la ejecución más reciente que lo trae."""
+    out: Dict[str, str] = {}
+    for p in sorted(salida_base.glob("*/*/*_alas_*.json"), key=lambda x: x.stat().st_mtime):
+        try: data = json.loads(p.read_text(encoding="utf-8"))
+        except Exception: continue
+        for it in (data.get("resumen") or []) if isinstance(data, dict) else []:
+            if isinstance(it, dict) and it.get("CodigoExterno"):
+                out[it["CodigoExterno"]] = texto(it)
+    return out
+
+def ejemplos_cliente(nombre_cliente: str, cfg) -> List[Tuple[str, str, bool]]:
+    """(código, texto, es_SI) para las decisiones IA con texto disponible."""
+    salida_base = Path(getattr(cfg, "DIRECTORIO_SALIDA", BASE_DIR / "resultados" / nombre_cliente.lower()))
+    decisiones = memoria_ia.decisiones_cliente(nombre_cliente, memoria_ia.contextos_cfg(cfg))
+    textos = textos_ejecuciones(salida_base)
+    return [(c, textos[c], d == "SI") for c, d in sorted(decisiones.items()) if textos.get(c)]
+
+def entrenar(ejemplos: List[Tuple[str, str, bool]], descripcion_cliente: str,
+             precision: float = PRECISION_OBJETIVO) -> Optional[Prefiltro]:
+    n_si = sum(1 for _, _, s in ejemplos if s)
+    if min(n_si, len(ejemplos) - n_si) < MIN_EJEMPLOS: return None
+    return Prefiltro([t for _, t, _ in ejemplos], [s for _, _, s in ejemplos], descripcion_cliente, precision)
+
+def prefiltro_cliente(nombre_cliente: str, cfg) -> Optional[Prefiltro]:
+    """Prefiltro entrenado con todo el historial del cliente (None si no hay ejemplos suficientes)."""
+    precision = float(getattr(cfg, "PREFILTRO_PRECISION", PRECISION_OBJETIVO))
+    return entrenar(ejemplos_cliente(nombre_cliente, cfg), getattr(cfg, "DESCRIPCION_CLIENTE", ""), precision)
+
+# ============================================================
+# EVALUACIÓN
+# ============================================================
+
+def _es_prueba(codigo: str, fraccion: float) -> bool:
+    return int(hashlib.md5(codigo.encode("utf-8")).hexdigest()[:8], 16) % 1000 < fraccion * 1000
+
+def evaluar_cliente(cfg_path: Path, precision: float, fraccion_prueba: float) -> Optional[Dict[str, Any]]:
+    nombre_cliente = cfg_path.name.replace("_config.py", "")
+    spec = importlib.util.spec_from_file_location(cfg_path.stem, str(cfg_path))
+    cfg = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(cfg)                 # type: ignore
+
+    ejemplos = ejemplos_cliente(nombre_cliente, cfg)
+    prueba = [e for e in ejemplos if _es_prueba(e[0], fraccion_prueba)]
+    entren = [e for e in ejemplos if not _es_prueba(e[0], fraccion_prueba)]
+    print(f"\n🧾 {nombre_cliente.upper()}: {len(ejemplos)} decisiones IA con texto "
+          f"({len(entren)} entrenamiento, {len(prueba)} prueba)")
+    modelo = entrenar(entren, getattr(cfg, "DESCRIPCION_CLIENTE", ""), precision)
+    if modelo is None:
+        print(f"⚠️  Menos de {MIN_EJEMPLOS} ejemplos SI o NO para entrenar.")
+        return None
+    if not prueba:
+        print("⚠️  Sin ejemplos de prueba.")
+        return None
+
+    decididas = coinciden = si_perdidos = 0
+    for _, t, es_si in prueba:
+        m = modelo.margen_vector(modelo.vectorizador.vector(t))
+        d = "SI" if m >= modelo.umbral_si else "NO" if m <= modelo.umbral_no else None
+        if d is None: continue
+        decididas += 1
+        coinciden += (d == "SI") == es_si
+        si_perdidos += es_si and d == "NO"
+    res = {
+        "cliente": nombre_cliente, "prueba": len(prueba),
+        "umbral_si": modelo.umbral_si, "umbral_no": modelo.umbral_no,
+        "reduccion_llamadas": round(decididas / len(prueba), 4),
+        "acuerdo": round(coinciden / decididas, 4) if decididas else None,
+        "si_descartados": si_perdidos,
+    }
+    print(f"   umbrales: SI >= {modelo.umbral_si:.3f}, NO <= {modelo.umbral_no:.3f}")
+    print(f"✅ Prueba: {decididas}/{len(prueba)} decididas sin IA ({100 * res['reduccion_llamadas']:.1f}% menos llamadas), "
+          + (f"acuerdo con la IA {100 * res['acuerdo']:.1f}%, " if decididas else "")
+          + f"{si_perdidos} SI de la IA descartados")
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description="Evalúa el prefiltro semántico contra el historial de la IA")
+    ap.add_argument("--cliente", default=None, help="Sólo este cliente (nombre del *_config.py sin sufijo)")
+    ap.add_argument("--precision", type=float, default=PRECISION_OBJETIVO,
+                    help=f"Precisión mínima de cada franja automática (default {PRECISION_OBJETIVO})")
+    ap.add_argument("--prueba", type=float, default=0.2, help="Fracción del historial reservada para prueba (default 0.2)")
+    args = ap.parse_args()
+    if not 0 < args.precision <= 1: ap.error("--precision debe estar en (0, 1]")
+    if not 0 < args.prueba < 1: ap.error("--prueba debe estar en (0, 1)")
+
+    cfgs = sorted(CLIENTES_DIR.glob("*_config.py"))
+    if args.cliente: cfgs = [p for p in cfgs if p.name == f"{args.cliente}_config.py"]
+    if not cfgs:
+        print("⚠️  No se encontraron archivos *_config.py.")
+        return
+    for p in cfgs:
+        evaluar_cliente(p, args.precision, args.prueba)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Paridad exacta del motor vectorial (motor_vectorial.py) con pasa_filtros_duros
+(1_filtro_duro.py) y score_viabilidad_financiera / score_oportunidad_temporal /
+score_ventaja_geografica (2_scoring.py) sobre licitaciones sintéticas, con el
+instante "ahora" fijo.
+"""
+import sys
+sys.dont_write_bytecode = True
+import datetime, importlib.util, math, random
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+import motor_vectorial
+
+AHORA = datetime.datetime(2026, 10, 17, 12, 0, 0, 500_000)
+REGION = "Región de Valparaíso"
+
+def _cargar_script(nombre: str):
+    spec = importlib.util.spec_from_file_location(Path(nombre).stem.replace("-", "_"), str(BASE_DIR / nombre))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+filtro_duro = _cargar_script("1_filtro_duro.py")
+scoring = _cargar_script("2_scoring.py")
+
+class _DatetimeFijo(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return AHORA
+
+@pytest.fixture(autouse=True)
+def ahora_fijo(monkeypatch):
+    # pasa_filtros_duros usa datetime.datetime.now() sin parámetro de "ahora"
+    monkeypatch.setattr(filtro_duro, "datetime", SimpleNamespace(datetime=_DatetimeFijo, timedelta=datetime.timedelta))
+
+def _cfg(**cambios):
+    base = dict(
+        NOMBRE_CLIENTE="TEST",
+        ESTADOS_ACEPTABLES=[5, 6], TIPOS_LICITACION_ACEPTABLES=["LE", "LP", "L1"],
+        MONEDAS_ACEPTABLES=["CLP", "UTM"], MONTO_MINIMO=1_000_000, MONTO_MAXIMO=500_000_000,
+        DIAS_MINIMOS_PREPARACION=3, DIAS_OPTIMOS_PREPARACION=14,
+        MONTO_OPTIMO_MIN=5_000_000, MONTO_OPTIMO_MAX=50_000_000,
+        REGIONES_PRIORITARIAS=[REGION],
+    )
+    base.update(cambios)
+    return SimpleNamespace(**base)
+
+CFGS = [
+    _cfg(),
+    _cfg(DIAS_MINIMOS_PREPARACION=2.5, ESTADOS_ACEPTABLES=[5, 6.0, "5"], REGIONES_PRIORITARIAS=None),
+    _cfg(MONTO_MINIMO=5_000_000, MONTO_MAXIMO=50_000_000, DIAS_MINIMOS_PREPARACION=0),
+]
+
+def _iso(dt: datetime.datetime, sufijo: str = "") -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S") + sufijo
+
+def _cierres():
+    """FechaCierre en los bordes de floor de (cierre - ahora).days y con/sin zona horaria."""
+    out = [None, "", "no-es-fecha", 20261020, "2026-10-20", "2026-10-20T10:00:00.123", "2026-10-20T10:00:00.999Z"]
+    for dias in (-2, 0, 1, 2, 3, 4, 14, 15):
+        for delta in (-1, 0, 1):
+            dt = AHORA + datetime.timedelta(days=dias, seconds=delta)
+            out += [_iso(dt), _iso(dt, "Z"), _iso(dt, ".000Z")]
+    # justo en el borde (con microsegundos)
+    out += [(AHORA + datetime.timedelta(days=3)).isoformat(), (AHORA + datetime.timedelta(days=3, microseconds=-1)).isoformat()]
+    return out
+
+# con zona horaria: la resta contra un "ahora" naive levanta TypeError en las funciones por diccionario
+CIERRES_TZ = ["2026-10-25T10:00:00-03:00", "2026-10-25T10:00:00+00:00"]
+
+VALORES = {
+    "CodigoEstado": [5, 6, 7, "5", 5.0, True, None, 2 ** 60],
+    "Tipo": ["LE", " le ", "lp", None, "", "XX", 123],
+    "Moneda": ["CLP", " utm", "USD", None, "", 5],
+    "MontoEstimado": [None, 0, 0.0, -5, 999_999, 1_000_000, 5_000_000, 50_000_000, 50_000_001, 500_000_000,
+                      500_000_001, 1.5e6, float("nan"), float("inf"), "1000000", 10 ** 17, True],
+    "DiasCierreLicitacion": [None, "", " ", "3", " 4 ", "abc", -1, "-1", 0, 2, 3, 4, 14, 15, "3.0", 2 ** 60],
+    "Comprador": [None, {}, {"RegionUnidad": REGION}, {"RegionUnidad": f"  {REGION} "}, {"RegionUnidad": None},
+                  {"RegionUnidad": "Región del Maule"}, {"RegionUnidad": 5}, "texto"],
+    "Fechas": ["cierre", None, {}, "texto"],
+}
+
+def _licitaciones(n: int = 4000, semilla: int = 7):
+    rnd = random.Random(semilla)
+    cierres = _cierres()
+    out = []
+    for i in range(n):
+        lic = {"CodigoExterno": rnd.choice([f"{i}-1-LE26", f"{i}-1-LE26", "", None]),
+               "Nombre": rnd.choice(["Servicio de capacitación", "Servicio", "", None])}
+        for campo, valores in VALORES.items():
+            if rnd.random() < 0.1: continue  # campo ausente
+            v = rnd.choice(valores)
+            if campo == "Fechas" and v == "cierre":
+                v = {"FechaCierre": rnd.choice(cierres)}
+            lic[campo] = v
+        out.append(lic)
+    return out
+
+def _resultado(fn, *args):
+    try: return "ok", fn(*args)
+    except Exception as e: return "error", type(e)
+
+def _referencias(lic, cfg):
+    return (
+        _resultado(lambda: filtro_duro.pasa_filtros_duros(lic, cfg)[0]),
+        _resultado(lambda: scoring.score_viabilidad_financiera(lic, cfg)[0]),
+        _resultado(lambda: scoring.score_oportunidad_temporal(lic, cfg, AHORA)[0]),
+        _resultado(lambda: scoring.score_ventaja_geografica(lic, cfg)[0]),
+    )
+
+def _respaldo(cfg):
+    def por_dict(lic):
+        return (scoring.score_viabilidad_financiera(lic, cfg)[0],
+                scoring.score_oportunidad_temporal(lic, cfg, AHORA)[0],
+                scoring.score_ventaja_geografica(lic, cfg)[0])
+    return por_dict
+
+def _iguales(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+@pytest.mark.parametrize("cfg", CFGS, ids=["base", "dias_fraccion", "montos_estrechos"])
+def test_paridad_filtro_y_subscores(cfg):
+    lics = _licitaciones()
+    refs = [_referencias(lic, cfg) for lic in lics]
+    # las que hacen fallar a una función de referencia se prueban aparte
+    sanas = [i for i, r in enumerate(refs) if all(x[0] == "ok" for x in r)]
+    assert len(sanas) > 0.5 * len(lics)
+    lics_ok = [lics[i] for i in sanas]
+
+    tabla = motor_vectorial.aplanar(lics_ok)
+    assert (~tabla["regular"]).sum() > 0 and tabla["regular"].sum() > 0  # ejercita ambos caminos
+
+    mascara = motor_vectorial.mascara_filtro(tabla, filtro_duro.compilar_filtro(cfg, AHORA), lics_ok)
+    esperado = np.array([refs[i][0][1] for i in sanas])
+    distintas = np.flatnonzero(mascara != esperado)
+    assert not len(distintas), [lics_ok[i] for i in distintas[:5]]
+
+    subs = motor_vectorial.subscores(tabla, cfg, AHORA, _respaldo(cfg), lics_ok)
+    for k, col in enumerate(("viabilidad_financiera", "oportunidad_temporal", "ventaja_geografica"), start=1):
+        malos = [j for j, i in enumerate(sanas) if not _iguales(float(subs[col][j]), refs[i][k][1])]
+        assert not malos, (col, [(lics_ok[j], float(subs[col][j]), refs[sanas[j]][k][1]) for j in malos[:5]])
+
+@pytest.mark.parametrize("cfg", CFGS, ids=["base", "dias_fraccion", "montos_estrechos"])
+def test_errores_iguales_que_por_diccionario(cfg):
+    """
+    Donde una función por diccionario levanta una excepción, el motor vectorial se
+    comporta como ella. Para el filtro la referencia es FiltroDuro (el orden de reglas
+    que reproduce el motor): pasa_filtros_duros mira los días antes que los campos
+    básicos, así que puede fallar en registros que FiltroDuro ya descartó.
+    """
+    lics = _licitaciones() + [{"CodigoExterno": "tz", "Nombre": "x", "CodigoEstado": 5, "Fechas": {"FechaCierre": fc}}
+                              for fc in CIERRES_TZ]
+    filtro = filtro_duro.compilar_filtro(cfg, AHORA)
+    probadas = 0
+    for lic in lics:
+        r_filtro, r_vf, r_ot, r_vg = _referencias(lic, cfg)
+        tabla = motor_vectorial.aplanar([lic])
+        if r_filtro[0] == "error":
+            probadas += 1
+            compilado = _resultado(lambda: filtro.filtrar([lic]) == [lic])
+            vectorial = _resultado(lambda: bool(motor_vectorial.mascara_filtro(tabla, filtro, [lic])[0]))
+            assert vectorial == compilado, lic
+        if "error" in (r_vf[0], r_ot[0], r_vg[0]):
+            probadas += 1
+            primero = next(r[1] for r in (r_vf, r_ot, r_vg) if r[0] == "error")
+            with pytest.raises(primero):
+                motor_vectorial.subscores(tabla, cfg, AHORA, _respaldo(cfg), [lic])
+    assert probadas >= len(CIERRES_TZ)
+
+def test_fecha_con_zona_horaria_y_dias_de_la_api():
+    """Con DiasCierreLicitacion >= 0 la FechaCierre con zona no se usa: ambos caminos la aceptan."""
+    cfg = CFGS[0]
+    lics = [{"CodigoExterno": f"tz{i}", "Nombre": "x", "CodigoEstado": 5, "DiasCierreLicitacion": d,
+             "Fechas": {"FechaCierre": fc}} for i, (d, fc) in enumerate((d, fc) for d in (2, 3, "10") for fc in CIERRES_TZ)]
+    tabla = motor_vectorial.aplanar(lics)
+    assert not tabla["regular"].any()
+    mascara = motor_vectorial.mascara_filtro(tabla, filtro_duro.compilar_filtro(cfg, AHORA), lics)
+    assert mascara.tolist() == [filtro_duro.pasa_filtros_duros(lic, cfg)[0] for lic in lics]
+    ot = motor_vectorial.subscores(tabla, cfg, AHORA, _respaldo(cfg), lics)["oportunidad_temporal"]
+    assert ot.tolist() == [scoring.score_oportunidad_temporal(lic, cfg, AHORA)[0] for lic in lics]
+
+@pytest.mark.parametrize("segundos", [-1, 0, 1])
+@pytest.mark.parametrize("dias", [-1, 0, 2, 3, 13, 14])
+def test_bordes_de_dias_al_cierre(dias, segundos):
+    """floor de (FechaCierre - ahora).days justo antes, en y después de cada borde de día."""
+    cfg = CFGS[0]
+    fc = AHORA + datetime.timedelta(days=dias, seconds=segundos)
+    lics = [{"CodigoExterno": "b", "Nombre": "x", "CodigoEstado": 5, "Fechas": {"FechaCierre": f}}
+            for f in (_iso(fc), _iso(fc, "Z"), fc.isoformat())]
+    tabla = motor_vectorial.aplanar(lics)
+    assert tabla["regular"].all()
+    mascara = motor_vectorial.mascara_filtro(tabla, filtro_duro.compilar_filtro(cfg, AHORA), lics)
+    assert mascara.tolist() == [filtro_duro.pasa_filtros_duros(lic, cfg)[0] for lic in lics]
+    ot = motor_vectorial.subscores(tabla, cfg, AHORA, _respaldo(cfg), lics)["oportunidad_temporal"]
+    assert ot.tolist() == [scoring.score_oportunidad_temporal(lic, cfg, AHORA)[0] for lic in lics]
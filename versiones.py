@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+versiones.py
+Vista "última versión" de las licitaciones de base_local.
+
+Un mismo CodigoExterno aparece en varios días a medida que se republica o
+actualiza. La versión más nueva es la del día más reciente y, dentro del
+mismo día, la de mayor (FechaCierre, FechaPublicacion, FechaAdjudicacion).
+El deduplicador recorre los registros una sola vez y guarda sólo la clave
+máxima por código: memoria O(códigos distintos).
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+from almacen_local import codigo_de
+
+CAMPOS_VERSION = ("FechaCierre", "FechaPublicacion", "FechaAdjudicacion")  # dentro de "Fechas"
+
+Clave = Tuple[str, ...]
+
+def campos_version(lic: Dict[str, Any]) -> Tuple[str, ...]:
+    fechas = lic.get("Fechas")
+    if not isinstance(fechas, dict): fechas = {}
+    return tuple(str(fechas.get(c) or "") for c in CAMPOS_VERSION)
+
+def clave_version(dia: str, lic: Dict[str, Any]) -> Clave:
+    """Orden de versiones: día del archivo y luego las fechas de CAMPOS_VERSION (ISO, comparables como texto)."""
+    return (dia,) + campos_version(lic)
+
+class DeduplicadorVersiones:
+    """
+    Acumula la clave más nueva de cada código (observar) y después marca cuáles
+    versiones son las vigentes (vigentes). Es de sólo lectura una vez observado
+    todo, así que varios clientes pueden consultar el mismo deduplicador.
+    """
+    def __init__(self):
+        self._max: Dict[str, Clave] = {}
+
+    def __len__(self) -> int:
+        return len(self._max)
+
+    def observar(self, codigo: str, clave: Clave):
+        if not codigo: return
+        actual = self._max.get(codigo)
+        if actual is None or clave > actual:
+            self._max[codigo] = clave
+
+    def observar_dia(self, dia: str, versiones: Iterable[Tuple[str, Tuple[str, ...]]]):
+        """`versiones`: (codigo, campos_version) de todos los registros del día."""
+        for codigo, campos in versiones:
+            self.observar(codigo, (dia,) + tuple(campos))
+
+    def vigentes(self, versiones: Iterable[Tuple[str, Clave]]) -> List[bool]:
+        """
+        Por cada (codigo, clave), si es la versión vigente de su código. Duplicados
+        exactos (misma clave máxima, p. ej. el registro repetido en un día) dejan
+        sólo el primero de `versiones`. Sin código no hay con qué deduplicar: se conserva.
+        """
+        entregados = set()
+        out = []
+        for codigo, clave in versiones:
+            ok = not codigo or (self._max.get(codigo, clave) == clave and codigo not in entregados)
+            if ok and codigo: entregados.add(codigo)
+            out.append(ok)
+        return out
+
+def versiones_de(lics: Iterable[Dict[str, Any]]) -> List[Tuple[str, Tuple[str, ...]]]:
+    return [(codigo_de(lic), campos_version(lic)) for lic in lics if isinstance(lic, dict)]